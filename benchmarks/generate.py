@@ -0,0 +1,140 @@
+import argparse
+import os
+import os.path
+import random
+
+
+# Property names used by vanilla items and blocks, so the generated trees have a realistic shape and density
+item_properties = ("Tags", "DisplayType", "HoldType", "Meshfile", "DropMeshfile", "Material", "Stacknumber",
+                   "EconomicValue", "EconomicBundleSize", "Group", "CraftingIngredientTime", "DescriptionKey",
+                   "RepairTools", "SoundJammed", "Weight")
+block_properties = ("Material", "Shape", "Texture", "Mesh", "ImposterDontBlock", "FuelValue", "CanPickup",
+                    "EconomicValue", "Group", "DescriptionKey", "Weight", "MaxDamage")
+materials = ("Mmetal", "Mwood", "Mstone", "Mplastic", "Mcloth", "Mconcrete", "Mglass")
+groups = ("Resources", "Tools/Traps", "Ammo/Weapons", "Food/Cooking", "Building", "Decor/Miscellaneous")
+
+
+def _value(rng: random.Random, name: str, index: int) -> str:
+    if name in ("Stacknumber", "EconomicValue", "EconomicBundleSize", "FuelValue", "MaxDamage"):
+        return str(rng.randint(1, 5000))
+    if name in ("Weight", "CraftingIngredientTime"):
+        return "{:g}".format(round(rng.uniform(0.1, 50.0), 2))
+    if name == "Material":
+        return rng.choice(materials)
+    if name == "Group":
+        return rng.choice(groups)
+    if name in ("CanPickup", "ImposterDontBlock"):
+        return rng.choice(("true", "false"))
+    return "{}{}".format(name.lower(), index % 97)
+
+
+def _tiered(rng: random.Random, low: int, high: int) -> str:
+    start = rng.randint(low, high)
+    return ",".join(str(start + tier * start // 4) for tier in range(rng.choice((1, 1, 3, 6))))
+
+
+def _write_items(fp, rng: random.Random, count: int):
+    fp.write('<?xml version="1.0" encoding="UTF-8"?>\n<items>\n')
+    for i in range(count):
+        fp.write('<item id="{0}" name="item{0}">\n'.format(i))
+        if i > 0 and rng.random() < 0.4:
+            # Most variants extend an earlier item, like the quality tiers of vanilla weapons
+            fp.write('\t<property name="Extends" value="item{}"/>\n'.format(rng.randrange(i)))
+        for name in rng.sample(item_properties, rng.randint(8, len(item_properties))):
+            fp.write('\t<property name="{}" value="{}"/>\n'.format(name, _value(rng, name, i)))
+        fp.write('\t<property class="Attributes">\n')
+        fp.write('\t\t<property name="EntityDamage" value="{}"/>\n'.format(_tiered(rng, 5, 80)))
+        fp.write('\t\t<property name="BlockDamage" value="{}"/>\n'.format(_tiered(rng, 5, 120)))
+        fp.write('\t\t<property name="DegradationMax" value="{}"/>\n'.format(_tiered(rng, 100, 1000)))
+        fp.write('\t</property>\n')
+        for action in range(rng.choice((0, 1, 1, 2))):
+            fp.write('\t<property class="Action{}">\n'.format(action))
+            fp.write('\t\t<property name="Class" value="{}"/>\n'.format(rng.choice(("Melee", "Ranged", "Eat"))))
+            fp.write('\t\t<property name="Delay" value="{:g}"/>\n'.format(round(rng.uniform(0.1, 2.0), 2)))
+            fp.write('\t\t<property name="Range" value="{}"/>\n'.format(rng.randint(1, 100)))
+            fp.write('\t\t<property name="Sound_start" value="sound{}"/>\n'.format(rng.randint(0, 50)))
+            fp.write('\t</property>\n')
+        fp.write('</item>\n')
+    fp.write('</items>\n')
+
+
+def _write_blocks(fp, rng: random.Random, count: int, items: int):
+    fp.write('<?xml version="1.0" encoding="UTF-8"?>\n<blocks>\n')
+    for i in range(count):
+        fp.write('<block id="{0}" name="block{0}">\n'.format(i))
+        if i > 0 and rng.random() < 0.5:
+            fp.write('\t<property name="Extends" value="block{}"/>\n'.format(rng.randrange(i)))
+        for name in rng.sample(block_properties, rng.randint(6, len(block_properties))):
+            fp.write('\t<property name="{}" value="{}"/>\n'.format(name, _value(rng, name, i)))
+        for _ in range(rng.randint(0, 3)):
+            fp.write('\t<drop event="{}" name="item{}" count="{}"/>\n'.format(
+                rng.choice(("Harvest", "Destroy", "Fall")), rng.randrange(items), rng.randint(1, 10)))
+        fp.write('</block>\n')
+    fp.write('</blocks>\n')
+
+
+def _write_recipes(fp, rng: random.Random, count: int, items: int):
+    fp.write('<?xml version="1.0" encoding="UTF-8"?>\n<recipes>\n')
+    for i in range(count):
+        fp.write('<recipe name="item{}" count="{}">\n'.format(i % items, rng.randint(1, 5)))
+        for _ in range(rng.randint(1, 4)):
+            fp.write('\t<ingredient name="item{}" count="{}"/>\n'.format(rng.randrange(items), rng.randint(1, 20)))
+        fp.write('</recipe>\n')
+    fp.write('</recipes>\n')
+
+
+def _write_loot(fp, rng: random.Random, count: int, items: int):
+    fp.write('<?xml version="1.0" encoding="UTF-8"?>\n<lootcontainers>\n')
+    for i in range(count):
+        fp.write('<lootgroup name="group{}" count="{}">\n'.format(i, rng.randint(1, 3)))
+        for _ in range(rng.randint(2, 12)):
+            if i > 0 and rng.random() < 0.15:
+                fp.write('\t<item group="group{}"/>\n'.format(rng.randrange(i)))
+            else:
+                fp.write('\t<item name="item{}" count="1,{}" prob="{:g}"/>\n'.format(
+                    rng.randrange(items), rng.randint(1, 10), round(rng.random(), 3)))
+        fp.write('</lootgroup>\n')
+    for i in range(count // 4):
+        fp.write('<lootcontainer id="{}" count="1" size="6,3" sound_open="UseActions/open_box">\n'.format(i))
+        fp.write('\t<item group="group{}"/>\n'.format(rng.randrange(count)))
+        fp.write('</lootcontainer>\n')
+    fp.write('</lootcontainers>\n')
+
+
+def generate(directory: str, items: int=2000, blocks: int=1500, recipes: int=None, loot: int=None, seed: int=0):
+    """Write a synthetic Data/Config directory
+
+    The output is deterministic for a given set of arguments, so benchmark results are comparable between runs.
+
+    :param directory: The directory to write items.xml, blocks.xml, recipes.xml and loot.xml to
+    :param items: The number of items
+    :param blocks: The number of blocks
+    :param recipes: The number of recipes, defaults to the number of items
+    :param loot: The number of loot groups, defaults to a tenth of the number of items
+    :param seed: Seed for the random values
+    """
+    items = max(1, items)
+    recipes = items if recipes is None else recipes
+    loot = max(1, items // 10) if loot is None else loot
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "items.xml"), "w") as fp:
+        _write_items(fp, rng, items)
+    with open(os.path.join(directory, "blocks.xml"), "w") as fp:
+        _write_blocks(fp, rng, blocks, items)
+    with open(os.path.join(directory, "recipes.xml"), "w") as fp:
+        _write_recipes(fp, rng, recipes, items)
+    with open(os.path.join(directory, "loot.xml"), "w") as fp:
+        _write_loot(fp, rng, loot, items)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic config directory")
+    parser.add_argument("directory")
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--blocks", type=int, default=1500)
+    parser.add_argument("--recipes", type=int, default=None)
+    parser.add_argument("--loot", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.directory, args.items, args.blocks, args.recipes, args.loot, args.seed)
@@ -0,0 +1,12 @@
+# Declarative mod: rules over every block, which may be streamed or applied in memory
+
+from sdtd.rules import Rule, clamp, property_equals, scale
+
+mod_info = {"writes": ["blocks"]}
+
+rules = {
+    "blocks.xml": [
+        Rule("block", "MaxDamage", scale(2)),
+        Rule("block", "FuelValue", clamp(0, 1000), where=property_equals("Material", "Mwood")),
+    ]
+}
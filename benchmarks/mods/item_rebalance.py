@@ -0,0 +1,18 @@
+# Accessor-heavy mod: looks up every item through GameData and reads and writes properties through the Item wrappers
+
+mod_info = {"writes": ["items"]}
+
+
+def apply(data):
+    for element in list(data.items):
+        item = data.find_item(element.get("name"))
+        weight = item.weight()
+        if weight.exists():
+            weight.set("value", "{:g}".format(float(weight.get("value")) * 0.9))
+        damage = item.attributes().entity_damage()
+        if damage.exists():
+            values = [float(value) * 1.25 for value in damage.get("value").split(",")]
+            damage.set("value", ",".join("{:g}".format(value) for value in values))
+        item.economic_value(True).set("value", "100")
+        if item.group().get("value") == "Resources":
+            item.stack_number(True).set("value", "6000")
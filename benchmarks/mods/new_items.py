@@ -0,0 +1,16 @@
+# Creation-heavy mod: adds new items with nested property classes
+
+mod_info = {"after": ["item_rebalance"], "writes": ["items"]}
+
+count = 500
+
+
+def apply(data):
+    first = 1000000
+    for i in range(count):
+        item = data.create_item("benchmarkItem{}".format(i), first + i)
+        item.extends(True).set("value", "item{}".format(i))
+        item.weight(True).set("value", "1")
+        item.group(True).set("value", "Resources")
+        item.attributes(True).entity_damage(True).set("value", "10,20,30")
+        item.action0().get_property_name("Delay", True).set("value", "0.5")
@@ -0,0 +1,248 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import os.path
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate import generate
+from sdtd.modmanager import ModManager
+
+results_version = 1
+default_mods = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mods")
+default_baseline = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class Phase(object):
+    """A single timed step of a build
+
+    The setup function prepares fresh state for every repetition and is not timed, the run function is called with
+    that state and is timed.
+    """
+    def __init__(self, name: str, setup, run, amount: float, unit: str):
+        """
+        :param name: The name of the phase in reports and baselines
+        :param setup: Function with no arguments, returning the state passed to run
+        :param run: Function called with the state returned by setup
+        :param amount: The amount of work done by one call to run, used to report throughput
+        :param unit: The unit of amount, such as "MB" or "elements"
+        """
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.amount = amount
+        self.unit = unit
+
+    def measure(self, repeat: int) -> dict:
+        """Run the phase repeat times, then once more to measure memory
+        :param repeat: The number of timed repetitions, the fastest one is reported
+        :return: Dict holding the seconds, throughput, unit and peak_bytes of the phase
+        """
+        best = None
+        for _ in range(repeat):
+            state = self.setup()
+            gc.collect()
+            start = time.perf_counter()
+            self.run(state)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        # Tracing allocations slows everything down, so memory gets its own untimed pass
+        state = self.setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            self.run(state)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            "seconds": best,
+            "throughput": self.amount / best if best > 0 else None,
+            "unit": "{}/s".format(self.unit),
+            "peak_bytes": peak,
+        }
+
+
+def _quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def _loaded(config: str) -> ModManager:
+    manager = ModManager()
+    _quiet(manager.load, config)
+    return manager
+
+
+def _applied(config: str, mods: str) -> ModManager:
+    manager = _loaded(config)
+    _quiet(manager.apply_all, mods)
+    return manager
+
+
+def _element_count(config: str) -> int:
+    manager = _loaded(config)
+    return sum(len(root) for root in manager.data.roots.values())
+
+
+def _directory_size(directory: str) -> int:
+    total = 0
+    for path, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            total += os.path.getsize(os.path.join(path, file_name))
+    return total
+
+
+def phases(config: str, mods: str, output: str) -> list:
+    """Build the list of phases to benchmark
+
+    :param config: The config directory to load
+    :param mods: The directory of mod scripts, each of which is also timed on its own
+    :param output: Scratch directory the write phase writes to
+    :return: The list of Phase objects
+    """
+    input_mb = _directory_size(config) / 1e6
+    elements = _element_count(config)
+    result = [Phase("load", lambda: ModManager(), lambda manager: _quiet(manager.load, config), input_mb, "MB"),
+              Phase("load_parallel", lambda: ModManager(), lambda manager: _quiet(manager.load, config, workers=0),
+                    input_mb, "MB")]
+
+    for file_name in sorted(os.listdir(mods)):
+        if os.path.splitext(file_name)[1] != ".py":
+            continue
+        mod_path = os.path.join(mods, file_name)
+        result.append(Phase("mod:" + os.path.splitext(file_name)[0], lambda: _loaded(config),
+                            lambda manager, path=mod_path: _quiet(manager.apply, path), elements, "elements"))
+
+    result.append(Phase("apply_all", lambda: _loaded(config),
+                        lambda manager: _quiet(manager.apply_all, mods), elements, "elements"))
+    # Mods declaring disjoint roots run as lanes in one worker process each; only gains on more than one CPU
+    result.append(Phase("apply_all_parallel", lambda: _loaded(config),
+                        lambda manager: _quiet(manager.apply_all, mods, workers=0), elements, "elements"))
+
+    counter = iter(range(sys.maxsize))
+
+    def write_setup():
+        # Write to a new directory every time, otherwise unchanged files are skipped
+        return _applied(config, mods), os.path.join(output, "write{}".format(next(counter)))
+
+    # Throughput is measured against the input size, the modded output is about as large
+    result.append(Phase("write", write_setup, lambda state: _quiet(state[0].write, state[1]), input_mb, "MB"))
+    return result
+
+
+def run_benchmarks(config: str, mods: str, repeat: int=3, only: list=None) -> dict:
+    """Run every benchmark phase
+    :param config: The config directory to load
+    :param mods: The directory of mod scripts
+    :param repeat: The number of timed repetitions of each phase
+    :param only: If given, only the phases with these names are run
+    :return: The results, keyed by phase name
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="sdtd-bench-") as output:
+        for phase in phases(config, mods, output):
+            if only is not None and phase.name not in only:
+                continue
+            results[phase.name] = phase.measure(repeat)
+            print(format_result(phase.name, results[phase.name]))
+    return results
+
+
+def format_result(name: str, result: dict, baseline: dict=None) -> str:
+    line = "{:<24} {:>9.4f} s {:>12.1f} {:<12} peak {:>9.2f} MB".format(
+        name, result["seconds"], result["throughput"] or 0.0, result["unit"], result["peak_bytes"] / 1e6)
+    if baseline is not None:
+        line += "   {:+7.1%} time {:+7.1%} memory".format(result["seconds"] / baseline["seconds"] - 1.0,
+                                                       result["peak_bytes"] / max(1, baseline["peak_bytes"]) - 1.0)
+    return line
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Compare results against a baseline
+    :param results: The phases dict of the current results
+    :param baseline: The phases dict of the baseline
+    :param tolerance: The fraction by which a phase may be slower or use more memory before it counts as a regression
+    :return: The names of the phases which regressed
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        print(format_result(name, result, reference))
+        if result["seconds"] > reference["seconds"] * (1.0 + tolerance) or \
+                result["peak_bytes"] > reference["peak_bytes"] * (1.0 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark loading, modding and writing config trees")
+    parser.add_argument("--config", help="Benchmark an existing config directory instead of a generated one")
+    parser.add_argument("--mods", default=default_mods, help="The mod scripts to benchmark")
+    parser.add_argument("--items", type=int, default=2000, help="The number of generated items")
+    parser.add_argument("--blocks", type=int, default=1500, help="The number of generated blocks")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the generated config")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions of each phase, the best is kept")
+    parser.add_argument("--phase", action="append", help="Only run the named phase, may be given more than once")
+    parser.add_argument("--baseline", default=default_baseline, help="The baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--output", help="Also write the results to this file")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Fraction a phase may be slower or larger than the baseline before failing")
+    args = parser.parse_args(argv)
+
+    mod_names = sorted(name for name in os.listdir(args.mods) if os.path.splitext(name)[1] == ".py")
+    settings = {"items": args.items, "blocks": args.blocks, "seed": args.seed, "mods": mod_names}
+    with tempfile.TemporaryDirectory(prefix="sdtd-config-") as generated:
+        config = args.config
+        if config is None:
+            generate(generated, items=args.items, blocks=args.blocks, seed=args.seed)
+            config = generated
+        else:
+            settings = {"config": os.path.abspath(config), "mods": mod_names}
+        results = {
+            "version": results_version,
+            "settings": settings,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "phases": run_benchmarks(config, args.mods, args.repeat, args.phase),
+        }
+
+    if args.output is not None:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, "w") as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+        print("Saved baseline to '{}'".format(args.baseline))
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        return 0
+    with open(args.baseline) as fp:
+        baseline = json.load(fp)
+    if baseline.get("version") != results_version or baseline.get("settings") != settings:
+        print("Warning: Baseline '{}' was recorded with different settings, not comparing".format(args.baseline))
+        return 0
+    print("\nCompared to '{}':".format(args.baseline))
+    regressions = compare(results["phases"], baseline["phases"], args.tolerance)
+    if len(regressions) > 0:
+        print("Regressed beyond {:.0%}: {}".format(args.tolerance, ", ".join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,46 @@
-
-import sdtd.data
+import argparse
+import sys
+import sdtd.log
+import sdtd.modmanager
+from sdtd.loader import ModLoader
 from sdtd.autolocate import get_sdtd_path
 
 app_id = 251570
 
 if __name__ == "__main__":
-    tool = sdtd.data.ModManager()
-    original = get_sdtd_path()
-    modded = "./modded/"
-    mods = "./sample_mods/"
-    tool.run(original, modded, mods)
+    parser = argparse.ArgumentParser(description="Apply mod scripts to the 7 Days to Die config files")
+    parser.add_argument("--original", default=None, help="The vanilla config directory, found through Steam by default")
+    parser.add_argument("--modded", default="./modded/", help="The output directory")
+    parser.add_argument("--mods", default="./sample_mods/", help="The directory containing the mod scripts")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Threads parsing the config and processes applying mods, 0 for one per CPU. Parsing "
+                             "holds the GIL, so more threads only overlap reading the files with parsing them")
+    parser.add_argument("--lazy", action="store_true",
+                        help="Only parse the config files the mods use, and stream rules over the others")
+    parser.add_argument("--verbatim", action="store_true",
+                        help="Copy everything the mods did not change byte for byte from the vanilla files")
+    parser.add_argument("--check", action="store_true",
+                        help="Check the result for broken references, such as recipes naming missing items")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and rebuild whenever a file in the mods directory changes")
+    parser.add_argument("--mod-cache", nargs="?", const="", default=None, metavar="DIR",
+                        help="Keep compiled mod scripts in DIR across runs, in the per-user cache directory if no DIR "
+                             "is given")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Also print debug details, such as every config file parsed")
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between checks in watch mode")
+    args = parser.parse_args()
+
+    if args.verbose:
+        sdtd.log.default_logger.level = sdtd.log.DEBUG
+    loader = None
+    if args.mod_cache is not None:
+        loader = ModLoader(args.mod_cache or ModLoader.default_directory())
+    tool = sdtd.modmanager.ModManager(loader=loader, verbatim=args.verbatim)
+    original = args.original or get_sdtd_path()
+    if args.watch:
+        tool.watch(original, args.modded, args.mods, args.interval, args.workers)
+    else:
+        findings = tool.run(original, args.modded, args.mods, args.workers, lazy=args.lazy, check=args.check)
+        if len(findings) > 0:
+            sys.exit(1)
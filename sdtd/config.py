@@ -0,0 +1,117 @@
+import collections.abc
+import xml.etree.ElementTree as ElementTree
+
+
+def read_root_tag(file_path: str) -> str:
+    """Read the root tag of an XML file without parsing the rest of the document
+
+    :param file_path: The path of the XML file
+    :return: The tag of the root element
+    """
+    with open(file_path, "rb") as fp:
+        for _, elem in ElementTree.iterparse(fp, events=("start",)):
+            return elem.tag
+    return None
+
+
+class ConfigFile(object):
+    """A single config file, parsed the first time its tree is requested"""
+    def __init__(self, path, name: str, tag: str, tree: ElementTree.ElementTree=None, parser=None):
+        """
+        :param path: The path of the source file, or None if the tree does not come from a file
+        :param name: The path of the file relative to the config directory
+        :param tag: The root tag of the file
+        :param tree: The parsed tree, if it is already available
+        :param parser: The function used to parse path into an ElementTree.ElementTree, defaults to
+                       ElementTree.parse
+        """
+        self.path = path      # type: str
+        self.name = name      # type: str
+        self.tag = tag        # type: str
+        self._tree = tree     # type: ElementTree.ElementTree
+        self._parser = ElementTree.parse if parser is None else parser
+
+    def loaded(self) -> bool:
+        """
+        :return: If the tree of this file has been parsed
+        """
+        return self._tree is not None
+
+    def tree(self) -> ElementTree.ElementTree:
+        """Get the parsed tree of this file, parsing the source file if needed
+        :return: The ElementTree.ElementTree for this file
+        """
+        if self._tree is None:
+            self._tree = self._parser(self.path)
+        return self._tree
+
+    def set_tree(self, tree: ElementTree.ElementTree):
+        """Replace the tree of this file, marking it as loaded
+        :param tree: The new tree
+        """
+        self._tree = tree
+
+    def root(self) -> ElementTree.Element:
+        """
+        :return: The root element of this file, parsing the source file if needed
+        """
+        return self.tree().getroot()
+
+
+class ConfigMap(collections.abc.MutableMapping):
+    """Mapping of keys to ConfigFile objects which resolves values on access
+
+    Reading a value parses the underlying file if it has not been parsed yet. Membership tests, len() and iterating
+    the keys never parse anything. Assigning a plain tree or element stores it as an already loaded ConfigFile.
+    """
+    def __init__(self, resolve, accessed: set=None):
+        """
+        :param resolve: Function mapping a ConfigFile to the value returned by this mapping
+        :param accessed: If given, the name of every ConfigFile read through this mapping is added to this set
+        """
+        self._resolve = resolve
+        self._entries = {}
+        self._accessed = accessed
+
+    def entry(self, key) -> ConfigFile:
+        """Get the ConfigFile stored for key without resolving it
+        :param key: The key to look up
+        :return: The ConfigFile for key
+        """
+        return self._entries[key]
+
+    def entries(self):
+        """
+        :return: A view of every ConfigFile in this mapping, none of which are resolved
+        """
+        return self._entries.values()
+
+    def add(self, key, config_file: ConfigFile):
+        """Store a ConfigFile under key without resolving it"""
+        self._entries[key] = config_file
+
+    def __getitem__(self, key):
+        entry = self._entries[key]
+        if self._accessed is not None:
+            self._accessed.add(entry.name)
+        return self._resolve(entry)
+
+    def __setitem__(self, key, value):
+        if isinstance(value, ConfigFile):
+            self._entries[key] = value
+        elif isinstance(value, ElementTree.ElementTree):
+            self._entries[key] = ConfigFile(None, key, value.getroot().tag, value)
+        else:
+            self._entries[key] = ConfigFile(None, None, value.tag, ElementTree.ElementTree(value))
+
+    def __delitem__(self, key):
+        del self._entries[key]
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
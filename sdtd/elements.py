@@ -1,18 +1,65 @@
 
+import collections
 import xml.etree.ElementTree as ElementTree
-from sdtd.log import Logger, PrintLogger
-import sdtd.util
+import sdtd.log
+import sdtd.selector
+
+
+class WrapperCache(object):
+    """Bounded cache which interns wrappers by the element backing them
+
+    With a cache in place, looking up the same property on the same item twice returns the same wrapper object
+    instead of building a new one. Wrappers are mutable (see XMLWrapper.create_if_missing), so a change made through
+    one reference is seen by every holder of the interned wrapper.
+    """
+    __slots__ = ("_entries", "_size")
+
+    def __init__(self, size: int=4096):
+        """
+        :param size: The maximum number of wrappers kept; the least recently used ones are dropped first
+        """
+        self._entries = collections.OrderedDict()
+        self._size = size
+
+    def get(self, key: tuple):
+        wrapper = self._entries.get(key, None)
+        if wrapper is not None:
+            self._entries.move_to_end(key)
+        return wrapper
+
+    def put(self, key: tuple, wrapper):
+        self._entries[key] = wrapper
+        if len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class Counters(object):
+    """Running totals of wrapper activity, read by sdtd.profiling to attribute work to mods"""
+    __slots__ = ("lookups", "mutations")
+
+    def __init__(self):
+        self.lookups = 0    # type: int
+        self.mutations = 0  # type: int
+
+
+counters = Counters()
 
 
 # The goal here is a class which provides arbitrary access down into an XML tree, only creating the nodes if needed.
 # In addition, errors when messing around with the tree should not stop execution with exceptions; failing should be
 # reported in some fashion, but otherwise not raise an exception.
 class XMLWrapper(object):
+    __slots__ = ("_element", "_name", "_parent", "_create_if_missing", "_logger", "_cache", "_path")
+
     def __init__(self, xml_element, name, parent=None, **kwargs):
         """
         Keyword arguments:
         create_if_missing -- If methods which need a concrete element should create it if missing
-        log_object -- The logging object to report error details to
+        log_object -- The logging object to report error details to, defaults to sdtd.log.default_logger
+        wrapper_cache -- WrapperCache used to intern the child wrappers handed out by this wrapper
 
         :param xml_element: The xml.etree.ElementTree.Element object backing this instance
         :param name: The name representing this. XPath specification usually
@@ -24,7 +71,9 @@ class XMLWrapper(object):
         self._parent = parent        # type: XMLWrapper
 
         self._create_if_missing = kwargs.get("create_if_missing", False)  # type: bool
-        self._logger = kwargs.get("log_object", PrintLogger())  # type: Logger
+        self._logger = kwargs.get("log_object", None) or sdtd.log.default_logger  # type: sdtd.log.Logger
+        self._cache = kwargs.get("wrapper_cache", None)  # type: WrapperCache
+        self._path = None  # type: str
 
     def create_if_missing(self, state: bool):
         """Set the behavior of the find method when the given tag is missing
@@ -69,12 +118,16 @@ class XMLWrapper(object):
         if not self.exists():
             if self._create_if_missing or create_if_missing:
                 if not self.create():
-                    self._logger.printf("Error: Could not create {}", self._get_invalid_element())
+                    self._logger.error("Error: Could not create {}", self._get_invalid_element())
                     return False
             else:
                 return False
 
+        old_value = self._element.get(attribute)
         self._element.set(attribute, value)
+        if attribute in sdtd.selector.indexed_attributes and self._parent is not None:
+            sdtd.selector.invalidate(self._parent._element)
+        self._notify_set(self, self._element, attribute, old_value, value)
         return True
 
     def get(self, attribute: str) -> str:
@@ -96,19 +149,21 @@ class XMLWrapper(object):
         :return: An XMLWrapper
         """
         create = create_if_missing or self._create_if_missing
-        xpath_spec = sdtd.util.fmt_xpath_spec(tag, attributes)
+        selector = sdtd.selector.compile_selector(tag, attributes)
+        xpath_spec = selector.xpath
         if self._element is None:
             if create:
                 if not self.create():
-                    return XMLWrapper(None, xpath_spec, self, create_if_missing=False, log_object=self._logger)
+                    return self._child(XMLWrapper, None, xpath_spec, create_if_missing=False)
             else:
-                return XMLWrapper(None, xpath_spec, self, create_if_missing=create, log_object=self._logger)
+                return self._child(XMLWrapper, None, xpath_spec, create_if_missing=create)
 
         # If we hit this point self._element is valid, either because we created it, or it already existed
-        elem = self._element.find("./"+xpath_spec)
+        elem = selector.first(self._element)
         if elem is None and create:
             elem = ElementTree.SubElement(self._element, tag, attributes)
-        return XMLWrapper(elem, xpath_spec, self, create_if_missing=create, log_object=self._logger)
+            self._notify_append(self, self._element, elem)
+        return self._child(XMLWrapper, elem, xpath_spec, create_if_missing=create)
 
     def get_element(self, xpath_spec: str):
         """Get the child element specified by the arguments
@@ -135,7 +190,7 @@ class XMLWrapper(object):
                         return False
                 return self._create_impl()
             else:
-                self._logger.printf("Can not create {}: Missing parent", str(self))
+                self._logger.error("Can not create {}: Missing parent", self)
                 return False
 
     def _create_impl(self) -> bool:
@@ -146,7 +201,7 @@ class XMLWrapper(object):
 
         :return: If the creation and registration of the new XML element succeeded
         """
-        self._logger.printf("Can not create generic XML Element for {}".format(str(self)))
+        self._logger.error("Can not create generic XML Element for {}", self)
         return False
 
     def remove(self):
@@ -161,6 +216,49 @@ class XMLWrapper(object):
         """
         if self._element is not None and self._parent is not None and self._parent.exists():
             self._parent._element.remove(self._element)
+            self._parent._notify_remove(self, self._parent._element, self._element)
+
+    def _notify_set(self, source, element: ElementTree.Element, attribute: str, old_value: str, value: str):
+        """Report an attribute change on the given element up the wrapper chain
+
+        The notification is passed up through the parents until it reaches a wrapper which handles it, such as a
+        ConfigRoot. Wrappers without a parent silently drop it.
+
+        :param source: The wrapper of the changed element
+        :param element: The element whose attribute changed
+        :param attribute: The name of the attribute which changed
+        :param old_value: The previous value of the attribute, or None if it was not set
+        :param value: The new value of the attribute
+        """
+        if self._parent is not None:
+            self._parent._notify_set(source, element, attribute, old_value, value)
+
+    def _notify_append(self, source, parent: ElementTree.Element, element: ElementTree.Element):
+        """Report that element was appended to parent up the wrapper chain
+        :param source: The wrapper of the parent element
+        :param parent: The element which received the new child
+        :param element: The newly appended child element
+        """
+        if self._parent is not None:
+            self._parent._notify_append(source, parent, element)
+
+    def _notify_remove(self, source, parent: ElementTree.Element, element: ElementTree.Element):
+        """Report that element was removed from parent up the wrapper chain
+        :param source: The wrapper of the removed element
+        :param parent: The element the child was removed from
+        :param element: The removed child element
+        """
+        if self._parent is not None:
+            self._parent._notify_remove(source, parent, element)
+
+    def _chain(self):
+        """
+        :return: Generator of the elements of this wrapper and its parents, starting with this one
+        """
+        wrapper = self
+        while wrapper is not None:
+            yield wrapper._element
+            wrapper = wrapper._parent
 
     def _get_invalid_element(self):
         if self._parent is None or self._parent._element is not None:
@@ -168,42 +266,320 @@ class XMLWrapper(object):
         else:
             return self._parent._get_invalid_element()
 
+    def _child(self, cls, element, *args, create_if_missing: bool=False):
+        """Build a child wrapper of type cls, reusing the interned one if this wrapper has a WrapperCache
+
+        :param cls: The XMLWrapper subclass to build, called as cls(element, *args, self, **kwargs)
+        :param element: The element backing the child, or None if it does not exist
+        :param args: Extra positional arguments for cls, placed before the parent argument
+        :param create_if_missing: The create_if_missing state of the child
+        :return: The child wrapper
+        """
+        counters.lookups += 1
+        key = None
+        if self._cache is not None and element is not None:
+            key = (cls, id(element), args, create_if_missing)
+            wrapper = self._cache.get(key)
+            if wrapper is not None and wrapper._element is element:
+                return wrapper
+        wrapper = cls(element, *args, self, create_if_missing=create_if_missing, log_object=self._logger,
+                      wrapper_cache=self._cache)
+        if key is not None:
+            self._cache.put(key, wrapper)
+        return wrapper
+
     def __str__(self):
-        if self._parent is None:
-            return self._name
-        return "{}/{}".format(str(self._parent), self._name)
+        # Names never change after construction, so the path is built once
+        if self._path is None:
+            if self._parent is None:
+                self._path = self._name
+            else:
+                self._path = "{}/{}".format(str(self._parent), self._name)
+        return self._path
 
 
 class PropertyName(XMLWrapper):
+    __slots__ = ("_attrib_name",)
+
     def __init__(self, element, name: str, parent=None, **kwargs):
-        XMLWrapper.__init__(self, element, "property[@name='{}']".format(name), parent, **kwargs)
+        XMLWrapper.__init__(self, element, sdtd.selector.compile_selector("property", {"name": name}).xpath, parent,
+                            **kwargs)
         self._attrib_name = name
 
     def _create_impl(self):
         self._element = ElementTree.SubElement(self._parent._element, "property", {"name": self._attrib_name})
+        self._parent._notify_append(self._parent, self._parent._element, self._element)
         return True
 
 
 class PropertyContainer(XMLWrapper):
+    __slots__ = ()
+
     def __init__(self, element, name: str, parent=None, **kwargs):
         XMLWrapper.__init__(self, element, name, parent, **kwargs)
 
     def get_property_class(self, class_name: str, create_if_missing: bool):
-        elem = self.get_element("./property[@class='{}']".format(class_name))
+        elem = sdtd.selector.find_child(self._element, "property", "class", class_name)
         create = create_if_missing or self._create_if_missing
-        return PropertyClass(elem, class_name, self, create_if_missing=create, log_oobject=self._logger)
+        return self._child(PropertyClass, elem, class_name, create_if_missing=create)
 
     def get_property_name(self, name: str, create_if_missing: bool):
-        elem = self.get_element("./property[@name='{}']".format(name))
+        elem = sdtd.selector.find_child(self._element, "property", "name", name)
         create = create_if_missing or self._create_if_missing
-        return PropertyName(elem, name, self, create_if_missing=create, log_object=self._logger)
+        return self._child(PropertyName, elem, name, create_if_missing=create)
 
 
 class PropertyClass(PropertyContainer):
+    __slots__ = ("_attrib_class",)
+
     def __init__(self, element, name: str, parent=None, **kwargs):
-        PropertyContainer.__init__(self, element, "property[@class='{}']".format(name), parent, **kwargs)
+        PropertyContainer.__init__(self, element, sdtd.selector.compile_selector("property", {"class": name}).xpath,
+                                   parent, **kwargs)
         self._attrib_class = name
 
     def _create_impl(self):
         self._element = ElementTree.SubElement(self._parent._element, "property", {"class": self._attrib_class})
+        self._parent._notify_append(self._parent, self._parent._element, self._element)
         return True
+
+
+class ConfigListener(object):
+    """Receives the changes reported to the ConfigRoot objects it is registered with
+
+    Every method gets the ConfigRoot the change was reported to and a chain: the list of elements from the changed
+    element (for changed()) or the parent of the added or removed element (for appended() and removed()) up to, but not
+    including, the root element. An empty chain means the change was made directly on the root element.
+    """
+    def changed(self, root, chain: list, attribute: str, old_value: str, value: str):
+        """Called after an attribute changed
+        :param root: The ConfigRoot
+        :param chain: The changed element followed by its ancestors
+        :param attribute: The changed attribute
+        :param old_value: The previous value, None if the attribute is new
+        :param value: The new value
+        """
+        pass
+
+    def appended(self, root, chain: list, element: ElementTree.Element):
+        """Called after a new element was added
+        :param root: The ConfigRoot
+        :param chain: The parent of the new element followed by its ancestors
+        :param element: The new element
+        """
+        pass
+
+    def removed(self, root, chain: list, element: ElementTree.Element):
+        """Called after an element was removed
+        :param root: The ConfigRoot
+        :param chain: The former parent of the element followed by its ancestors
+        :param element: The removed element
+        """
+        pass
+
+
+class ConfigRoot(XMLWrapper):
+    """XMLWrapper for the root element of a config file, such as <items> or <blocks>
+
+    The direct children of the root are indexed by their name and id attributes so they can be looked up without
+    scanning the whole file. The indexes are built on the first lookup and kept current through the mutation
+    notifications sent up by child wrappers. Changes made directly on raw() elements are caught as well: the indexes
+    are rebuilt when the number of children or the last child changed, and when an indexed element no longer has the
+    key it was found under. Misses are not checked against the children, which would cost a scan of the whole root for
+    every new name; a child given a new name directly on its raw element is found under it once the indexes are
+    rebuilt for one of those reasons, or after a call to reindex().
+
+    Keyword arguments, in addition to those of XMLWrapper:
+    journal -- sdtd.journal.Journal to record every change reported by child wrappers in
+    listeners -- List of ConfigListener objects to pass every change on to. The list is used as is, so listeners added
+                 to it later are notified as well.
+    """
+    __slots__ = ("_by_name", "_by_id", "_members", "_signature", "_journal", "_listeners")
+
+    def __init__(self, element, **kwargs):
+        XMLWrapper.__init__(self, element, element.tag, None, **kwargs)
+        self._by_name = None  # type: dict
+        self._by_id = None    # type: dict
+        self._members = None  # type: set
+        self._signature = None  # type: tuple
+        self._journal = kwargs.get("journal", None)
+        self._listeners = kwargs.get("listeners", None)  # type: list
+
+    def journal(self):
+        """
+        :return: The sdtd.journal.Journal changes are recorded in, or None if they are not recorded
+        """
+        return self._journal
+
+    def reindex(self):
+        """Rebuild the name and id indexes from the children of the root element"""
+        self._by_name = {}
+        self._by_id = {}
+        self._members = set()
+        for child in self._element:
+            self._index(child)
+        self._signature = sdtd.selector.child_signature(self._element)
+
+    def by_name(self, name: str, tag: str=None) -> ElementTree.Element:
+        """Get the first child of the root with the given name attribute
+        :param name: The name attribute to look up
+        :param tag: If given, only match children with this tag
+        :return: The matching element, or None if there is no such element
+        """
+        return self._lookup("name", name, tag)
+
+    def by_id(self, element_id, tag: str=None) -> ElementTree.Element:
+        """Get the first child of the root with the given id attribute
+        :param element_id: The id attribute to look up
+        :param tag: If given, only match children with this tag
+        :return: The matching element, or None if there is no such element
+        """
+        return self._lookup("id", str(element_id), tag)
+
+    def append(self, element: ElementTree.Element):
+        """Append a new child to the root element and index it
+        :param element: The element to append
+        """
+        self._element.append(element)
+        self._notify_append(self, self._element, element)
+
+    def child_path(self, element: ElementTree.Element) -> str:
+        """Get the path of a direct child of the root, in the same form XMLWrapper.__str__ produces
+        :param element: The child element
+        :return: The path of the child, addressed by its name attribute if it has one
+        """
+        name = element.get("name")
+        if name is None:
+            return "{}/{}".format(self._name, element.tag)
+        return "{}/{}".format(self._name, sdtd.selector.compile_selector(element.tag, {"name": name}).xpath)
+
+    def record_set(self, path: str, element: ElementTree.Element, attribute: str, old_value: str, value: str,
+                   chain=()):
+        """Report an attribute change made without going through a wrapper, such as by sdtd.rules
+
+        :param path: The path of the changed element
+        :param element: The changed element
+        :param attribute: The changed attribute
+        :param old_value: The previous value, None if the attribute is new
+        :param value: The new value
+        :param chain: The changed element followed by its ancestors, up to but not including the root
+        """
+        counters.mutations += 1
+        self._update_index(element, attribute, old_value, value)
+        if self._journal is not None:
+            self._journal.record_set(path, attribute, old_value, value, chain)
+        if self._listeners:
+            for listener in self._listeners:
+                listener.changed(self, list(chain), attribute, old_value, value)
+
+    def record_append(self, path: str, parent: ElementTree.Element, element: ElementTree.Element, chain=()):
+        """Report a new element added without going through a wrapper
+
+        :param path: The path of the parent element
+        :param parent: The parent element
+        :param element: The new element
+        :param chain: The parent element followed by its ancestors, up to but not including the root
+        """
+        counters.mutations += 1
+        if parent is self._element and self._by_name is not None:
+            self._index(element)
+            self._signature = sdtd.selector.child_signature(self._element)
+        if self._journal is not None:
+            self._journal.record_append(path, element, chain)
+        if self._listeners:
+            for listener in self._listeners:
+                listener.appended(self, list(chain), element)
+
+    def _lookup(self, attribute: str, key: str, tag: str):
+        if self._by_name is None or self._signature != sdtd.selector.child_signature(self._element):
+            self.reindex()
+        index = self._by_name if attribute == "name" else self._by_id
+        for elem in index.get(key, ()):
+            if elem.get(attribute) != key:
+                # Renamed directly on the raw element
+                self.reindex()
+                return self._lookup(attribute, key, tag)
+            if tag is None or elem.tag == tag:
+                return elem
+        return None
+
+    def _index(self, element: ElementTree.Element):
+        self._members.add(id(element))
+        for attribute, index in (("name", self._by_name), ("id", self._by_id)):
+            key = element.get(attribute)
+            if key is not None:
+                self._index_add(index, key, element)
+
+    def _index_add(self, index: dict, key: str, element: ElementTree.Element):
+        entries = index.setdefault(key, [])
+        entries.append(element)
+        if len(entries) > 1:
+            # Lookups return the first match in document order, same as Element.find(); only duplicated keys pay
+            # for the reordering
+            position = {id(child): i for i, child in enumerate(self._element)}
+            entries.sort(key=lambda e: position.get(id(e), len(position)))
+
+    @staticmethod
+    def _index_discard(index: dict, key: str, element: ElementTree.Element):
+        entries = index.get(key)
+        if entries is None:
+            return
+        entries[:] = [e for e in entries if e is not element]
+        if len(entries) == 0:
+            del index[key]
+
+    def _update_index(self, element, attribute, old_value, value):
+        if self._by_name is None or attribute not in ("name", "id") or id(element) not in self._members:
+            return
+        index = self._by_name if attribute == "name" else self._by_id
+        if old_value is not None:
+            self._index_discard(index, old_value, element)
+        self._index_add(index, value, element)
+
+    def _notify_set(self, source, element, attribute, old_value, value):
+        counters.mutations += 1
+        self._update_index(element, attribute, old_value, value)
+        if self._journal is not None:
+            self._journal.record_set(str(source), attribute, old_value, value, source._chain())
+        if self._listeners:
+            chain = self._below_root(source._chain())
+            for listener in self._listeners:
+                listener.changed(self, chain, attribute, old_value, value)
+
+    def _notify_append(self, source, parent, element):
+        counters.mutations += 1
+        if parent is self._element and self._by_name is not None:
+            self._index(element)
+            self._signature = sdtd.selector.child_signature(self._element)
+        if self._journal is not None:
+            self._journal.record_append(str(source), element, source._chain())
+        if self._listeners:
+            chain = self._below_root(source._chain())
+            for listener in self._listeners:
+                listener.appended(self, chain, element)
+
+    def _notify_remove(self, source, parent, element):
+        counters.mutations += 1
+        if parent is self._element and self._by_name is not None:
+            self._members.discard(id(element))
+            self._signature = sdtd.selector.child_signature(self._element)
+            for attribute, index in (("name", self._by_name), ("id", self._by_id)):
+                key = element.get(attribute)
+                if key is not None:
+                    self._index_discard(index, key, element)
+        if self._journal is not None:
+            chain = source._chain()
+            next(chain)
+            self._journal.record_remove(str(source), element, chain)
+        if self._listeners:
+            chain = self._below_root(source._chain())[1:]
+            for listener in self._listeners:
+                listener.removed(self, chain, element)
+
+    def _below_root(self, chain) -> list:
+        # Cut a wrapper chain off at the root element
+        result = []
+        for element in chain:
+            if element is self._element:
+                break
+            result.append(element)
+        return result
@@ -0,0 +1,293 @@
+import bisect
+import json
+import os.path
+import sdtd.output
+
+
+class IntervalSet(object):
+    """Set of non-negative integers stored as sorted, disjoint, half-open ranges
+
+    With n ranges, membership tests, overlaps() and first_gap() for a single value take O(log n). add() and remove()
+    find the ranges to change in O(log n) but splice the range lists in O(n), and len() and first_gap() for longer runs
+    walk the ranges in O(n). Config ids are mostly contiguous, so the whole vanilla id space usually fits in a handful
+    of ranges.
+    """
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, values=()):
+        """
+        :param values: Initial members
+        """
+        self._starts = []  # type: list
+        self._ends = []    # type: list
+        for value in sorted(set(values)):
+            if len(self._ends) > 0 and self._ends[-1] == value:
+                self._ends[-1] = value + 1
+            else:
+                self._starts.append(value)
+                self._ends.append(value + 1)
+
+    def __contains__(self, value: int) -> bool:
+        i = bisect.bisect_right(self._starts, value) - 1
+        return i >= 0 and value < self._ends[i]
+
+    def __len__(self):
+        return sum(end - start for start, end in zip(self._starts, self._ends))
+
+    def ranges(self) -> list:
+        """
+        :return: The list of (start, end) ranges, end exclusive
+        """
+        return list(zip(self._starts, self._ends))
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """
+        :param start: The first value of the range
+        :param end: The value after the last one
+        :return: If any value in [start, end) is a member
+        """
+        i = bisect.bisect_right(self._starts, start) - 1
+        if i >= 0 and start < self._ends[i]:
+            return True
+        return i + 1 < len(self._starts) and self._starts[i + 1] < end
+
+    def add(self, start: int, end: int=None):
+        """Add the values in [start, end)
+        :param start: The first value
+        :param end: The value after the last one, defaults to start + 1
+        """
+        end = start + 1 if end is None else end
+        if end <= start:
+            return
+        # Every range touching [start, end) is merged into one
+        low = bisect.bisect_left(self._ends, start)
+        high = bisect.bisect_right(self._starts, end)
+        if low < high:
+            start = min(start, self._starts[low])
+            end = max(end, self._ends[high - 1])
+        self._starts[low:high] = [start]
+        self._ends[low:high] = [end]
+
+    def remove(self, start: int, end: int=None):
+        """Remove the values in [start, end)
+        :param start: The first value
+        :param end: The value after the last one, defaults to start + 1
+        """
+        end = start + 1 if end is None else end
+        if end <= start:
+            return
+        low = bisect.bisect_right(self._ends, start)
+        high = bisect.bisect_left(self._starts, end)
+        if low >= high:
+            return
+        starts = []
+        ends = []
+        if self._starts[low] < start:
+            starts.append(self._starts[low])
+            ends.append(start)
+        if self._ends[high - 1] > end:
+            starts.append(end)
+            ends.append(self._ends[high - 1])
+        self._starts[low:high] = starts
+        self._ends[low:high] = ends
+
+    def first_gap(self, count: int=1, minimum: int=0) -> int:
+        """Find the lowest run of count consecutive non-members
+
+        :param count: The length of the run
+        :param minimum: The lowest value the run may start at
+        :return: The first value of the run
+        :raises ValueError: If count is not positive
+        """
+        if count <= 0:
+            raise ValueError("Can not find a run of {} values".format(count))
+        i = bisect.bisect_right(self._starts, minimum) - 1
+        candidate = minimum
+        if i >= 0 and candidate < self._ends[i]:
+            candidate = self._ends[i]
+        i += 1
+        while i < len(self._starts) and self._starts[i] - candidate < count:
+            candidate = max(candidate, self._ends[i])
+            i += 1
+        return candidate
+
+
+class IdAllocator(object):
+    """Hands out free item and block ids, and keeps them stable across builds
+
+    The ids in use are kept per kind ("items", "blocks") as an IntervalSet. Every id handed out is reserved for the name
+    it was asked for in an allocation file, and the same name gets the same ids on later builds, even when other mods
+    were added or removed in between. Reserved ids are never given to another name, whether or not the mod holding them
+    is part of the current build; release() frees them.
+    """
+    version = 1
+    file_name = ".sdtd-ids.json"
+
+    def __init__(self, used: dict=None, file_path: str=None, minimum: int=1):
+        """
+        :param used: Dict mapping kinds to the ids already used by the config, such as those of the vanilla items
+        :param file_path: The allocation file to read reservations from and save them to, if any
+        :param minimum: The lowest id handed out
+        """
+        self.file_path = file_path
+        self.minimum = minimum
+        self._used = {kind: IntervalSet(ids) for kind, ids in (used or {}).items()}
+        self._reserved = {}  # kind -> name -> (start, count)
+        self._changed = False
+        if file_path is not None and os.path.isfile(file_path):
+            self._read(file_path)
+
+    @staticmethod
+    def from_roots(roots: dict, file_path: str=None, minimum: int=1):
+        """Build an allocator from the ids used in loaded config roots
+
+        :param roots: Dict mapping kinds, such as "items", to root elements, whose children's id attributes are in use
+        :param file_path: The allocation file
+        :param minimum: The lowest id handed out
+        :return: The IdAllocator
+        """
+        used = {}
+        for kind, root in roots.items():
+            ids = used.setdefault(kind, [])
+            for element in root:
+                try:
+                    ids.append(int(element.get("id")))
+                except (TypeError, ValueError):
+                    pass
+        return IdAllocator(used, file_path, minimum)
+
+    def _read(self, file_path: str):
+        with open(file_path) as fp:
+            data = json.load(fp)
+        if data.get("version") != IdAllocator.version:
+            print("Warning: Ignoring allocation file '{}' with unknown version".format(file_path))
+            return
+        for kind, reservations in data.get("reserved", {}).items():
+            used = self._set(kind)
+            for name, (start, count) in reservations.items():
+                if used.overlaps(start, start + count):
+                    # The config took these ids since they were handed out, such as after a game update. Nothing has
+                    # been built with them yet, so dropping the reservation is enough.
+                    print("Warning: Reserved {} ids {}-{} of '{}' are used by the config, dropping the reservation; "
+                          "'{}' gets new ids when they are allocated again".format(kind, start, start + count - 1,
+                                                                                  name, name))
+                    self._changed = True
+                    continue
+                used.add(start, start + count)
+                self._reserved.setdefault(kind, {})[name] = (start, count)
+
+    def _set(self, kind: str) -> IntervalSet:
+        used = self._used.get(kind, None)
+        if used is None:
+            used = IntervalSet()
+            self._used[kind] = used
+        return used
+
+    def is_used(self, kind: str, value: int) -> bool:
+        """
+        :param kind: "items" or "blocks"
+        :param value: The id
+        :return: If the id is used by the config or reserved
+        """
+        return value in self._set(kind)
+
+    def claim(self, kind: str, value: int, count: int=1):
+        """Mark ids as used without reserving them, such as ids picked by hand
+        :param kind: "items" or "blocks"
+        :param value: The first id
+        :param count: The number of consecutive ids
+        :raises ValueError: If count is not positive
+        """
+        if count <= 0:
+            raise ValueError("Can not claim {} ids".format(count))
+        self._set(kind).add(value, value + count)
+
+    def allocate(self, kind: str, name: str, count: int=1) -> int:
+        """Get count consecutive free ids for name, reusing the ones reserved for it earlier
+
+        :param kind: "items" or "blocks"
+        :param name: The name to reserve the ids for, usually the name of the new item or block
+        :param count: The number of consecutive ids
+        :return: The first id
+        :raises ValueError: If count is not positive
+        """
+        if count <= 0:
+            raise ValueError("Can not allocate {} ids".format(count))
+        reservations = self._reserved.setdefault(kind, {})
+        reserved = reservations.get(name, None)
+        if reserved is not None:
+            if reserved[1] >= count:
+                return reserved[0]
+            # Asked for more than before, move the whole block
+            self._set(kind).remove(reserved[0], reserved[0] + reserved[1])
+        used = self._set(kind)
+        start = used.first_gap(count, self.minimum)
+        used.add(start, start + count)
+        reservations[name] = (start, count)
+        self._changed = True
+        return start
+
+    def release(self, kind: str, name: str):
+        """Drop the reservation of a name, making its ids available again
+        :param kind: "items" or "blocks"
+        :param name: The name the ids were reserved for
+        """
+        reserved = self._reserved.get(kind, {}).pop(name, None)
+        if reserved is not None:
+            self._set(kind).remove(reserved[0], reserved[0] + reserved[1])
+            self._changed = True
+
+    def merge(self, other) -> list:
+        """Take over the reservations another allocator made, such as one copied into a worker process
+
+        A reservation which conflicts with a reservation of this allocator, because its name already holds other ids
+        here or its ids are reserved for another name, is allocated again here once every other reservation was taken
+        over. Whatever was given the old ids has to be moved to the new ones, see GameData.merge_ids(). Ids merely used
+        by the config here are not a conflict, as the other allocator may have seen the config with those ids freed.
+
+        :param other: The IdAllocator to take reservations from
+        :return: List of (kind, name, old first id, new first id, count) for every reservation allocated again
+        """
+        conflicts = []
+        for kind, reservations in other._reserved.items():
+            mine = self._reserved.setdefault(kind, {})
+            used = self._set(kind)
+            reserved = IntervalSet()
+            for start, count in mine.values():
+                reserved.add(start, start + count)
+            for name, (start, count) in reservations.items():
+                if mine.get(name, None) == (start, count):
+                    continue
+                if name in mine or reserved.overlaps(start, start + count):
+                    conflicts.append((kind, name, start, count))
+                    continue
+                used.add(start, start + count)
+                reserved.add(start, start + count)
+                mine[name] = (start, count)
+                self._changed = True
+        return [(kind, name, start, self.allocate(kind, name, count), count) for kind, name, start, count in conflicts]
+
+    def reservations(self, kind: str) -> dict:
+        """
+        :param kind: "items" or "blocks"
+        :return: Dict mapping names to their (first id, count) reservations
+        """
+        return dict(self._reserved.get(kind, {}))
+
+    def save(self, file_path: str=None) -> bool:
+        """Write the reservations to the allocation file, if they changed since it was read
+
+        :param file_path: The file to write, defaults to the file the allocator was created with
+        :return: If the file was written
+        """
+        file_path = self.file_path if file_path is None else file_path
+        if file_path is None or not self._changed:
+            return False
+        data = {
+            "version": IdAllocator.version,
+            "reserved": {kind: {name: list(reservation) for name, reservation in sorted(reservations.items())}
+                         for kind, reservations in sorted(self._reserved.items())},
+        }
+        sdtd.output.write_bytes(file_path, json.dumps(data, indent=2).encode("utf-8"))
+        self._changed = False
+        return True
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import os.path
+
+
+def hash_file(file_path: str) -> str:
+    """Hash the contents of a file
+    :param file_path: The path of the file to hash
+    :return: The hex digest of the file contents, or None if the file does not exist
+    """
+    if not os.path.isfile(file_path):
+        return None
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as fp:
+        for block in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BuildManifest(object):
+    """Record of the inputs and outputs of a build, stored in the output directory
+
+    configs maps config file names (relative to the config directory) to their content hash. mods is the ordered list
+    of applied mods, each a dict with the mod path relative to the mods directory, its content hash and the config
+    files it accessed. outputs maps output file names to the hash of what was written.
+    """
+    file_name = ".sdtd-manifest.json"
+    version = 1
+
+    def __init__(self):
+        self.configs = {}  # type: dict
+        self.mods = []     # type: list
+        self.outputs = {}  # type: dict
+
+    @staticmethod
+    def read(directory: str):
+        """Read the manifest stored in directory
+        :param directory: The output directory of a previous build
+        :return: The stored BuildManifest, or an empty one if there is none or it can not be read
+        """
+        manifest = BuildManifest()
+        path = os.path.join(directory, BuildManifest.file_name)
+        try:
+            with open(path, "r") as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return manifest
+        if not isinstance(data, dict) or data.get("version") != BuildManifest.version:
+            return manifest
+        manifest.configs = data.get("configs", {})
+        manifest.mods = data.get("mods", [])
+        manifest.outputs = data.get("outputs", {})
+        return manifest
+
+    def write(self, directory: str):
+        """Store this manifest in directory
+        :param directory: The output directory of the build
+        """
+        data = {
+            "version": BuildManifest.version,
+            "configs": self.configs,
+            "mods": self.mods,
+            "outputs": self.outputs,
+        }
+        path = os.path.join(directory, BuildManifest.file_name)
+        with open(path, "w") as fp:
+            json.dump(data, fp, indent=1, sort_keys=True)
+
+    def mod_files(self) -> dict:
+        """
+        :return: Dict mapping each recorded mod path to the set of config files it accessed
+        """
+        return {mod["path"]: set(mod["files"]) for mod in self.mods}
+
+    def mod_hashes(self) -> dict:
+        """
+        :return: Dict mapping each recorded mod path to its content hash
+        """
+        return {mod["path"]: mod["hash"] for mod in self.mods}
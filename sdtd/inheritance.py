@@ -0,0 +1,193 @@
+import types
+import xml.etree.ElementTree as ElementTree
+from sdtd.elements import ConfigListener, ConfigRoot
+
+
+def own_properties(element: ElementTree.Element) -> dict:
+    """Collect the properties declared directly on an element
+
+    Properties inside property classes are keyed by their path, such as "Attributes/EntityDamage", the same form
+    sdtd.rules.find_property() accepts.
+
+    :param element: The element, such as an <item>
+    :return: Dict mapping property paths to values
+    """
+    properties = {}
+    pending = [(element, "")]
+    while len(pending) > 0:
+        parent, prefix = pending.pop()
+        for child in parent:
+            if child.tag != "property":
+                continue
+            name = child.get("name")
+            if name is not None:
+                properties[prefix + name] = child.get("value")
+            else:
+                class_name = child.get("class")
+                if class_name is not None:
+                    pending.append((child, prefix + class_name + "/"))
+    return properties
+
+
+class Inheritance(ConfigListener):
+    """Memoized resolution of Extends inheritance for the children of a root
+
+    An element with an Extends property inherits every property of the named element which it does not declare itself,
+    except those listed in the param1 attribute of the Extends property. Resolved property sets are computed once and
+    cached per element name, so resolving a whole catalog touches every element once.
+
+    The inheritance is registered as a listener of its ConfigRoot, see GameData.inheritance(). A change to an element
+    drops the cached properties of that element and of every element which inherited from it; nothing else is
+    recomputed. Changes made directly on raw elements are not seen, call invalidate() after making them.
+    """
+    def __init__(self, config_root: ConfigRoot, tag: str):
+        """
+        :param config_root: The root holding the elements, such as the items root
+        :param tag: The tag of the elements, such as "item"
+        """
+        self._config_root = config_root
+        self._tag = tag
+        self._resolved = {}  # name -> read-only resolved property mapping
+        self._parents = {}   # name -> name of the parent it was resolved against
+        self._children = {}  # name -> set of names which were resolved against it
+
+    def config_root(self) -> ConfigRoot:
+        """
+        :return: The root the inheritance is resolved in
+        """
+        return self._config_root
+
+    def properties(self, name: str):
+        """Get the effective properties of an element
+        :param name: The name attribute of the element
+        :return: Read-only mapping of property paths to values, or None if there is no such element
+        """
+        resolved = self._resolved.get(name, None)
+        if resolved is None:
+            resolved = self._resolve(name)
+        return resolved
+
+    def value(self, name: str, prop: str, default: str=None) -> str:
+        """Get the effective value of a single property
+        :param name: The name attribute of the element
+        :param prop: The property path, such as "Weight" or "Attributes/EntityDamage"
+        :param default: Returned if the element or property does not exist
+        :return: The value
+        """
+        properties = self.properties(name)
+        if properties is None:
+            return default
+        return properties.get(prop, default)
+
+    def resolve_all(self) -> dict:
+        """Resolve every element of the root
+        :return: Dict mapping element names to their read-only resolved property mappings
+        """
+        result = {}
+        for element in self._config_root.raw():
+            name = element.get("name")
+            if element.tag == self._tag and name is not None and name not in result:
+                result[name] = self.properties(name)
+        return result
+
+    def invalidate(self, name: str=None):
+        """Drop the cached properties of an element and of everything inheriting from it
+        :param name: The name of the element, or None to drop everything
+        """
+        if name is None:
+            self._resolved.clear()
+            self._parents.clear()
+            self._children.clear()
+            return
+        pending = [name]
+        while len(pending) > 0:
+            name = pending.pop()
+            if self._resolved.pop(name, None) is None and name not in self._children:
+                continue
+            parent = self._parents.pop(name, None)
+            if parent is not None and parent in self._children:
+                self._children[parent].discard(name)
+            pending.extend(self._children.pop(name, ()))
+
+    def _resolve(self, name: str):
+        # Walk up to the first cached or parentless ancestor, then resolve back down, so long chains don't recurse
+        chain = []
+        seen = set()
+        current = name
+        while current is not None and current not in self._resolved:
+            if current in seen:
+                print("Warning: Cyclic Extends through {} '{}'".format(self._tag, current))
+                break
+            seen.add(current)
+            element = self._config_root.by_name(current, self._tag)
+            if element is None:
+                if current == name:
+                    return None
+                print("Warning: {} '{}' extends missing {} '{}'".format(self._tag, chain[-1][0], self._tag, current))
+                break
+            chain.append((current, element))
+            current = _parent_name(element)
+
+        resolved = None
+        for child_name, element in reversed(chain):
+            parent = _parent_name(element)
+            own = own_properties(element)
+            if parent is not None and parent in self._resolved:
+                properties = dict(self._resolved[parent])
+                for excluded in _excluded(element):
+                    properties.pop(excluded, None)
+                    prefix = excluded + "/"
+                    for key in [key for key in properties if key.startswith(prefix)]:
+                        del properties[key]
+                properties.update(own)
+            else:
+                properties = own
+            if parent is not None:
+                # Also registered when the parent is missing, so adding it later invalidates this element
+                self._parents[child_name] = parent
+                self._children.setdefault(parent, set()).add(child_name)
+            resolved = types.MappingProxyType(properties)
+            self._resolved[child_name] = resolved
+        return self._resolved.get(name, resolved)
+
+    def _owner(self, chain: list) -> ElementTree.Element:
+        # The direct child of the root a change was made under
+        if len(chain) == 0:
+            return None
+        return chain[-1]
+
+    def changed(self, root, chain: list, attribute: str, old_value: str, value: str):
+        if root is not self._config_root:
+            return
+        owner = self._owner(chain)
+        if owner is None or owner.tag != self._tag:
+            return
+        if owner is chain[0] and attribute == "name":
+            self.invalidate(old_value)
+        self.invalidate(owner.get("name"))
+
+    def appended(self, root, chain: list, element: ElementTree.Element):
+        if root is not self._config_root:
+            return
+        owner = self._owner(chain) if len(chain) > 0 else element
+        if owner.tag == self._tag:
+            self.invalidate(owner.get("name"))
+
+    def removed(self, root, chain: list, element: ElementTree.Element):
+        self.appended(root, chain, element)
+
+
+def _parent_name(element: ElementTree.Element) -> str:
+    for child in element:
+        if child.tag == "property" and child.get("name") == "Extends":
+            return child.get("value")
+    return None
+
+
+def _excluded(element: ElementTree.Element) -> list:
+    for child in element:
+        if child.tag == "property" and child.get("name") == "Extends":
+            param = child.get("param1")
+            if param:
+                return [name.strip() for name in param.split(",") if name.strip()]
+    return []
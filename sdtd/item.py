@@ -1,8 +1,11 @@
 
+import sdtd.selector
 from sdtd.elements import *
 
 
 class ItemAttributes(PropertyClass):
+    __slots__ = ()
+
     def __init__(self, element, parent, **kwargs):
         PropertyClass.__init__(self, element, "Attributes", parent, **kwargs)
 
@@ -20,15 +23,18 @@ class ItemAttributes(PropertyClass):
 
 
 class Action(PropertyClass):
+    __slots__ = ("_action_id",)
+
     def __init__(self, element, action_id: int, parent=None, **kwargs):
-        PropertyClass.__init__(element, "action{}".format(action_id), parent, **kwargs)
+        PropertyClass.__init__(self, element, "Action{}".format(action_id), parent, **kwargs)
         self._action_id = action_id
 
 
 class Item(PropertyContainer):
-    def __init__(self, element, name, parent=None):
-        XMLWrapper.__init__(self, element, "item[@name='{}']".format(name), parent)
-        self._name = name
+    __slots__ = ("_id",)
+
+    def __init__(self, element, name, parent=None, **kwargs):
+        XMLWrapper.__init__(self, element, "item[@name='{}']".format(name), parent, **kwargs)
         self._id = None if element is None else element.get("id")
 
     def crafting_ingredient_time(self, create_if_missing: bool=False):
@@ -47,7 +53,7 @@ class Item(PropertyContainer):
         return self.get_property_name("EconomicValue", create_if_missing)
 
     def extends(self, create_if_missing: bool=False):
-        return self.get_property_name("Meshfile", create_if_missing)
+        return self.get_property_name("Extends", create_if_missing)
 
     def group(self, create_if_missing: bool=False):
         return self.get_property_name("Group", create_if_missing)
@@ -75,21 +81,16 @@ class Item(PropertyContainer):
 
     def attributes(self, create_if_missing: bool=False):
         create = create_if_missing or self._create_if_missing
-        if self._element is None:
-            return ItemAttributes(None, self, create_if_missing=create, log_object=self._logger)
-        elem = self.get_element("./property[@class='Attributes']")
-        return ItemAttributes(elem, self, create_if_missing=create, log_object=self._logger)
+        elem = sdtd.selector.find_child(self._element, "property", "class", "Attributes")
+        return self._child(ItemAttributes, elem, create_if_missing=create)
 
     def action0(self, create_if_missing: bool=True):
-        create = create_if_missing or self._create_if_missing
-        if self._element is None:
-            return Action(None, 0, self, create_if_missing=create, log_object=self._logger)
-        elem = self.get_element("./property[@class='Action0']")
-        return Action(elem, 0, self, create_if_missing=create, log_object=self._logger)
+        return self._action(0, create_if_missing)
 
     def action1(self, create_if_missing: bool=True):
+        return self._action(1, create_if_missing)
+
+    def _action(self, action_id: int, create_if_missing: bool):
         create = create_if_missing or self._create_if_missing
-        if self._element is None:
-            return Action(None, 0, self, create_if_missing=create, log_object=self._logger)
-        elem = self.get_element("./property[@class='Action1']")
-        return Action(elem, 1, self, create_if_missing=create, log_object=self._logger)
+        elem = sdtd.selector.find_child(self._element, "property", "class", "Action{}".format(action_id))
+        return self._child(Action, elem, action_id, create_if_missing=create)
@@ -0,0 +1,258 @@
+import copy
+import xml.etree.ElementTree as ElementTree
+import sdtd.selector
+from sdtd.verbatim import fingerprint
+
+
+class Mutation(object):
+    """A single recorded change to a config tree"""
+    __slots__ = ("op", "path", "attribute", "value", "element", "mod")
+
+    def __init__(self, op: str, path: str, attribute: str=None, value: str=None, element=None, mod: str=None):
+        """
+        :param op: One of "set", "setattribute", "removeattribute", "append" or "remove"
+        :param path: The path of the changed element, or of the parent for appends, as produced by XMLWrapper.__str__
+        :param attribute: The changed attribute, for set, setattribute and removeattribute
+        :param value: The new attribute value, for set and setattribute
+        :param element: The appended element, for append
+        :param mod: The name of the mod which made the change, if known
+        """
+        self.op = op
+        self.path = path
+        self.attribute = attribute
+        self.value = value
+        self.element = element  # type: ElementTree.Element
+        self.mod = mod
+
+    def root_tag(self) -> str:
+        """
+        :return: The tag of the root element the path starts at
+        """
+        return self.path.split("/", 1)[0]
+
+    def xpath(self) -> str:
+        """
+        :return: The absolute XPath this mutation targets, in the form used by game modlets
+        """
+        if self.op in ("set", "removeattribute"):
+            return "/{}/@{}".format(self.path, self.attribute)
+        return "/" + self.path
+
+
+class Journal(object):
+    """Ordered record of the changes made to the config trees
+
+    Changes are reported by ConfigRoot wrappers, so they cover changes made through XMLWrapper objects and the GameData
+    API. Changes made directly on raw ElementTree elements are not reported; with raw set, the direct children of every
+    root passed to watch() are fingerprinted instead, and unrecorded() finds the children which changed without the
+    journal hearing of it.
+
+    Changes inside an element appended earlier in the journal are not recorded separately; the append is written out
+    with the final state of the element instead.
+    """
+    def __init__(self, raw: bool=False):
+        """
+        :param raw: Fingerprint the roots passed to watch(), so unrecorded() can find changes made on raw elements
+        """
+        self.entries = []  # type: list
+        # Name of the mod currently being applied, stored with every recorded mutation
+        self.mod = None    # type: str
+        self._appended = {}  # id(element) -> Mutation
+        # root tag -> (root, children, their name attributes, their fingerprints, root attributes), set by watch()
+        self._baselines = {} if raw else None
+        # Ids of the elements a recorded change was made on or inside, and of the recorded removed elements
+        self._touched = set()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def watch(self, root_tag: str, root: ElementTree.Element):
+        """Take the state of a root before anything changes it, so unrecorded() can compare against it
+
+        Does nothing unless the journal was created with raw set. Costs a hash of every element of the root.
+
+        :param root_tag: The tag the root is known by
+        :param root: The root element, as parsed
+        """
+        if self._baselines is None:
+            return
+        children = list(root)
+        self._baselines[root_tag] = (root, children, [child.get("name") for child in children],
+                                     [fingerprint(child) for child in children], dict(root.attrib))
+
+    def record_set(self, path: str, attribute: str, old_value: str, value: str, chain=()):
+        """Record an attribute change
+        :param path: The path of the changed element
+        :param attribute: The changed attribute
+        :param old_value: The previous value, None if the attribute is new
+        :param value: The new value
+        :param chain: The changed element followed by its ancestors, used to skip changes inside appended elements
+        """
+        chain = self._touch(chain)
+        if self._inside_appended(chain):
+            return
+        op = "setattribute" if old_value is None else "set"
+        self.entries.append(Mutation(op, path, attribute, value, mod=self.mod))
+
+    def record_append(self, path: str, element: ElementTree.Element, chain=()):
+        """Record a new child element
+        :param path: The path of the parent element
+        :param element: The new element
+        :param chain: The parent element followed by its ancestors
+        """
+        chain = self._touch(chain)
+        if self._inside_appended(chain):
+            return
+        mutation = Mutation("append", path, element=element, mod=self.mod)
+        self._appended[id(element)] = mutation
+        self.entries.append(mutation)
+
+    def record_remove(self, path: str, element: ElementTree.Element, chain=()):
+        """Record the removal of an element
+        :param path: The path of the removed element
+        :param element: The removed element
+        :param chain: The parent of the removed element followed by its ancestors
+        """
+        chain = self._touch(chain, element)
+        if self._inside_appended(chain):
+            return
+        appended = self._appended.pop(id(element), None)
+        if appended is not None:
+            # The element only existed because of this journal, so forget about it entirely
+            self.entries.remove(appended)
+            return
+        self.entries.append(Mutation("remove", path, mod=self.mod))
+
+    def _touch(self, chain, removed: ElementTree.Element=None):
+        # Note the elements of chain, and the removed element, as described by the journal while roots are watched.
+        # Returns chain, as a list if it had to be read.
+        if self._baselines is None:
+            return chain
+        chain = list(chain)
+        self._touched.update(id(element) for element in chain if element is not None)
+        if removed is not None:
+            self._touched.add(id(removed))
+        return chain
+
+    def _inside_appended(self, chain) -> bool:
+        for element in chain:
+            if element is not None and id(element) in self._appended:
+                return True
+        return False
+
+    def root_tags(self) -> list:
+        """
+        :return: The sorted tags of every root with recorded changes
+        """
+        return sorted({mutation.root_tag() for mutation in self.entries})
+
+    def compacted(self) -> list:
+        """Get the entries with repeated changes to the same attribute collapsed into the last one
+
+        Changes to name and class attributes are kept as they are, since later paths may depend on them.
+
+        :return: The list of Mutation objects to write out
+        """
+        last = {}
+        for i, mutation in enumerate(self.entries):
+            if mutation.op in ("set", "setattribute") and mutation.attribute not in ("name", "class"):
+                last[(mutation.path, mutation.attribute)] = i
+        result = []
+        for i, mutation in enumerate(self.entries):
+            if mutation.op in ("set", "setattribute") and last.get((mutation.path, mutation.attribute), i) != i:
+                continue
+            result.append(mutation)
+        return result
+
+    def unrecorded(self, root_tag: str) -> list:
+        """Find the changes made to a watched root which were not recorded, such as ones made on raw elements
+
+        Children the journal recorded a change on or inside, and root attributes it recorded a change of, are trusted
+        to be described by the journal. Every other child which changed is replaced as a whole, by removing it and
+        appending its current state, so it ends up after the children which were not replaced. Children which were
+        removed or added are removed or appended, and changed attributes of the root are set or removed.
+
+        :param root_tag: The tag of a root passed to watch()
+        :return: The list of Mutation objects making the unrecorded changes, empty if the root was not watched
+        :raises ValueError: If a child without a name attribute was changed or removed, as it can not be addressed
+        """
+        if self._baselines is None or root_tag not in self._baselines:
+            return []
+        root, children, names, fingerprints, attrib = self._baselines[root_tag]
+        result = []
+        recorded = {mutation.attribute for mutation in self.entries if mutation.path == root_tag and
+                    mutation.op in ("set", "setattribute")}
+        for attribute, value in root.attrib.items():
+            if attribute not in recorded and attrib.get(attribute, None) != value:
+                op = "setattribute" if attribute not in attrib else "set"
+                result.append(Mutation(op, root_tag, attribute, value))
+        for attribute in attrib:
+            if attribute not in recorded and attribute not in root.attrib:
+                result.append(Mutation("removeattribute", root_tag, attribute))
+
+        current = {id(child) for child in root}
+        for child, name, expected in zip(children, names, fingerprints):
+            if id(child) in self._touched:
+                continue
+            removed = id(child) not in current
+            if not removed and fingerprint(child) == expected:
+                continue
+            if name is None:
+                raise ValueError("A <{}> without a name in '{}' was changed directly on the raw element, which can not "
+                                 "be expressed in a modlet".format(child.tag, root_tag))
+            result.append(Mutation("remove", "{}/{}".format(
+                root_tag, sdtd.selector.compile_selector(child.tag, {"name": name}).xpath)))
+            if not removed:
+                result.append(Mutation("append", root_tag, element=child))
+
+        known = {id(child) for child in children}
+        for child in root:
+            if id(child) not in known and id(child) not in self._appended:
+                result.append(Mutation("append", root_tag, element=child))
+        return result
+
+    def to_modlet(self, root_tag: str, unrecorded: list=None) -> ElementTree.Element:
+        """Build the XPath modlet applying the recorded changes to one root
+
+        :param root_tag: The root tag to build the modlet for, such as "items"
+        :param unrecorded: Mutations for the changes the journal did not record, see unrecorded(), which are written
+                           after the recorded ones
+        :return: A <configs> element holding set, setattribute, removeattribute, append and remove operations, with a
+                 comment naming the mod responsible before each run of operations from the same mod
+        """
+        configs = ElementTree.Element("configs")
+        configs.text = "\n\t"
+        last = None
+        mod = None
+        mutations = [mutation for mutation in self.compacted() if mutation.root_tag() == root_tag]
+        for i, mutation in enumerate(mutations + list(unrecorded or ())):
+            if i == len(mutations):
+                comment = ElementTree.Comment(" Changed directly on raw elements ")
+                comment.tail = "\n\t"
+                configs.append(comment)
+            elif mutation.mod is not None and mutation.mod != mod:
+                # Note which mod the following operations come from
+                mod = mutation.mod
+                comment = ElementTree.Comment(" {} ".format(mod.replace("--", "- -")))
+                comment.tail = "\n\t"
+                configs.append(comment)
+            if mutation.op == "set":
+                last = ElementTree.SubElement(configs, "set", {"xpath": mutation.xpath()})
+                last.text = mutation.value
+            elif mutation.op == "setattribute":
+                last = ElementTree.SubElement(configs, "setattribute", {"xpath": mutation.xpath(),
+                                                                        "name": mutation.attribute})
+                last.text = mutation.value
+            elif mutation.op == "removeattribute":
+                last = ElementTree.SubElement(configs, "removeattribute", {"xpath": mutation.xpath()})
+            elif mutation.op == "append":
+                last = ElementTree.SubElement(configs, "append", {"xpath": mutation.xpath()})
+                element = copy.deepcopy(mutation.element)
+                element.tail = None
+                last.append(element)
+            else:
+                last = ElementTree.SubElement(configs, "remove", {"xpath": mutation.xpath()})
+            last.tail = "\n\t"
+        if last is not None:
+            last.tail = "\n"
+        return configs
@@ -0,0 +1,123 @@
+import hashlib
+import importlib.util
+import marshal
+import os
+import os.path
+import re
+import sys
+import types
+import sdtd.output
+
+
+class ModLoader(object):
+    """Loads mod scripts as modules, caching their compiled code and reusing modules whose source did not change
+
+    Every mod gets its own module name, derived from its name and path, so it shows up under that name in tracebacks
+    and in sys.modules, and so loading one mod never replaces another.
+
+    Given a directory, compiled code is stored there keyed by a hash of the source, its path and the interpreter's
+    bytecode version, so an unchanged mod is never compiled twice, even across runs. Nothing is written to disk unless
+    a directory is given; pass ModLoader.default_directory() to use the per-user cache directory. Within one loader,
+    a mod whose source did not change since it was last loaded is not executed again and the same module object is
+    returned.
+    """
+    version = 1
+    # Prefix of the names the mod modules are registered under in sys.modules
+    prefix = "sdtd_mod"
+
+    def __init__(self, directory: str=None):
+        """
+        :param directory: The directory to store and reuse compiled code in, None to only compile in memory
+        """
+        self._directory = directory
+        self._modules = {}  # absolute path -> (source digest, module)
+        self.compiled = []  # type: list
+
+    @staticmethod
+    def default_directory() -> str:
+        """
+        :return: The default directory for compiled mod code for the current user
+        """
+        root = os.environ.get("XDG_CACHE_HOME", None) or os.environ.get("LOCALAPPDATA", None)
+        if root is None:
+            root = os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(root, "sdtd-modtool", "mods")
+
+    @staticmethod
+    def module_name(file_path: str, name: str=None) -> str:
+        """Get the module name a mod script is loaded as
+        :param file_path: The path of the mod script
+        :param name: The name of the mod, defaults to the file name without extension
+        :return: A module name which is the same every time for the same script, and differs between scripts
+        """
+        if name is None:
+            name = os.path.splitext(os.path.basename(file_path))[0]
+        identifier = re.sub(r"\W", "_", name)
+        if identifier[:1].isdigit():
+            identifier = "_" + identifier
+        digest = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:8]
+        return "{}_{}_{}".format(ModLoader.prefix, identifier, digest)
+
+    def load(self, file_path: str, name: str=None) -> types.ModuleType:
+        """Load a mod script, reusing the loaded module if the source did not change
+
+        Exceptions raised while compiling or executing the script are passed on, and leave nothing in sys.modules.
+
+        :param file_path: The path of the mod script
+        :param name: The name of the mod, see module_name()
+        :return: The module
+        """
+        path = os.path.abspath(file_path)
+        with open(path, "rb") as fp:
+            source = fp.read()
+        digest = hashlib.sha256(source).hexdigest()
+        loaded = self._modules.get(path, None)
+        if loaded is not None and loaded[0] == digest:
+            return loaded[1]
+
+        code = self._code(path, source, digest)
+        module_name = ModLoader.module_name(path, name)
+        spec = importlib.util.spec_from_loader(module_name, loader=None, origin=path)
+        module = importlib.util.module_from_spec(spec)
+        module.__file__ = path
+        sys.modules[module_name] = module
+        try:
+            exec(code, module.__dict__)
+        except BaseException:
+            del sys.modules[module_name]
+            self._modules.pop(path, None)
+            raise
+        self._modules[path] = (digest, module)
+        return module
+
+    def forget(self, file_path: str=None):
+        """Drop loaded modules, so they are executed again the next time they are loaded
+        :param file_path: The mod script to forget, or None to forget every mod
+        """
+        paths = list(self._modules) if file_path is None else [os.path.abspath(file_path)]
+        for path in paths:
+            entry = self._modules.pop(path, None)
+            if entry is not None:
+                sys.modules.pop(entry[1].__name__, None)
+
+    def _code(self, path: str, source: bytes, digest: str) -> types.CodeType:
+        entry_path = None
+        if self._directory is not None:
+            key = hashlib.sha256("{}\0{}\0{}\0{}".format(ModLoader.version, importlib.util.MAGIC_NUMBER.hex(), path,
+                                                         digest).encode("utf-8")).hexdigest()
+            entry_path = os.path.join(self._directory, key[:2], key + ".bin")
+            try:
+                with open(entry_path, "rb") as fp:
+                    return marshal.load(fp)
+            except (OSError, EOFError, ValueError, TypeError):
+                pass
+
+        code = compile(source, path, "exec", dont_inherit=True)
+        self.compiled.append(path)
+        if entry_path is not None:
+            try:
+                os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+                sdtd.output.write_bytes(entry_path, marshal.dumps(code))
+            except OSError as e:
+                print("Warning: Could not cache compiled mod '{}': {}".format(path, e))
+        return code
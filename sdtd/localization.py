@@ -0,0 +1,331 @@
+import csv
+import io
+import os
+import sdtd.output
+
+# The name of the localization file in the config directory
+localization_name = "Localization.txt"
+
+_chunk_size = 1 << 20
+
+
+class Localization(object):
+    """Indexed view of the game's Localization.txt, with changes made by mods kept on top of it
+
+    The file is scanned once, the first time it is used, recording only the key and the byte range of every record.
+    The language columns of a record are only decoded when the record is looked up, reading it from a handle which is
+    kept open until close() is called. Records may span several lines when a quoted value contains line breaks.
+
+    When a key appears more than once, the first record is used, as the game does, and a warning is printed. Changing
+    or removing such a key also drops its later records from the output, so the file keeps only the changed record.
+
+    Changes are kept apart from the file, so discard() goes back to the vanilla contents without reading it again.
+    write() copies the file in one pass, passing the bytes of every record which was not changed through verbatim and
+    appending new keys at the end.
+    """
+    def __init__(self, file_path: str, name: str=localization_name, accessed: set=None):
+        """
+        :param file_path: The path of the Localization.txt file
+        :param name: The name of the file relative to the config directory, used for output and for accessed
+        :param accessed: If given, name is added to this set every time the localization is read or changed
+        """
+        self.path = file_path
+        self.name = name
+        self._accessed = accessed
+        self._header = None   # type: list
+        self._columns = None  # type: dict
+        self._index = None    # type: dict
+        # key -> byte ranges of the records after the first one, for keys which appear more than once
+        self._duplicates = {}
+        # Handle of the file, opened by the first lookup, and the process which opened it
+        self._file = None
+        self._file_pid = None
+        self._newline = "\n"
+        # key -> list of column values, or None if the key was removed. New keys are written in insertion order.
+        self._changes = {}
+        # key -> dict of column index -> value, or None if the key was removed, while record_edits() is active
+        self._edits = None
+
+    def __getstate__(self):
+        # The handle can not be sent to worker processes, copies open their own
+        state = dict(self.__dict__)
+        state["_file"] = None
+        return state
+
+    def close(self):
+        """Close the handle used to read records, it is opened again if the localization is used later"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _source(self):
+        if self._file is not None and self._file_pid != os.getpid():
+            # Forked workers would share the position of the parent's handle
+            self._file = None
+        if self._file is None:
+            self._file = open(self.path, "rb")
+            self._file_pid = os.getpid()
+        return self._file
+
+    def _use(self):
+        if self._accessed is not None:
+            self._accessed.add(self.name)
+        if self._index is None:
+            self._scan()
+
+    def _scan(self):
+        index = {}
+        duplicates = {}
+        with open(self.path, "rb") as fp:
+            header = fp.readline()
+            self._newline = "\r\n" if header.endswith(b"\r\n") else "\n"
+            self._header = _parse(header.decode("utf-8-sig"))
+            offset = len(header)
+            start = None
+            first = None
+            quotes = 0
+            for line in fp:
+                if start is None:
+                    start = offset
+                    first = line
+                    quotes = 0
+                quotes += line.count(b"\"")
+                offset += len(line)
+                if quotes % 2 == 0:
+                    # An even number of quotes means no quoted value continues on the next line
+                    if first.startswith(b"\""):
+                        key = _parse(first.decode("utf-8"))[0]
+                    else:
+                        key = first.split(b",", 1)[0].rstrip(b"\r\n").decode("utf-8")
+                    if key in index:
+                        duplicates.setdefault(key, []).append((start, offset))
+                    elif key != "":
+                        index[key] = (start, offset)
+                    start = None
+        self._columns = {column: i for i, column in enumerate(self._header)}
+        self._index = index
+        self._duplicates = duplicates
+        if len(duplicates) > 0:
+            keys = sorted(duplicates)
+            print("Warning: {} key(s) appear more than once in '{}', using the first record of each: {}{}".format(
+                len(keys), self.name, ", ".join(keys[:5]), ", ..." if len(keys) > 5 else ""))
+
+    def header(self) -> list:
+        """
+        :return: The column names, starting with "Key"
+        """
+        self._use()
+        return list(self._header)
+
+    def __contains__(self, key: str) -> bool:
+        self._use()
+        if key in self._changes:
+            return self._changes[key] is not None
+        return key in self._index
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self) -> list:
+        """
+        :return: Every key, in the order the keys will be written
+        """
+        self._use()
+        keys = [key for key in self._index if self._changes.get(key, True) is not None]
+        keys.extend(key for key, row in self._changes.items() if row is not None and key not in self._index)
+        return keys
+
+    def _row(self, key: str):
+        if key in self._changes:
+            return self._changes[key]
+        span = self._index.get(key, None)
+        if span is None:
+            return None
+        source = self._source()
+        source.seek(span[0])
+        return _parse(source.read(span[1] - span[0]).decode("utf-8"))
+
+    def get(self, key: str, column: str="english") -> str:
+        """
+        :param key: The localization key, such as an item name
+        :param column: The column to get, such as "english" or "german"
+        :return: The value, or None if there is no such key or column
+        """
+        self._use()
+        row = self._row(key)
+        i = self._columns.get(column, None)
+        if row is None or i is None or i >= len(row):
+            return None
+        return row[i]
+
+    def row(self, key: str) -> dict:
+        """
+        :param key: The localization key
+        :return: Dict mapping the column names to the values of the key, or None if there is no such key
+        """
+        self._use()
+        row = self._row(key)
+        if row is None:
+            return None
+        return dict(zip(self._header, row))
+
+    def set(self, key: str, values: dict=None, **columns):
+        """Add a key, or override columns of an existing one
+
+        Columns which are not given keep their current value, or are left empty for new keys.
+
+        :param key: The localization key, such as the name of a new item
+        :param values: Dict mapping column names to values
+        :param columns: More column values, such as english="Steel Spear"
+        """
+        self._use()
+        row = self._row(key)
+        row = [key] + [""] * (len(self._header) - 1) if row is None else list(row)
+        if len(row) < len(self._header):
+            row.extend([""] * (len(self._header) - len(row)))
+        for column, value in dict(values or {}, **columns).items():
+            i = self._columns.get(column, None)
+            if i is None or i == 0:
+                print("Warning: Localization has no column '{}', ignoring it for key '{}'".format(column, key))
+                continue
+            row[i] = value
+            if self._edits is not None and self._edits.get(key, {}) is not None:
+                self._edits.setdefault(key, {})[i] = value
+        if self._edits is not None and self._edits.get(key, {}) is None:
+            # Removed and added again, so none of the columns from before the removal survive
+            self._edits[key] = dict(enumerate(row))
+        self._changes[key] = row
+
+    def remove(self, key: str):
+        """
+        :param key: The localization key to remove
+        """
+        self._use()
+        if self._edits is not None:
+            self._edits[key] = None
+        if key in self._index:
+            self._changes[key] = None
+        else:
+            self._changes.pop(key, None)
+
+    def changed(self) -> bool:
+        """
+        :return: If any key was added, changed or removed since the file was read or discard() was called
+        """
+        return len(self._changes) > 0
+
+    def discard(self):
+        """Drop every change, going back to the contents of the file"""
+        self._changes = {}
+
+    def record_edits(self):
+        """Start recording the cells changed by set() and remove(), dropping any earlier record, see edits()"""
+        self._edits = {}
+
+    def edits(self) -> dict:
+        """
+        :return: The cells changed since record_edits() was called, as dict mapping keys to dicts of column index ->
+                 value, or to None for removed keys
+        """
+        return {} if self._edits is None else self._edits
+
+    def apply_edits(self, edits: dict):
+        """Apply the cells changed in another copy of the same file, such as one in a worker process
+
+        Only the recorded cells are replaced, so columns of the same key which were changed elsewhere are kept.
+
+        :param edits: The edits() of the other copy
+        """
+        if len(edits) == 0:
+            return
+        self._use()
+        for key, cells in edits.items():
+            if cells is None:
+                self.remove(key)
+                continue
+            row = self._row(key)
+            if row is None or 0 in cells:
+                row = [key] + [""] * (len(self._header) - 1)
+            else:
+                row = list(row)
+            if len(row) < len(self._header):
+                row.extend([""] * (len(self._header) - len(row)))
+            for i, value in cells.items():
+                row[i] = value
+            self._changes[key] = row
+
+    def write(self, file_path: str) -> bool:
+        """Write the localization with every change applied
+
+        :param file_path: The path to write to
+        :return: If the file was written, False if it already had the same contents
+        """
+        return sdtd.output.write_file(file_path, self._write_to)
+
+    def _write_to(self, file_path: str):
+        if len(self._changes) == 0:
+            # Changes always scan the file first, so without any there may be no index
+            with open(self.path, "rb") as source, open(file_path, "wb", buffering=_chunk_size) as output:
+                _copy(source, output, None)
+            return
+        spans = []
+        for key in self._changes:
+            if key in self._index:
+                spans.append((self._index[key], key))
+                # Later records of the same key would hide the change from tools which use the last one
+                spans.extend((span, None) for span in self._duplicates.get(key, []))
+        spans.sort(key=lambda span: span[0])
+        source = self._source()
+        source.seek(0)
+        with open(file_path, "wb", buffering=_chunk_size) as output:
+            position = 0
+            last = b""
+            for (start, end), key in spans:
+                last = _copy(source, output, start - position) or last
+                source.seek(end)
+                position = end
+                if key is not None and self._changes[key] is not None:
+                    last = self._format(self._changes[key])
+                    output.write(last)
+            last = _copy(source, output, None) or last
+            rows = [row for key, row in self._changes.items() if row is not None and key not in self._index]
+            if len(rows) > 0 and not last.endswith(b"\n"):
+                # The last record of the file had no line break
+                output.write(self._newline.encode("utf-8"))
+            for row in rows:
+                output.write(self._format(row))
+
+    def write_changes(self, file_path: str) -> bool:
+        """Write only the header and the added or changed keys, as game modlets ship their localization
+
+        Removed keys can not be expressed this way and are left out.
+
+        :param file_path: The path to write to
+        :return: If the file was written
+        """
+        self._use()
+        rows = [self._header] + [row for row in self._changes.values() if row is not None]
+        return sdtd.output.write_bytes(file_path, b"".join(self._format(row) for row in rows))
+
+    def _format(self, row: list) -> bytes:
+        text = io.StringIO()
+        csv.writer(text, lineterminator=self._newline).writerow(row)
+        return text.getvalue().encode("utf-8")
+
+
+def _parse(text: str) -> list:
+    return next(csv.reader(io.StringIO(text)), [])
+
+
+def _copy(source, output, size) -> bytes:
+    # Copy size bytes from source to output, or everything which is left if size is None. Returns the last chunk.
+    last = b""
+    while size is None or size > 0:
+        chunk = source.read(_chunk_size if size is None else min(size, _chunk_size))
+        if len(chunk) == 0:
+            break
+        output.write(chunk)
+        last = chunk
+        if size is not None:
+            size -= len(chunk)
+    return last
@@ -1,7 +1,21 @@
+import atexit
+import queue
+import sys
+import threading
+
+# Message levels, a logger drops every message below its own level
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
 
 class Logger(object):
-    def __init__(self):
-        pass
+    def __init__(self, level: int=INFO):
+        """
+        :param level: The lowest level of messages passed on by log() and the level shorthands
+        """
+        self.level = level
 
     def print(self, line: str):
         """Print a line into this log object
@@ -17,10 +31,58 @@ class Logger(object):
         """
         self.print(fmt.format(*args, **kwargs))
 
+    def enabled(self, level: int) -> bool:
+        """
+        :param level: The level of a message
+        :return: If messages of the given level are passed on by this logger
+        """
+        return level >= self.level
+
+    def log(self, level: int, fmt: str, *args, **kwargs):
+        """Print a line formatted with the given arguments, if the level is enabled
+
+        The message is only formatted if it is passed on, so disabled messages cost no more than the level check.
+
+        :param level: The level of the message, such as sdtd.log.WARNING
+        :param fmt: The format string to print, without the trailing newline
+        :param args: The positional arguments to format into fmt
+        :param kwargs: The keyword arguments to format into fmt
+        """
+        if level >= self.level:
+            self.print(fmt.format(*args, **kwargs) + "\n")
+
+    def debug(self, fmt: str, *args, **kwargs):
+        self.log(DEBUG, fmt, *args, **kwargs)
+
+    def info(self, fmt: str, *args, **kwargs):
+        self.log(INFO, fmt, *args, **kwargs)
+
+    def warning(self, fmt: str, *args, **kwargs):
+        self.log(WARNING, fmt, *args, **kwargs)
+
+    def error(self, fmt: str, *args, **kwargs):
+        self.log(ERROR, fmt, *args, **kwargs)
+
+    def write(self, level: int, line: str):
+        """Print an already formatted line, if the level is enabled
+        :param level: The level of the line, or None to print it regardless of level
+        :param line: The line to print, including its trailing newline
+        """
+        if level is None or level >= self.level:
+            self.print(line)
+
+    def flush(self):
+        """Push out anything this logger is holding back"""
+        pass
+
+    def close(self):
+        """Flush and release whatever the logger writes to"""
+        self.flush()
+
 
 class PrintLogger(Logger):
-    def __init__(self):
-        Logger.__init__(self)
+    def __init__(self, level: int=INFO):
+        Logger.__init__(self, level)
 
     def print(self, line: str):
         """Print a line into this log object
@@ -28,12 +90,22 @@ class PrintLogger(Logger):
         """
         print(line, end="")
 
+    def flush(self):
+        sys.stdout.flush()
+
 
 class FileLogger(Logger):
     def __init__(self, filename, **kwargs):
-        Logger.__init__(self)
+        """
+        Keyword arguments:
+        append -- Append to the file instead of truncating it
+        level -- The lowest level of messages passed on, defaults to sdtd.log.INFO
+        buffering -- The buffer size of the file, passed on to open()
+        """
+        Logger.__init__(self, kwargs.get("level", INFO))
         self._filename = filename
         self._append = kwargs.get("append", False)
+        self._buffering = kwargs.get("buffering", -1)
         self._fp = None
 
         # Open the file handle
@@ -51,7 +123,7 @@ class FileLogger(Logger):
     def open(self):
         """Open the backing file if it is not already open"""
         if self._fp is None:
-            self._fp = open(self._filename, "a" if self._append else "w")
+            self._fp = open(self._filename, "a" if self._append else "w", buffering=self._buffering)
 
     def close(self):
         """Close the backing file if it is not already closed"""
@@ -62,10 +134,14 @@ class FileLogger(Logger):
     def print(self, line):
         self._fp.write(line)
 
+    def flush(self):
+        if self._fp is not None:
+            self._fp.flush()
+
 
 class MultiplexingLogger(Logger):
-    def __init__(self, loggers = None):
-        Logger.__init__(self)
+    def __init__(self, loggers = None, level: int=DEBUG):
+        Logger.__init__(self, level)
         self._loggers = list() if loggers is None else loggers
 
     def add(self, logger: Logger):
@@ -74,3 +150,131 @@ class MultiplexingLogger(Logger):
     def print(self, line):
         for logger in self._loggers:
             logger.print(line)
+
+    def write(self, level: int, line: str):
+        if level is None or level >= self.level:
+            for logger in self._loggers:
+                logger.write(level, line)
+
+    def log(self, level: int, fmt: str, *args, **kwargs):
+        # Format once, and only hand the line to the loggers which want it
+        if level < self.level:
+            return
+        line = None
+        for logger in self._loggers:
+            if logger.enabled(level):
+                if line is None:
+                    line = fmt.format(*args, **kwargs) + "\n"
+                logger.write(level, line)
+
+    def flush(self):
+        for logger in self._loggers:
+            logger.flush()
+
+    def close(self):
+        for logger in self._loggers:
+            logger.close()
+
+
+class QueueLogger(Logger):
+    """Logger which hands lines to a background thread, which writes them to another logger in batches
+
+    Printing only puts the line on a queue, so the caller never waits on the file or terminal. The background thread
+    joins the lines of the same level queued since its last write into a single write() call on the target, so
+    loggers below a MultiplexingLogger still only get the levels they want, and flushes the target afterwards.
+    close() is registered to run at exit, so queued lines are not lost when the program ends without closing the logger.
+    """
+    # Queued by flush() and close(); the background thread sets the event once everything before it is written
+    _flush = object()
+    _stop = object()
+
+    def __init__(self, target: Logger, level: int=None, batch_size: int=1024):
+        """
+        :param target: The logger to write to, such as a FileLogger or MultiplexingLogger. It is only used from the
+                       background thread until close() returns, and is closed along with this logger.
+        :param level: The lowest level of messages passed on, defaults to the level of target
+        :param batch_size: The maximum number of lines joined into a single write
+        """
+        Logger.__init__(self, target.level if level is None else level)
+        self._target = target
+        self._batch_size = batch_size
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="sdtd-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level and self._target.enabled(level)
+
+    def log(self, level: int, fmt: str, *args, **kwargs):
+        if level >= self.level and self._target.enabled(level):
+            self._queue.put((level, fmt.format(*args, **kwargs) + "\n"))
+
+    def write(self, level: int, line: str):
+        if level is None or level >= self.level:
+            self._queue.put((level, line))
+
+    def print(self, line: str):
+        self._queue.put((None, line))
+
+    def flush(self):
+        """Wait until every line queued so far has been written and flushed by the target"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put((self._flush, done))
+        done.wait()
+
+    def close(self):
+        """Write out every queued line, stop the background thread and close the target"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((self._stop, threading.Event()))
+        self._thread.join()
+        self._target.close()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        item = None
+        while True:
+            if item is None:
+                item = self._queue.get()
+            level, line = item
+            if level is self._flush or level is self._stop:
+                # Lines written just before may not have been flushed yet, when more lines followed them
+                try:
+                    self._target.flush()
+                except Exception as e:
+                    print("Exception Encountered while flushing log: {}".format(e), file=sys.stderr)
+                line.set()
+                if level is self._stop:
+                    return
+                item = None
+                continue
+
+            # Gather the following lines of the same level, leaving the first other item for the next round
+            lines = [line]
+            item = None
+            while len(lines) < self._batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+                    break
+                if item[0] != level:
+                    break
+                lines.append(item[1])
+                item = None
+            try:
+                self._target.write(level, "".join(lines))
+                if item is None:
+                    self._target.flush()
+            except Exception as e:
+                # Keep draining the queue, a dead thread would leave flush() and close() waiting forever
+                print("Exception Encountered while writing log: {}".format(e), file=sys.stderr)
+
+
+# Shared logger used by objects which are not given one, such as XMLWrapper instances created without a log_object
+default_logger = PrintLogger()
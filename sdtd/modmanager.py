@@ -1,113 +1,1127 @@
 
-import importlib.util
+import concurrent.futures
+import contextlib
+import multiprocessing
 import os
 import os.path
+import shutil
+import time
 import xml.etree.ElementTree as ElementTree
+import sdtd.log
+import sdtd.output
+from sdtd.config import ConfigFile, ConfigMap, read_root_tag
+from sdtd.elements import ConfigRoot, WrapperCache
+from sdtd.ids import IdAllocator
+from sdtd.incremental import BuildManifest, hash_file
+from sdtd.inheritance import Inheritance, own_properties
 from sdtd.item import Item
+from sdtd.journal import Journal
+from sdtd.loader import ModLoader
+from sdtd.localization import Localization, localization_name
+from sdtd.mods import ModInfo, mod_name, order_mods, plan_batches
+from sdtd.profiles import build_profiles
+from sdtd.profiling import BuildProfile
+from sdtd.rules import Rule, apply_rules
+from sdtd.selector import compile_selector, find_child
+from sdtd.stream import stream_transform
+from sdtd.table import PropertyTable
+from sdtd.verbatim import ChangeTracker, SourceMap, fingerprint
+from sdtd.validate import validate
+from sdtd.watch import Watcher
+from sdtd.xref import CrossReferences, sources
 
 
 class GameData(object):
-    def __init__(self):
+    def __init__(self, wrapper_cache: WrapperCache=None):
+        """
+        :param wrapper_cache: If given, wrappers handed out by find_item and the wrappers below them are interned in
+                              this cache, so repeated lookups of the same element return the same object
+        """
         self.roots = {}
-        self.items = None
-        self.recipes = None
-        self.blocks = None
+        self.wrapper_cache = wrapper_cache
+        # If set, every change made through wrappers and the GameData API is recorded in this sdtd.journal.Journal
+        self.journal = None
+        # The sdtd.localization.Localization of the loaded config, None if it has no Localization.txt
+        self.localization = None
+        # If set, the sdtd.verbatim.ChangeTracker recording which elements were changed, so unchanged ones can be
+        # written as they were in the source
+        self.changes = None
+        self._indexes = {}
+        # sdtd.elements.ConfigListener objects notified of every change made through the ConfigRoot wrappers
+        self._listeners = []
+        self._inheritance = {}
+        self._cross_references = None
+        # The allocation file ids handed out by id_allocator() are reserved in, see sdtd.ids.IdAllocator
+        self.id_file = None
+        self._ids = None
+
+    @property
+    def items(self):
+        return self.roots.get("items", None)
+
+    @property
+    def recipes(self):
+        return self.roots.get("recipes", None)
+
+    @property
+    def blocks(self):
+        return self.roots.get("blocks", None)
 
     def post_load(self):
-        self.items = self.roots.get("items", None)
-        self.recipes = self.roots.get("recipes", None)
-        self.blocks = self.roots.get("blocks", None)
+        # Roots may be parsed lazily, so the indexes are built by config_root() on first use instead of here
+        self._indexes = {}
+        if self.localization is not None:
+            self.localization.discard()
+        self._listeners.clear()
+        if self.changes is not None:
+            self.changes.clear()
+            self._listeners.append(self.changes)
+        self._inheritance = {}
+        self._cross_references = None
+        self._ids = None
+
+    def config_root(self, tag: str):
+        """Get the ConfigRoot wrapper for a root tag
+
+        The name and id indexes of the root are built the first time they are used.
+
+        :param tag: The root tag, such as "items"
+        :return: The ConfigRoot for the tag, or None if there is no such root
+        """
+        root = self.roots.get(tag, None)
+        config_root = self._indexes.get(tag, None)
+        if root is None:
+            return None
+        if config_root is None or config_root.raw() is not root or config_root.journal() is not self.journal:
+            config_root = ConfigRoot(root, wrapper_cache=self.wrapper_cache, journal=self.journal,
+                                     listeners=self._listeners)
+            self._indexes[tag] = config_root
+        return config_root
+
+    def root_changed(self, tag: str):
+        """Drop the wrapper and indexes of a root whose children were replaced directly
+
+        The ConfigRoot, and the inheritance resolvers and cross references built on it, are rebuilt on next use.
+
+        :param tag: The root tag, such as "items"
+        """
+        self._indexes.pop(tag, None)
+
+    def inheritance(self, root_tag: str="items", tag: str=None) -> Inheritance:
+        """Get the Extends inheritance resolver for a root
+
+        Resolvers are kept up to date with changes made through wrappers and the GameData API, and rebuilt when the
+        root is replaced.
+
+        :param root_tag: The root tag, such as "items" or "blocks"
+        :param tag: The tag of the inheriting elements, defaults to root_tag without the trailing "s"
+        :return: The sdtd.inheritance.Inheritance for the root, or None if there is no such root
+        """
+        config_root = self.config_root(root_tag)
+        if config_root is None:
+            return None
+        tag = tag or root_tag[:-1]
+        inheritance = self._inheritance.get((root_tag, tag), None)
+        if inheritance is None or inheritance.config_root() is not config_root:
+            if inheritance is not None:
+                self._listeners.remove(inheritance)
+            inheritance = Inheritance(config_root, tag)
+            self._inheritance[(root_tag, tag)] = inheritance
+            self._listeners.append(inheritance)
+        return inheritance
+
+    def effective_properties(self, name: str, root_tag: str="items"):
+        """Get the properties of an item or block with everything it inherits through Extends filled in
+        :param name: The name of the item or block
+        :param root_tag: "items" or "blocks"
+        :return: Read-only mapping of property paths, such as "Attributes/EntityDamage", to values, or None if there is
+                 no such element
+        """
+        inheritance = self.inheritance(root_tag)
+        if inheritance is None:
+            return None
+        return inheritance.properties(name)
+
+    def cross_references(self) -> CrossReferences:
+        """Get the index of which recipes, blocks and loot groups refer to each item
+
+        The index is built in one pass the first time it is asked for, kept up to date with changes made through
+        wrappers and the GameData API, and rebuilt when one of its roots is replaced.
+
+        :return: The sdtd.xref.CrossReferences index
+        """
+        config_roots = {}
+        for root_tag in sources:
+            config_root = self.config_root(root_tag)
+            if config_root is not None:
+                config_roots[root_tag] = config_root
+        index = self._cross_references
+        if index is None or index.config_roots() != config_roots:
+            if index is not None:
+                self._listeners.remove(index)
+            index = CrossReferences(config_roots)
+            self._cross_references = index
+            self._listeners.append(index)
+        return index
+
+    def validate(self) -> list:
+        """Check the references between the loaded config files, see sdtd.validate.validate()
+
+        If a journal is recording changes, each finding names the mod which made the offending change, if any.
+
+        :return: The list of sdtd.validate.Finding objects, empty if every reference resolves
+        """
+        return validate(self.roots, self.journal)
 
     def find_item(self, name: str):
-        if self.items is None:
+        items = self.config_root("items")
+        if items is None:
             return Item(None, name)
-        item = self.items.find("./item[@name='{}']".format(name))
+        return items._child(Item, items.by_name(name, "item"), name)
+
+    def id_allocator(self) -> IdAllocator:
+        """Get the allocator handing out free item and block ids
+
+        The allocator is built from the ids of the loaded items and blocks the first time it is asked for, and reads
+        and keeps its reservations in id_file.
 
-        return Item(item, name)
+        :return: The sdtd.ids.IdAllocator
+        """
+        if self._ids is None:
+            roots = {tag: self.roots[tag] for tag in ("items", "blocks") if self.roots.get(tag, None) is not None}
+            self._ids = IdAllocator.from_roots(roots, self.id_file)
+        return self._ids
 
-    def create_item(self, name: str, item_id: int):
-        if self.items is None:
+    def allocate_id(self, root_tag: str, name: str, count: int=1) -> int:
+        """Get free ids for a new item or block, which stay the same for name on later builds
+        :param root_tag: "items" or "blocks"
+        :param name: The name of the new item or block
+        :param count: The number of consecutive ids
+        :return: The first id
+        """
+        return self.id_allocator().allocate(root_tag, name, count)
+
+    def save_ids(self) -> bool:
+        """Write the id reservations made by this build to id_file
+        :return: If the file was written
+        """
+        if self._ids is None:
+            return False
+        return self._ids.save()
+
+    def merge_ids(self, ids: IdAllocator) -> int:
+        """Take over the id reservations made by another copy of the allocator, such as one in a lane worker
+
+        Reservations which conflict with the ones made here are given new ids, see IdAllocator.merge(), and the
+        children of the root of the same kind carrying the old ids under the reserved name get the new ones.
+
+        :param ids: The other IdAllocator
+        :return: The number of elements whose id was changed
+        """
+        changed = 0
+        for kind, name, start, new_start, count in self.id_allocator().merge(ids):
+            print("Warning: {} ids {}-{} of '{}' were taken in the meantime, moving them to {}-{}".format(
+                kind, start, start + count - 1, name, new_start, new_start + count - 1))
+            root = self.roots.get(kind, None)
+            if root is None:
+                continue
+            for element in root:
+                if element.get("name") != name:
+                    continue
+                try:
+                    value = int(element.get("id"))
+                except (TypeError, ValueError):
+                    continue
+                if start <= value < start + count:
+                    element.set("id", str(new_start + value - start))
+                    if self.changes is not None:
+                        self.changes.mark(root, element)
+                    changed += 1
+            # The id index of the root no longer matches
+            self.root_changed(kind)
+        return changed
+
+    def create_item(self, name: str, item_id: int=None):
+        """Create a new item, or get the existing item with the same name
+        :param name: The name of the item
+        :param item_id: The id of the item, by default a free id is allocated for it, see allocate_id()
+        :return: The Item
+        """
+        items = self.config_root("items")
+        if items is None:
             return None
 
-        existing = self.items.find("./item[@id='{}']".format(item_id))
-        if existing is not None:
+        existing = items.by_name(name, "item")
+        if item_id is None:
+            if existing is not None:
+                return items._child(Item, existing, name)
+            item_id = self.allocate_id("items", name)
+            while items.by_id(item_id, "item") is not None:
+                # Taken by an item added without going through the allocator
+                self._ids.release("items", name)
+                self._ids.claim("items", item_id)
+                item_id = self.allocate_id("items", name)
+        elif items.by_id(item_id, "item") is not None:
             print("Can not create item with duplicate ID {}".format(item_id))
             return Item(None, name)
-        existing = self.items.find("./item[@name='{}']".format(name))
+        elif self._ids is not None:
+            self._ids.claim("items", item_id)
         if existing is not None:
-            return Item(existing, name)
+            return items._child(Item, existing, name)
+
+        elem = ElementTree.Element("item", {"name": name, "id": str(item_id)})
+        items.append(elem)
+        return items._child(Item, elem, name)
+
+    def select(self, root_tag: str, tag: str, where=None):
+        """Iterate over the children of a root which match a predicate
 
-        elem = ElementTree.Element("item", {"name": name, "id": item_id})
-        self.items.append(elem)
-        return Item(elem, name)
+        :param root_tag: The tag of the root to search, such as "items"
+        :param tag: The tag of the children to select, such as "item"
+        :param where: Optional predicate taking an element, such as those in sdtd.rules
+        :return: Generator of the matching ElementTree.Element objects
+        """
+        root = self.roots.get(root_tag, None)
+        if root is None:
+            return
+        for element in root:
+            if element.tag == tag and (where is None or where(element)):
+                yield element
+
+    def edit(self, root_tag: str, tag: str, prop: str, transform, where=None, create_if_missing: bool=False) -> int:
+        """Transform one property on every child of a root matching a predicate, in a single pass
+
+        Example, doubling the weight of every item tagged "ammo":
+            data.edit("items", "item", "Weight", sdtd.rules.scale(2), where=sdtd.rules.has_tag("ammo"))
+
+        :param root_tag: The tag of the root to edit, such as "items"
+        :param tag: The tag of the children to edit, such as "item"
+        :param prop: The property path to transform, such as "Weight" or "Attributes/EntityDamage"
+        :param transform: Function mapping the old value to the new one, such as those in sdtd.rules
+        :param where: Optional predicate an element must match to be edited
+        :param create_if_missing: If missing properties should be created when the transform gives them a value
+        :return: The number of properties changed
+        """
+        return self.apply_rules(root_tag, [Rule(tag, prop, transform, where, create_if_missing)])
+
+    def apply_rules(self, root_tag: str, rules: list) -> int:
+        """Apply sdtd.rules.Rule objects to every child of a root, recording the changes in the journal if there is one
+
+        :param root_tag: The tag of the root to apply the rules to
+        :param rules: The rules to apply, in order
+        :return: The number of properties changed
+        """
+        config_root = self.config_root(root_tag)
+        if config_root is None:
+            return 0
+        return apply_rules(config_root.raw(), rules, self._rule_recorder(config_root))
+
+    def _rule_recorder(self, config_root: ConfigRoot):
+        # Builds the on_change callback reporting rule changes to config_root, or None if nothing records them
+        if self.journal is None and len(self._listeners) == 0:
+            return None
+
+        def on_change(element, rule, prop, old_value, created):
+            *classes, name = rule.prop.split("/")
+            components = [compile_selector("property", {"class": c}).xpath for c in classes]
+            components.append(compile_selector("property", {"name": name}).xpath)
+            chain = [element]
+            for class_name in classes:
+                chain.insert(0, find_child(chain[0], "property", "class", class_name))
+            path = "/".join([config_root.child_path(element)] + components)
+            if created is None:
+                config_root.record_set(path, prop, "value", old_value, prop.get("value"), [prop] + chain)
+            else:
+                existing, top = created
+                parent_chain = chain[len(classes) - existing:]
+                parent_path = "/".join([config_root.child_path(element)] + components[:existing])
+                config_root.record_append(parent_path, parent_chain[0], top, parent_chain)
+        return on_change
+
+    def table(self, root_tag: str, tag: str=None, properties: list=None, where=None,
+              inherited: bool=False) -> PropertyTable:
+        """Copy the numeric properties of the children of a root into a column oriented sdtd.table.PropertyTable
+
+        Example, scaling the damage of every item with NumPy and writing it back:
+            table = data.table("items", properties=["Attributes/EntityDamage"])
+            table["Attributes/EntityDamage"] *= 1.25
+            data.write_table(table)
+        Without NumPy, columns are lists, so the second line becomes:
+            table["Attributes/EntityDamage"] = [value * 1.25 for value in table["Attributes/EntityDamage"]]
+
+        :param root_tag: The root tag, such as "items"
+        :param tag: The tag of the rows, defaults to root_tag without the trailing "s"
+        :param properties: The property paths to make columns of, by default every numeric property
+        :param where: Optional predicate an element must match to get a row
+        :param inherited: Include the values inherited through Extends, see inheritance()
+        :return: The table, or None if there is no such root
+        """
+        config_root = self.config_root(root_tag)
+        if config_root is None:
+            return None
+        tag = tag or root_tag[:-1]
+        properties_of = own_properties
+        if inherited:
+            inheritance = self.inheritance(root_tag, tag)
+            properties_of = lambda element: inheritance.properties(element.get("name"))
+        return PropertyTable.build(root_tag, config_root.raw(), tag, properties, where, properties_of)
+
+    def write_table(self, table: PropertyTable) -> int:
+        """Write the changed values of a table back to the tree, in a single pass over the changed cells
+
+        Changes are recorded in the journal and reported to listeners like any other GameData edit. Properties which
+        were missing, or only inherited, are created on the element.
+
+        :param table: A table returned by table()
+        :return: The number of properties changed
+        """
+        config_root = self.config_root(table.root_tag)
+        if config_root is None:
+            return 0
+        on_change = self._rule_recorder(config_root)
+        changed = 0
+        for element, rule in table.rules():
+            if rule.apply(element, on_change) is not None:
+                changed += 1
+        table.mark_written()
+        return changed
+
+    def edit_items(self, prop: str, transform, where=None, create_if_missing: bool=False) -> int:
+        """Shorthand for edit("items", "item", ...)"""
+        return self.edit("items", "item", prop, transform, where, create_if_missing)
+
+    def edit_blocks(self, prop: str, transform, where=None, create_if_missing: bool=False) -> int:
+        """Shorthand for edit("blocks", "block", ...)"""
+        return self.edit("blocks", "block", prop, transform, where, create_if_missing)
 
 
 class ModManager(object):
-    def __init__(self):
-        self.files = {}
+    def __init__(self, profile: BuildProfile=None, loader: ModLoader=None, verbatim: bool=False,
+                 logger: sdtd.log.Logger=None):
+        """
+        :param profile: If given, the time and memory used by every file parse, mod and file write are recorded in
+                        this sdtd.profiling.BuildProfile
+        :param loader: The sdtd.loader.ModLoader used to load mod scripts, defaults to one which keeps compiled mods
+                       in memory only
+        :param verbatim: Keep the source of every parsed file, and have write() copy the source of every element mods
+                         did not change instead of serializing it again, see sdtd.verbatim. Files with raw element
+                         changes which were not reported with data.changes.mark() are serialized as a whole.
+        :param logger: The sdtd.log.Logger details such as every parsed file are logged to at debug level, defaults
+                       to sdtd.log.default_logger
+        """
+        self.files = ConfigMap(ConfigFile.tree)
         self.data = GameData()
+        self.profile = profile
+        self.loader = ModLoader() if loader is None else loader
+        self.verbatim = verbatim
+        self.logger = logger or sdtd.log.default_logger
+        if verbatim:
+            self.data.changes = ChangeTracker()
+        # sdtd.verbatim.SourceMap of every parsed file, keyed by the source path, when verbatim is set
+        self._sources = {}
+        # Names of the config files read through files or data.roots, used to track what each mod touches
+        self._accessed = set()
+        # Rules waiting for their file to be parsed, keyed by the source path of the file
+        self._pending_rules = {}
+
+    def run(self, original: str, modded: str, mods: str, workers: int=1, lazy: bool=False,
+            incremental: bool=False, modlet: bool=False, check: bool=False) -> list:
+        """Load the config in original, apply every mod in mods and write the result to modded
+
+        :param original: The vanilla config directory
+        :param modded: The output directory
+        :param mods: The directory containing the mod scripts
+        :param workers: Passed on to load() and apply_all()
+        :param lazy: Passed on to load()
+        :param incremental: Compare the inputs against the manifest left in modded by the previous incremental build,
+                            and only re-run the mods and rewrite the files affected by what changed
+        :param modlet: Record the changes made by the mods and write them to modded as an XPath modlet, see
+                       write_modlet(), instead of writing complete config files. Ignored for incremental builds.
+        :param check: Validate the references in the result after writing it, see GameData.validate(). The changes
+                      are recorded in a journal so each finding can name the mod responsible, which applies the mods
+                      in this process. Ignored for incremental builds.
+        :return: The findings of the validation, empty if it was not asked for
+        """
+        if incremental:
+            with self._phase("incremental"):
+                self._run_incremental(original, modded, mods)
+            self._close_profile()
+            return []
+
+        with self._phase("load"):
+            self.load(original, workers, lazy)
+        if modlet or check:
+            self.data.journal = Journal(raw=modlet)
+            for entry in self.data.roots.entries():
+                if entry.loaded():
+                    self.data.journal.watch(entry.tag, entry.root())
+        self.data.id_file = os.path.join(modded, IdAllocator.file_name)
+
+        with self._phase("apply"):
+            self.apply_all(mods, workers)
+        with self._phase("write"):
+            if modlet:
+                self.write_modlet(modded)
+            else:
+                self.write(modded)
+            self.data.save_ids()
+        findings = []
+        if check:
+            with self._phase("validate"):
+                findings = self.check()
+        if self.data.localization is not None:
+            # Lookups after the build open the file again
+            self.data.localization.close()
+        self._close_profile()
+        return findings
+
+    def run_profiles(self, original: str, profiles: list, workers: int=1) -> dict:
+        """Load the config in original once, then build every profile from it
 
-    def run(self, original: str, modded: str, mods: str):
+        See sdtd.profiles.build_profiles(), which shares the parsed baseline between the profiles.
+
+        :param original: The vanilla config directory
+        :param profiles: The sdtd.profiles.ModProfile objects to build, each with its own mods and output directory
+        :param workers: The number of profiles built concurrently in forked workers, 0 for one per CPU
+        :return: Dict mapping profile names to the lists of files written for them
+        """
         self.load(original)
+        return build_profiles(self, profiles, workers)
+
+    def check(self) -> list:
+        """Validate the references in the loaded config and print every finding
+        :return: The list of sdtd.validate.Finding objects
+        """
+        findings = self.data.validate()
+        for finding in findings:
+            print("Error: {}".format(finding))
+        print("Validation found {} problems".format(len(findings)))
+        return findings
+
+    def watch(self, original: str, modded: str, mods: str, interval: float=0.5, workers: int=1):
+        """Build once, then rebuild every time a file in the mods directory changes, until interrupted
+
+        The config in original is only parsed once, see sdtd.watch.Watcher.
+
+        :param original: The vanilla config directory
+        :param modded: The output directory
+        :param mods: The directory containing the mod scripts
+        :param interval: Seconds between checks of the mods directory
+        :param workers: Passed on to load() and apply_all()
+        """
+        Watcher(self, original, modded, mods, interval, workers).run()
+
+    def _phase(self, name: str):
+        if self.profile is None:
+            return contextlib.nullcontext()
+        return self.profile.phase(name)
+
+    def _measure(self, section: str, name: str, **kwargs):
+        if self.profile is None:
+            return contextlib.nullcontext({})
+        return self.profile.measure(section, name, **kwargs)
+
+    def _close_profile(self):
+        if self.profile is not None:
+            print(self.profile.summary())
+            self.profile.close()
 
-        self.apply_all(mods)
-        self.write(modded)
+    def write(self, root: str, names=None, workers: int=None) -> list:
+        """Write the config files to the root directory
 
-    def write(self, root: str):
-        if not os.path.isdir(root):
-            os.makedirs(root)
+        Files are serialized on a thread pool. Each file is written to a temporary file and renamed into place, so a
+        reader never sees a partially written config, and files whose contents did not change are not touched at all.
 
-        for file_name, tree in self.files.items():
-            file_path = os.path.join(root, file_name)
-            if not os.path.isdir(os.path.dirname(file_path)):
-                os.makedirs(os.path.dirname(file_path))
-            tree.write(file_path)
+        :param root: The output directory
+        :param names: If given, only the files with these names are written
+        :param workers: The number of threads used to serialize and write files, None for the executor default
+        :return: The names of the files which were written, leaving out those which were already up to date
+        """
+        entries = [entry for entry in self.files.entries() if names is None or entry.name in names]
+        directories = {os.path.dirname(os.path.join(root, entry.name)) for entry in entries}
+        directories.add(root)
+        for directory in sorted(directories):
+            os.makedirs(directory, exist_ok=True)
 
-    def apply_all(self, directory_path: str):
+        localization = self.data.localization
+        if localization is not None and names is not None and localization.name not in names:
+            localization = None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            if localization is not None:
+                # Usually the largest file by far, so it is started first
+                localization_result = executor.submit(self._write_localization, root, localization)
+            results = list(executor.map(lambda entry: self._write_entry(root, entry), entries))
+        written = [entry.name for entry, changed in zip(entries, results) if changed]
+        total = len(entries)
+        if localization is not None:
+            total += 1
+            if localization_result.result():
+                written.append(localization.name)
+        print("Wrote {} of {} files to '{}'".format(len(written), total, root))
+        return written
+
+    def _write_entry(self, root: str, entry: ConfigFile) -> bool:
+        with self._measure("write", entry.name, memory=False) as measured:
+            measured["written"] = self._write_entry_impl(root, entry)
+            return measured["written"]
+
+    def _write_localization(self, root: str, localization: Localization) -> bool:
+        with self._measure("write", localization.name, memory=False) as measured:
+            measured["written"] = localization.write(os.path.join(root, localization.name))
+            return measured["written"]
+
+    def _write_entry_impl(self, root: str, entry: ConfigFile) -> bool:
+        file_path = os.path.join(root, entry.name)
+        if entry.loaded() or entry.path is None:
+            data = None
+            source = self._sources.get(entry.path, None)
+            if source is not None and source.root is entry.root():
+                dirty = self.data.changes.dirty(source.root)
+                unreported = source.unreported(dirty)
+                if len(unreported) > 0:
+                    example = unreported[0].get("name", unreported[0].tag)
+                    print("Warning: {} elements of '{}' were changed without being reported, such as {}; writing the "
+                          "whole file".format(len(unreported), entry.name, example))
+                else:
+                    data = source.serialize(dirty)
+            if data is None:
+                data = ElementTree.tostring(entry.root(), encoding="us-ascii")
+            return sdtd.output.write_bytes(file_path, data)
+        if entry.path in self._pending_rules:
+            rules = self._pending_rules[entry.path]
+            return sdtd.output.write_file(file_path, lambda temp_path: stream_transform(entry.path, temp_path, rules))
+        # Nothing looked at this file, so the source is still exactly what the output should be
+        return sdtd.output.write_file(file_path, lambda temp_path: shutil.copyfile(entry.path, temp_path))
+
+    def write_modlet(self, root: str, name: str="sdtd-modtool") -> list:
+        """Write the changes recorded in the journal as a game modlet
+
+        The modlet consists of root/ModInfo.xml and one file in root/Config for every config file with changes, holding
+        only the XPath set, setattribute, append and remove operations which reproduce the changes. Children of the
+        roots the journal watched which were changed directly on raw elements are replaced as a whole, with a warning,
+        see Journal.unrecorded().
+
+        :param root: The modlet directory
+        :param name: The name to put in ModInfo.xml
+        :return: The names of the files which were written, leaving out those which were already up to date
+        """
+        journal = self.data.journal
+        if journal is None:
+            print("Error: No journal was recorded, can not write a modlet")
+            return []
+
+        written = []
+        changes = len(journal.compacted())
+        recorded = set(journal.root_tags())
+        os.makedirs(os.path.join(root, "Config"), exist_ok=True)
+        for tag in self.data.roots:
+            unrecorded = journal.unrecorded(tag)
+            if tag not in recorded and len(unrecorded) == 0:
+                continue
+            if len(unrecorded) > 0:
+                print("Warning: {} changes to '{}' were made directly on raw elements, writing the changed elements "
+                      "whole".format(len(unrecorded), tag))
+                changes += len(unrecorded)
+            file_name = self.data.roots.entry(tag).name or "{}.xml".format(tag)
+            file_path = os.path.join(root, "Config", file_name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            data = ElementTree.tostring(journal.to_modlet(tag, unrecorded), encoding="utf-8")
+            if sdtd.output.write_bytes(file_path, data):
+                written.append(os.path.join("Config", file_name))
+        localization = self.data.localization
+        if localization is not None and localization.changed():
+            if localization.write_changes(os.path.join(root, "Config", localization.name)):
+                written.append(os.path.join("Config", localization.name))
+
+        info = ElementTree.Element("xml")
+        mod_info = ElementTree.SubElement(info, "ModInfo")
+        ElementTree.SubElement(mod_info, "Name", {"value": name})
+        ElementTree.SubElement(mod_info, "Description", {"value": "Generated by sdtd-modtool"})
+        ElementTree.SubElement(mod_info, "Version", {"value": "1.0"})
+        if sdtd.output.write_bytes(os.path.join(root, "ModInfo.xml"), ElementTree.tostring(info, encoding="utf-8")):
+            written.append("ModInfo.xml")
+        print("Wrote modlet with {} changes to '{}'".format(changes, root))
+        return written
+
+    def apply_all(self, directory_path: str, workers: int=1, only=None):
+        """Apply every mod script found under directory_path
+
+        Mods are applied in the order given by their declared dependencies, see sdtd.mods.ModInfo. With more than one
+        worker, mods which declared disjoint sets of roots are applied concurrently in worker processes, each of which
+        owns the roots of its mods. Only the children the mods changed or added are sent back and merged into the
+        roots afterwards. Sending a changed child back costs about as much as serializing it and parsing it again, so
+        lanes only pay off on several CPUs, for mods which spend much longer computing their changes than that.
+
+        :param directory_path: The directory containing the mod scripts
+        :param workers: The number of worker processes, 1 applies every mod in this process, 0 uses one per CPU.
+                        Mods are always applied in this process while a journal is recording changes or a profile is
+                        measuring them.
+        :param only: If given, only the mods with these names are applied
+        """
+        if self.data.journal is not None or self.profile is not None:
+            workers = 1
+        ordered = self.load_mods(directory_path, only)
+        positions = {info.path: i for i, info in enumerate(ordered)}
+        for batch in plan_batches(ordered):
+            if workers == 1 or len(batch) < 2:
+                for lane in batch:
+                    for info in lane:
+                        self._apply_module(info.module, info.path, info.name)
+            else:
+                self._apply_lanes(batch, workers, positions)
+
+    def load_mods(self, directory_path: str, only=None) -> list:
+        """Load every mod script under directory_path without applying it
+        :param directory_path: The directory containing the mod scripts
+        :param only: If given, only the mods with these names are returned
+        :return: The list of sdtd.mods.ModInfo objects for the mods, in the order they should be applied
+        """
+        infos = []
+        for file_path in self._find_mods(directory_path):
+            name = mod_name(file_path, directory_path)
+            module = self._load_module(file_path, name)
+            if module is not None:
+                infos.append(ModInfo(file_path, module, name))
+        if only is not None:
+            infos = [info for info in infos if info.name in only]
+        return order_mods(infos)
+
+    def apply(self, file_path: str):
+        module = self._load_module(file_path)
+        if module is not None:
+            self._apply_module(module, file_path)
+
+    def _load_module(self, file_path: str, name: str=None):
+        try:
+            return self.loader.load(file_path, name)
+        except Exception as e:
+            print("Exception Encountered while loading modfile '{}'".format(file_path))
+            print(e)
+            return None
+
+    def _apply_module(self, mod, file_path: str, name: str=None):
+        if self.data.journal is not None:
+            self.data.journal.mod = name or file_path
+        with self._measure("mod", name or file_path, cprofile=True):
+            try:
+                rules = getattr(mod, "rules", None)
+                if rules is not None:
+                    self.apply_rules(rules)
+                if rules is None or hasattr(mod, "apply"):
+                    mod.apply(self.data)
+            except Exception as e:
+                print("Exception Encountered while apply modfile '{}'".format(file_path))
+                print(e)
+
+    def _apply_lanes(self, lanes: list, workers: int, positions: dict):
+        global _lane_manager
+        lane_paths = [[info.path for info in lane] for lane in lanes]
+        lane_tags = [sorted(tag for tag in set().union(*(info.roots() for info in lane)) if tag in self.data.roots)
+                     for lane in lanes]
+        # Parse the roots here so pending rules are applied before the workers get them
+        for tags in lane_tags:
+            for tag in tags:
+                self.data.roots[tag]
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            # Forked workers inherit this manager, so the roots never have to be sent to them
+            context = multiprocessing.get_context("fork")
+            lane_files = [None] * len(lanes)
+            localization = None
+            _lane_manager = self
+        else:
+            context = multiprocessing.get_context()
+            lane_files = [{tag: (self.data.roots.entry(tag).name, self.data.roots[tag]) for tag in tags}
+                          for tags in lane_tags]
+            localization = self.data.localization
         try:
-            for file_name in os.listdir(directory_path):
+            workers = min(workers or os.cpu_count() or 1, len(lanes))
+            # Every lane gets a worker of its own; a worker which applied a lane holds the trees and Localization as
+            # that lane left them. Replacement workers are forked from this process, which is left untouched.
+            with context.Pool(workers, maxtasksperchild=1) as pool:
+                results = pool.starmap(_apply_lane, zip(lane_paths, lane_tags, lane_files,
+                                                        [self.data.id_file] * len(lanes),
+                                                        [localization] * len(lanes)), chunksize=1)
+        finally:
+            _lane_manager = None
+
+        edits = []
+        for lane, (root_edits, ids, lane_edits, undeclared) in zip(lanes, results):
+            if len(undeclared) > 0:
+                print("Warning: Mods {} changed {}, which they did not declare; these changes are lost".format(
+                    ", ".join(info.name for info in lane), ", ".join(undeclared)))
+            for tag, root_edit in root_edits.items():
+                self._merge_root(tag, root_edit)
+            if ids is not None:
+                # Ids the lane's mods allocated
+                self.data.merge_ids(ids)
+            if lane_edits is not None:
+                edits.extend((positions[info.path], cells) for info, cells in zip(lane, lane_edits))
+        # Localization cells changed by the lanes, applied in mod order so the last mod setting a cell wins like it
+        # does when the mods are applied one after the other
+        for _, cells in sorted(edits, key=lambda edit: edit[0]):
+            self.data.localization.apply_edits(cells)
+
+    def _merge_root(self, tag: str, root_edit: tuple):
+        # Rebuild a root from the changes a lane worker sent back, see _root_edit()
+        root = self.data.roots[tag]
+        attrib, text, children, tails, markup = root_edit
+        changes = self.data.changes
+        original = list(root)
+        # Every changed or new child arrives in one document, parsed in a single call
+        elements = iter(ElementTree.fromstring(markup))
+        tails = iter(tails)
+        merged = []
+        for child in children:
+            if child is not None:
+                merged.append(original[child])
+                continue
+            element = next(elements)
+            element.tail = next(tails)
+            merged.append(element)
+            if changes is not None:
+                changes.mark(root, element)
+        root[:] = merged
+        root.text = text
+        if root.attrib != attrib:
+            root.attrib.clear()
+            root.attrib.update(attrib)
+            if changes is not None:
+                changes.mark(root, root)
+        self.data.root_changed(tag)
+
+    def _find_mods(self, directory_path: str) -> list:
+        """Collect the paths of every mod script under directory_path in the order they are applied"""
+        mod_paths = []
+        try:
+            for file_name in sorted(os.listdir(directory_path)):
                 file_path = os.path.join(directory_path, file_name)
                 if os.path.isdir(file_path) and file_name != "__pycache__":
-                    self.apply_all(file_path)
+                    mod_paths.extend(self._find_mods(file_path))
                 elif os.path.isfile(file_path) and os.path.splitext(file_name)[-1] == ".py":
-                    self.apply(file_path)
+                    mod_paths.append(file_path)
                 else:
                     pass
         except Exception as e:
             print("Exception Encountered: {}".format(e))
+        return mod_paths
 
-    def apply(self, file_path: str):
-        try:
-            spec = importlib.util.spec_from_file_location("sdtd.temp", file_path)
-            mod = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(mod)
-            mod.apply(self.data)
-        except Exception as e:
-            print("Exception Encountered while apply modfile '{}'".format(file_path))
-            print(e)
+    def _run_incremental(self, original: str, modded: str, mods: str):
+        manifest = BuildManifest.read(modded)
+        config_names = self._find_config_files(original, "")
+        if os.path.isfile(os.path.join(original, localization_name)):
+            config_names.append(localization_name)
+        config_hashes = {name: hash_file(os.path.join(original, name)) for name in config_names}
+        infos = self.load_mods(mods)
+        mod_paths = [info.path for info in infos]
+        mod_names = [os.path.relpath(path, mods) for path in mod_paths]
+        mod_hashes = {name: hash_file(path) for name, path in zip(mod_names, mod_paths)}
 
-    def load(self, directory: str):
+        old_files = manifest.mod_files()
+        old_hashes = manifest.mod_hashes()
+        changed_mods = {name for name in mod_names if old_hashes.get(name, None) != mod_hashes[name]}
+        kept_mods = [name for name in mod_names if name not in changed_mods]
+        if kept_mods != [mod["path"] for mod in manifest.mods if mod["path"] in kept_mods]:
+            # Reordered mods may interact differently on any file they share, so start over
+            dirty = set(config_names)
+        else:
+            dirty = {name for name in config_names if manifest.configs.get(name, None) != config_hashes[name]}
+            dirty.update(name for name in config_names
+                         if manifest.outputs.get(name, None) != hash_file(os.path.join(modded, name)))
+            for name, files in old_files.items():
+                if name in changed_mods or name not in mod_hashes:
+                    dirty.update(files)
+        dirty.intersection_update(config_names)
+
+        if len(dirty) == 0 and len(changed_mods) == 0:
+            print("Build in '{}' is up to date".format(modded))
+            return
+
+        # Mods which are re-run may touch files they did not touch before, which makes those files dirty as well.
+        # Repeat from a fresh load until the set of dirty files is stable.
+        while True:
+            self.load(original, lazy=True)
+            self.data.id_file = os.path.join(modded, IdAllocator.file_name)
+            touched = {}
+            for name, info in zip(mod_names, infos):
+                if name in changed_mods or not old_files.get(name, set()).isdisjoint(dirty):
+                    self._accessed.clear()
+                    self._apply_module(info.module, info.path)
+                    touched[name] = set(self._accessed)
+            extra = set().union(*touched.values()).difference(dirty)
+            if len(extra) == 0:
+                break
+            dirty.update(extra)
+
+        self.write(modded, dirty)
+        self.data.save_ids()
+
+        manifest.configs = config_hashes
+        manifest.mods = []
+        for name in mod_names:
+            files = touched.get(name, old_files.get(name, ()))
+            manifest.mods.append({"path": name, "hash": mod_hashes[name], "files": sorted(files)})
+        for name in config_names:
+            if name in dirty or name not in manifest.outputs:
+                manifest.outputs[name] = hash_file(os.path.join(modded, name))
+        for name in list(manifest.outputs):
+            if name not in config_hashes:
+                del manifest.outputs[name]
+        manifest.write(modded)
+        print("Rebuilt {} of {} files in '{}'".format(len(dirty), len(config_names), modded))
+
+    def apply_rules(self, rules: dict):
+        """Apply declarative rules to config files
+
+        Rules for files which are already loaded, or for any file while a journal is recording changes, are applied to
+        the loaded tree right away. Rules for files which have not been parsed yet are held back; they are applied
+        directly after parsing if the file gets loaded later, and otherwise streamed over the source file by write()
+        without ever loading the whole tree.
+
+        :param rules: Dict mapping config file names, such as "items.xml", to lists of sdtd.rules.Rule objects
+        """
+        for file_name, file_rules in rules.items():
+            if file_name not in self.files:
+                print("Warning: No config file '{}' to apply rules to".format(file_name))
+                continue
+            entry = self.files.entry(file_name)
+            self._accessed.add(entry.name)
+            if entry.loaded() or entry.path is None or self.data.journal is not None:
+                if entry.tag in self.data.roots and self.data.roots.entry(entry.tag) is entry:
+                    # Go through GameData so the changes reach the journal and the root's indexes
+                    self.data.apply_rules(entry.tag, file_rules)
+                else:
+                    apply_rules(entry.root(), file_rules)
+            else:
+                self._pending_rules.setdefault(entry.path, []).extend(file_rules)
+
+    def load(self, directory: str, workers: int=1, lazy: bool=False):
+        """Load every XML config file found under directory, along with Localization.txt
+
+        :param directory: The config directory to load, usually the game's Data/Config directory
+        :param workers: The number of threads used to parse the files. 1 parses in this thread, 0 uses one thread
+                        per CPU. Ignored when lazy is set.
+        :param lazy: Only read the root tag of each file now, and parse each file the first time its tree or root is
+                     accessed. Files which are never accessed are copied verbatim by write().
+        """
         print("GameData::load('{}')".format(directory))
-        self.files = {}
-        self._load_impl(directory, "")
+        self.files = ConfigMap(ConfigFile.tree, self._accessed)
+        self.data.roots = ConfigMap(ConfigFile.root, self._accessed)
+        self._pending_rules = {}
+        self._sources = {}
+        file_names = self._find_config_files(directory, "")
+        paths = [os.path.join(directory, file_name) for file_name in file_names]
+        # Localization is only scanned when a mod uses it, and copied verbatim by write() otherwise
+        localization_path = os.path.join(directory, localization_name)
+        if self.data.localization is not None:
+            self.data.localization.close()
+        self.data.localization = None
+        if os.path.isfile(localization_path):
+            self.data.localization = Localization(localization_path, localization_name, self._accessed)
+        if lazy:
+            for file_name, file_path in zip(file_names, paths):
+                self._add_file(ConfigFile(file_path, file_name, read_root_tag(file_path), parser=self._parse))
+        else:
+            if workers == 1 or len(paths) < 2:
+                trees = [self._parse(file_path) for file_path in paths]
+            else:
+                trees = self._parse_parallel(paths, workers)
+                for file_path, tree in zip(paths, trees):
+                    self._map_source(file_path, tree)
+            for file_name, file_path, tree in zip(file_names, paths, trees):
+                self._add_file(ConfigFile(file_path, file_name, tree.getroot().tag, tree, parser=self._parse))
         self.data.post_load()
 
-    def _load_impl(self, root: str, ext_path: str):
+    def _parse(self, file_path: str) -> ElementTree.ElementTree:
+        self.logger.debug("  Loading: '{}'", file_path)
+        with self._measure("parse", file_path):
+            tree = _parse_config(file_path)
+        self._map_source(file_path, tree)
+        if self.data.journal is not None:
+            self.data.journal.watch(tree.getroot().tag, tree.getroot())
+        rules = self._pending_rules.pop(file_path, None)
+        if rules is not None:
+            root = tree.getroot()
+            on_change = self._change_marker(root) if file_path in self._sources else None
+            apply_rules(root, rules, on_change)
+        return tree
+
+    def _change_marker(self, root: ElementTree.Element):
+        # Builds the on_change callback reporting the children of root changed by rules to the ChangeTracker
+        def on_change(element, *args):
+            self.data.changes.mark(root, element)
+        return on_change
+
+    def _map_source(self, file_path: str, tree: ElementTree.ElementTree):
+        # Must run before anything changes the freshly parsed tree
+        if not self.verbatim:
+            return
+        with open(file_path, "rb") as fp:
+            source = SourceMap.scan(fp.read(), tree.getroot())
+        if source is None:
+            self._sources.pop(file_path, None)
+        else:
+            self._sources[file_path] = source
+
+    def _rebind_sources(self, names):
+        # The trees of the named files were replaced by unchanged copies of their source, such as from a Snapshot
+        for name in names:
+            if name not in self.files:
+                continue
+            entry = self.files.entry(name)
+            source = self._sources.get(entry.path, None)
+            if source is not None and entry.loaded():
+                source = source.rebind(entry.root())
+                if source is None:
+                    del self._sources[entry.path]
+                else:
+                    self._sources[entry.path] = source
+
+    def _parse_parallel(self, paths: list, workers: int) -> list:
+        trees = []
+        workers = workers or os.cpu_count() or 1
+        # Threads rather than processes: a tree parsed in another process has to be pickled back, and unpickling it
+        # costs this process more than parsing the file itself. The threads only overlap reading the files with
+        # parsing; ElementTree holds the GIL while it parses, so they only parse in parallel on builds without it.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            # map() yields in submission order, so the merge below is stable regardless of completion order
+            for file_path, (tree, seconds) in zip(paths, executor.map(_parse_config_timed, paths)):
+                trees.append(tree)
+                if self.profile is not None:
+                    # Parsed alongside other threads, so only the time is known
+                    self.profile.add("parse", {"name": file_path, "seconds": seconds})
+        for file_path in paths:
+            self.logger.debug("  Loading: '{}'", file_path)
+        return trees
+
+    def _find_config_files(self, root: str, ext_path: str) -> list:
+        """Collect the paths of every XML file under root, relative to root, in sorted order"""
+        file_names = []
         directory = os.path.join(root, ext_path)
-        for fname in os.listdir(directory):
+        for fname in sorted(os.listdir(directory)):
             filepath = os.path.join(directory, fname)
-            print("  Loading: '{}'".format(filepath))
             if os.path.isdir(filepath):
-                self._load_impl(root, os.path.join(ext_path, fname))
+                file_names.extend(self._find_config_files(root, os.path.join(ext_path, fname)))
             elif os.path.isfile(filepath) and os.path.splitext(filepath)[-1].lower() == ".xml":
-                tree = ElementTree.parse(filepath)
-                self.files[os.path.join(ext_path, fname)] = tree
-                tree_root = tree.getroot()
-                if tree_root.tag in self.data.roots:
-                    print("Warning: root tag '{}' already exists".format(tree_root.tag))
-                self.data.roots[tree_root.tag] = tree_root
+                file_names.append(os.path.join(ext_path, fname))
             else:
                 pass
+        return file_names
+
+    def _add_file(self, config_file: ConfigFile):
+        self.files.add(config_file.name, config_file)
+        if config_file.tag in self.data.roots:
+            print("Warning: root tag '{}' already exists".format(config_file.tag))
+        self.data.roots.add(config_file.tag, config_file)
+
+
+# The manager whose roots are handed to forked lane workers, set only while _apply_lanes runs
+_lane_manager = None
+
+
+def _root_edit(root: ElementTree.Element, children: list, fingerprints: list, attrib: dict, text: str) -> tuple:
+    # The changes made to a root since its children, their fingerprints, attributes and text were taken, or None if
+    # there are none. Unchanged children are sent as their index in children, and changed and new ones as None, with
+    # their tails in a list and their markup in a single document. That costs far less to send and parse again than
+    # pickling the whole root.
+    index = {id(child): i for i, child in enumerate(children)}
+    result = []
+    tails = []
+    markup = ["<lane>"]
+    changed = root.attrib != attrib or root.text != text or len(root) != len(children)
+    for position, child in enumerate(root):
+        i = index.get(id(child), None)
+        if i is not None and fingerprint(child) == fingerprints[i]:
+            result.append(i)
+            changed = changed or i != position
+            continue
+        tail = child.tail
+        child.tail = None
+        try:
+            markup.append(ElementTree.tostring(child, encoding="unicode"))
+        finally:
+            child.tail = tail
+        result.append(None)
+        tails.append(tail)
+        changed = True
+    if not changed:
+        return None
+    markup.append("</lane>")
+    return dict(root.attrib), root.text, result, tails, "".join(markup)
+
+
+def _apply_lane(paths: list, tags: list, files: dict, id_file: str, localization: Localization) -> tuple:
+    # Runs in a worker process of its own. Applies the mods of one lane and returns the changes they made to the roots
+    # they own, along with the id allocator and, for every mod, the localization cells it changed. Only the changed
+    # cells are sent back, as the rows also hold the changes of the mods before this batch and of other lanes' mods to
+    # other columns. Last comes the names of the files the mods changed without declaring them, whose changes are lost.
+    manager = _lane_manager
+    if manager is None:
+        manager = ModManager()
+        manager.files = ConfigMap(ConfigFile.tree)
+        manager.data.roots = ConfigMap(ConfigFile.root)
+        manager.data.id_file = id_file
+        manager.data.localization = localization
+        for tag, (name, root) in files.items():
+            manager._add_file(ConfigFile(None, name, tag, ElementTree.ElementTree(root)))
+    before = {}
+    for tag in tags:
+        root = manager.data.roots[tag]
+        children = list(root)
+        before[tag] = (children, [fingerprint(child) for child in children], dict(root.attrib), root.text)
+    # Roots the mods did not declare, None for those which are not parsed yet
+    others = {entry.tag: fingerprint(entry.root()) if entry.loaded() else None
+              for entry in manager.data.roots.entries() if entry.tag not in tags}
+    pending = {file_path: list(rules) for file_path, rules in manager._pending_rules.items()}
+    localization = manager.data.localization
+    edits = []
+    for path in paths:
+        if localization is not None:
+            localization.record_edits()
+        manager.apply(path)
+        if localization is not None:
+            edits.append(localization.edits())
+    root_edits = {}
+    for tag, (children, fingerprints, attrib, text) in before.items():
+        root_edit = _root_edit(manager.data.roots[tag], children, fingerprints, attrib, text)
+        if root_edit is not None:
+            root_edits[tag] = root_edit
+    undeclared = _undeclared_changes(manager, others, pending)
+    return root_edits, manager.data._ids, None if localization is None else edits, undeclared
+
+
+def _undeclared_changes(manager, others: dict, pending: dict) -> list:
+    # The names of the files a lane's mods changed outside of their declared roots, compared against the fingerprints
+    # taken before the mods ran. Roots the mods parsed are compared against the file with the rules held back for it.
+    names = []
+    for tag, before in others.items():
+        entry = manager.data.roots.entry(tag)
+        if not entry.loaded():
+            continue
+        if before is None:
+            if entry.path is None:
+                continue
+            original = _parse_config(entry.path).getroot()
+            apply_rules(original, pending.get(entry.path, []))
+            before = fingerprint(original)
+        if fingerprint(entry.root()) != before:
+            names.append(entry.name)
+    # Rules held back for files which are still not parsed
+    for entry in manager.files.entries():
+        rules = manager._pending_rules.get(entry.path, [])
+        if len(rules) > len(pending.get(entry.path, [])) and entry.name not in names:
+            names.append(entry.name)
+    return sorted(names)
+
+
+def _parse_config_timed(file_path: str) -> tuple:
+    start = time.perf_counter()
+    tree = _parse_config(file_path)
+    return tree, time.perf_counter() - start
+
+
+def _parse_config(file_path: str) -> ElementTree.ElementTree:
+    return ElementTree.parse(file_path)
 
 if __name__=="__main__":
     prefix = r"C:\Users\Troy Varney\Desktop\7 Days to Die"
@@ -0,0 +1,160 @@
+import heapq
+import os.path
+
+
+class ModInfo(object):
+    """Metadata of a loaded mod script
+
+    Mods declare their metadata with a module level mod_info dict. Every key is optional:
+        name     -- The name other mods refer to this one by, defaults to the path relative to the mods directory
+                    without the .py extension and with / separators
+        requires -- Names of mods which must be present and applied before this one
+        after    -- Names of mods which are applied before this one if they are present
+        before   -- Names of mods which are applied after this one if they are present
+        reads    -- Root tags, such as "items", which the mod reads
+        writes   -- Root tags which the mod changes
+
+    Mods which declare reads or writes promise not to touch any other root, which allows mods with disjoint roots to
+    be applied concurrently. Mods which declare neither may touch anything and are always applied on their own.
+    """
+    def __init__(self, path: str, module, default_name: str):
+        """
+        :param path: The path of the mod script
+        :param module: The loaded module of the mod script
+        :param default_name: The name to use if the mod does not declare one
+        """
+        info = getattr(module, "mod_info", None) or {}
+        self.path = path          # type: str
+        self.module = module
+        self.name = info.get("name", default_name)  # type: str
+        self.requires = list(info.get("requires", ()))
+        self.after = list(info.get("after", ()))
+        self.before = list(info.get("before", ()))
+        self.reads = set(info.get("reads", ()))
+        self.writes = set(info.get("writes", ()))
+        self.declared = "reads" in info or "writes" in info  # type: bool
+
+    def roots(self) -> set:
+        """
+        :return: The set of root tags this mod declared it reads or writes
+        """
+        return self.reads | self.writes
+
+
+def mod_name(path: str, directory: str) -> str:
+    """Get the default name of a mod script
+    :param path: The path of the mod script
+    :param directory: The mods directory the script was found in
+    :return: The path relative to directory, without extension and with / separators
+    """
+    return os.path.splitext(os.path.relpath(path, directory))[0].replace(os.sep, "/")
+
+
+def order_mods(infos: list) -> list:
+    """Sort mods so every mod comes after the mods it depends on
+
+    Mods which are not constrained relative to each other are ordered by name, so the result does not depend on the
+    order the mods were found in. Mods with missing requirements are dropped, along with any mod requiring them. Of
+    several mods with the same name only the first one in infos is kept. If the constraints contain a cycle, the mods in
+    the cycle are appended in name order after everything else.
+
+    :param infos: The ModInfo objects to order
+    :return: The ordered list of ModInfo objects
+    """
+    by_name = {}
+    for info in infos:
+        if info.name in by_name:
+            print("Error: Skipping mod '{}', its name '{}' is already used by '{}'".format(info.path, info.name,
+                                                                                      by_name[info.name].path))
+            continue
+        by_name[info.name] = info
+
+    # Drop mods whose requirements are missing until nothing else drops out
+    dropped = True
+    while dropped:
+        dropped = False
+        for info in list(by_name.values()):
+            missing = [name for name in info.requires if name not in by_name]
+            if len(missing) > 0:
+                print("Error: Skipping mod '{}', missing required mods {}".format(info.name, ", ".join(missing)))
+                del by_name[info.name]
+                dropped = True
+
+    successors = {name: set() for name in by_name}
+    predecessors = {name: 0 for name in by_name}
+
+    def edge(first, second):
+        if first in by_name and second in by_name and second not in successors[first]:
+            successors[first].add(second)
+            predecessors[second] += 1
+
+    for info in by_name.values():
+        for name in info.requires + info.after:
+            edge(name, info.name)
+        for name in info.before:
+            edge(info.name, name)
+
+    ready = [name for name, count in predecessors.items() if count == 0]
+    heapq.heapify(ready)
+    ordered = []
+    while len(ready) > 0:
+        name = heapq.heappop(ready)
+        ordered.append(by_name[name])
+        for successor in successors[name]:
+            predecessors[successor] -= 1
+            if predecessors[successor] == 0:
+                heapq.heappush(ready, successor)
+
+    if len(ordered) < len(by_name):
+        remaining = sorted(name for name, count in predecessors.items() if count > 0)
+        print("Warning: Mods {} have cyclic ordering constraints".format(", ".join(remaining)))
+        ordered.extend(by_name[name] for name in remaining)
+    return ordered
+
+
+def plan_batches(ordered: list) -> list:
+    """Split an ordered list of mods into batches which can be applied one after the other
+
+    Each batch is a list of lanes, and each lane is a list of mods to apply in order. Lanes in the same batch touch
+    disjoint sets of roots, so they may be applied concurrently. Mods which did not declare their roots always get a
+    batch with a single lane to themselves.
+
+    :param ordered: The ModInfo objects, as returned by order_mods()
+    :return: The list of batches
+    """
+    batches = []
+    pending = []
+    for info in ordered:
+        if info.declared:
+            pending.append(info)
+        else:
+            if len(pending) > 0:
+                batches.append(_lanes(pending))
+                pending = []
+            batches.append([[info]])
+    if len(pending) > 0:
+        batches.append(_lanes(pending))
+    return batches
+
+
+def _lanes(infos: list) -> list:
+    # Union-find over the roots, so mods sharing a root (directly or through other mods) end up in the same lane
+    parent = {}
+
+    def find(root):
+        while parent.setdefault(root, root) != root:
+            parent[root] = parent[parent[root]]
+            root = parent[root]
+        return root
+
+    for info in infos:
+        roots = sorted(info.roots())
+        for root in roots[1:]:
+            parent[find(root)] = find(roots[0])
+
+    lanes = {}
+    for i, info in enumerate(infos):
+        roots = info.roots()
+        key = find(min(roots)) if len(roots) > 0 else ("mod", i)
+        lanes.setdefault(key, []).append(info)
+    return list(lanes.values())
@@ -0,0 +1,104 @@
+import filecmp
+import os
+import os.path
+import shutil
+import threading
+
+
+def temp_path_for(file_path: str) -> str:
+    """Get a temporary path to write the new contents of file_path to
+
+    The path is in the same directory so it can be renamed over file_path atomically, and is unique to the calling
+    process and thread.
+
+    :param file_path: The final path of the file being written
+    :return: The path of the temporary file
+    """
+    directory, name = os.path.split(file_path)
+    return os.path.join(directory, ".{}.{}.{}.tmp".format(name, os.getpid(), threading.get_ident()))
+
+
+def same_contents(file_path: str, data: bytes) -> bool:
+    """
+    :param file_path: The path of an existing or missing file
+    :param data: The contents to compare against
+    :return: If file_path exists and contains exactly data
+    """
+    try:
+        if os.path.getsize(file_path) != len(data):
+            return False
+        with open(file_path, "rb") as fp:
+            return fp.read() == data
+    except OSError:
+        return False
+
+
+def write_bytes(file_path: str, data: bytes) -> bool:
+    """Write data to file_path atomically, unless the file already contains exactly data
+
+    Readers of file_path see either the old or the new contents, never a partially written file, and an unchanged
+    file keeps its modification time.
+
+    :param file_path: The path of the file to write
+    :param data: The contents to write
+    :return: If the file was written
+    """
+    if same_contents(file_path, data):
+        return False
+    temp_path = temp_path_for(file_path)
+    try:
+        with open(temp_path, "wb") as fp:
+            fp.write(data)
+        _replace(temp_path, file_path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+    return True
+
+
+def commit_file(temp_path: str, file_path: str) -> bool:
+    """Move a finished temporary file over file_path, unless file_path already has the same contents
+
+    :param temp_path: The temporary file, as returned by temp_path_for(file_path). It is always consumed.
+    :param file_path: The path of the file to replace
+    :return: If file_path was replaced
+    """
+    try:
+        if os.path.isfile(file_path) and filecmp.cmp(temp_path, file_path, shallow=False):
+            _remove(temp_path)
+            return False
+        _replace(temp_path, file_path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+    return True
+
+
+def write_file(file_path: str, produce) -> bool:
+    """Produce a new version of file_path in a temporary file, then commit it with commit_file()
+
+    :param file_path: The path of the file to write
+    :param produce: Function called with the temporary path, which it must write the new contents to
+    :return: If file_path was replaced
+    """
+    temp_path = temp_path_for(file_path)
+    try:
+        produce(temp_path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+    return commit_file(temp_path, file_path)
+
+
+def _replace(temp_path: str, file_path: str):
+    if os.path.isfile(file_path):
+        # Keep the permissions of the file being replaced
+        shutil.copymode(file_path, temp_path)
+    os.replace(temp_path, file_path)
+
+
+def _remove(file_path: str):
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+import os.path
+from sdtd.ids import IdAllocator
+from sdtd.snapshot import Snapshot
+
+
+class ModProfile(object):
+    """One variant of a modpack, such as PvE or hardcore, built from a shared vanilla baseline"""
+    def __init__(self, name: str, mods: str, output: str, only=None):
+        """
+        :param name: The name of the profile, used in messages
+        :param mods: The directory containing the mod scripts of the profile
+        :param output: The directory the profile's config files are written to
+        :param only: If given, only the mods with these names are applied, see sdtd.mods.ModInfo for mod names
+        """
+        self.name = name
+        self.mods = mods
+        self.output = output
+        self.only = None if only is None else set(only)
+
+
+# The manager holding the parsed baseline and the profiles being built, set only while build_profiles() forks workers
+_profile_manager = None
+_profiles = None
+
+
+def build_profiles(manager, profiles: list, workers: int=1) -> dict:
+    """Build several profiles from the config already loaded into manager
+
+    With more than one worker and fork available, each profile is built in a worker process forked for it alone, so
+    the workers start from the parsed baseline without parsing or receiving it again. Memory pages are only shared
+    until they are written to, and reference counting writes to every object a worker touches, so the pages of the
+    baseline a worker walks are copied into it. A worker is never reused, as it holds the trees as its profile left
+    them.
+    Otherwise the profiles are built one after the other in this process, restoring the files each build touched from
+    a Snapshot of the baseline before the next one.
+
+    :param manager: The ModManager with the baseline loaded, which is left holding the baseline again afterwards
+    :param profiles: The ModProfile objects to build
+    :param workers: The number of worker processes, 1 builds every profile in this process, 0 uses one per CPU
+    :return: Dict mapping profile names to the lists of files written for them
+    """
+    global _profile_manager, _profiles
+    # Parse everything now, so the workers inherit the parsed trees instead of each parsing them again
+    for entry in manager.files.entries():
+        entry.tree()
+
+    if workers != 1 and len(profiles) > 1 and "fork" in multiprocessing.get_all_start_methods():
+        _profile_manager = manager
+        _profiles = profiles
+        try:
+            workers = min(workers or os.cpu_count() or 1, len(profiles))
+            context = multiprocessing.get_context("fork")
+            # Replacement workers are forked from this process, which still holds the untouched baseline
+            with context.Pool(workers, maxtasksperchild=1) as pool:
+                results = pool.map(_build_forked, range(len(profiles)), chunksize=1)
+        finally:
+            _profile_manager = None
+            _profiles = None
+        return {profile.name: written for profile, written in zip(profiles, results)}
+
+    snapshot = Snapshot(manager.files)
+    results = {}
+    touched = set()
+    try:
+        for profile in profiles:
+            snapshot.restore(manager.files, touched)
+            manager._rebind_sources(touched)
+            results[profile.name] = _build(manager, profile)
+            touched = set(manager._accessed)
+    finally:
+        snapshot.restore(manager.files, touched)
+        manager._rebind_sources(touched)
+        manager.data.post_load()
+    return results
+
+
+def _build(manager, profile: ModProfile) -> list:
+    print("Building profile '{}'".format(profile.name))
+    manager.data.post_load()
+    manager._accessed.clear()
+    manager.data.id_file = os.path.join(profile.output, IdAllocator.file_name)
+    manager.apply_all(profile.mods, only=profile.only)
+    written = manager.write(profile.output)
+    manager.data.save_ids()
+    return written
+
+
+def _build_forked(index: int) -> list:
+    # Runs in a worker process forked for this profile only, which owns its copy of the baseline
+    return _build(_profile_manager, _profiles[index])
@@ -0,0 +1,176 @@
+import contextlib
+import cProfile
+import json
+import os
+import os.path
+import re
+import threading
+import time
+import tracemalloc
+import sdtd.elements
+
+
+class BuildProfile(object):
+    """Per-phase, per-file and per-mod timing of a build
+
+    Hand one to ModManager to have it record:
+        parse -- wall time and memory of every config file parsed
+        mod   -- wall time and memory of every mod applied, with its wrapper lookups and mutations
+        write -- wall time of serializing and writing every output file, and if the file changed
+    along with the total time of the load, apply and write phases.
+
+    Memory is measured with tracemalloc, which is started when the first entry is measured and stopped by close(), and
+    is reported as the bytes still allocated after each entry (allocated) and the highest allocation above the
+    starting point while it ran (peak). Tracing allocations makes the build noticeably slower, pass memory=False to
+    measure only time. Files are written on a thread pool, so write entries never measure memory.
+
+    Mutations are counted through ConfigRoot, so they cover changes made through wrappers and the GameData API, but not
+    changes made directly on raw elements or rules streamed over files which were never loaded.
+    """
+    def __init__(self, report_path: str=None, memory: bool=True, cprofile_directory: str=None):
+        """
+        :param report_path: If given, close() writes the JSON report to this path
+        :param memory: Measure memory as well as time
+        :param cprofile_directory: If given, every mod is run under cProfile and its stats are dumped to
+                                   <cprofile_directory>/<mod name>.prof, loadable with pstats
+        """
+        self.report_path = report_path
+        self.memory = memory
+        self.cprofile_directory = cprofile_directory
+        self.phases = {}
+        self.entries = {"parse": [], "mod": [], "write": []}
+        self._stack = []
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Time a phase of the build, adding to the time of earlier phases with the same name
+        :param name: The phase name, such as "load"
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @contextlib.contextmanager
+    def measure(self, section: str, name: str, memory: bool=True, cprofile: bool=False):
+        """Measure a single entry, such as the parse of one file
+
+        The entry dict is yielded, so the measured code can add its own fields to it.
+
+        :param section: One of "parse", "mod" or "write"
+        :param name: The name of the file or mod
+        :param memory: Measure memory as well, if the profile does
+        :param cprofile: Run the entry under cProfile, if the profile has a cprofile_directory
+        """
+        entry = {"name": name}
+        memory = memory and self.memory
+        if memory:
+            self._push()
+        profiler = None
+        if cprofile and self.cprofile_directory is not None:
+            profiler = cProfile.Profile()
+        counters = sdtd.elements.counters
+        lookups, mutations = counters.lookups, counters.mutations
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield entry
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            entry["seconds"] = time.perf_counter() - start
+            if section == "mod":
+                entry["lookups"] = counters.lookups - lookups
+                entry["mutations"] = counters.mutations - mutations
+            if memory:
+                entry["allocated"], entry["peak"] = self._pop()
+            if profiler is not None:
+                entry["cprofile"] = self._dump(profiler, name)
+            with self._lock:
+                self.entries[section].append(entry)
+
+    def add(self, section: str, entry: dict):
+        """Add an entry measured elsewhere, such as in a worker process
+        :param section: One of "parse", "mod" or "write"
+        :param entry: Dict with at least the name and seconds of the entry
+        """
+        with self._lock:
+            self.entries[section].append(entry)
+
+    def _push(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        current, peak = tracemalloc.get_traced_memory()
+        if len(self._stack) > 0:
+            # Keep the peak reached so far by the enclosing entry, reset_peak() is about to forget it
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        self._stack.append([current, current])
+
+    def _pop(self) -> tuple:
+        current, peak = tracemalloc.get_traced_memory()
+        start, highest = self._stack.pop()
+        peak = max(peak, highest)
+        if len(self._stack) > 0:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        return current - start, peak - start
+
+    def _dump(self, profiler: cProfile.Profile, name: str) -> str:
+        os.makedirs(self.cprofile_directory, exist_ok=True)
+        file_path = os.path.join(self.cprofile_directory, re.sub(r"[^\w.-]", "_", name) + ".prof")
+        profiler.dump_stats(file_path)
+        return file_path
+
+    def report(self) -> dict:
+        """
+        :return: The recorded phases and entries, as a dict of plain JSON types. Entries are sorted slowest first.
+        """
+        return {
+            "phases": dict(self.phases),
+            "parse": sorted(self.entries["parse"], key=lambda e: -e["seconds"]),
+            "mod": sorted(self.entries["mod"], key=lambda e: -e["seconds"]),
+            "write": sorted(self.entries["write"], key=lambda e: -e["seconds"]),
+        }
+
+    def summary(self, count: int=5) -> str:
+        """
+        :param count: The number of slowest entries to list for each section
+        :return: A human readable summary of the report
+        """
+        report = self.report()
+        lines = ["Build profile:"]
+        for name, seconds in report["phases"].items():
+            lines.append("  {:<8} {:9.3f} s".format(name, seconds))
+        for section in ("parse", "mod", "write"):
+            entries = report[section]
+            if len(entries) == 0:
+                continue
+            lines.append("  Slowest {} entries:".format(section))
+            for entry in entries[:count]:
+                line = "    {:9.3f} s  {}".format(entry["seconds"], entry["name"])
+                if "peak" in entry:
+                    line += "  (peak {:.1f} MB)".format(entry["peak"] / 1e6)
+                if "lookups" in entry:
+                    line += "  ({} lookups, {} mutations)".format(entry["lookups"], entry["mutations"])
+                lines.append(line)
+        return "\n".join(lines)
+
+    def write(self, file_path: str):
+        """Write the report as JSON
+        :param file_path: The path to write the report to
+        """
+        with open(file_path, "w") as fp:
+            json.dump(self.report(), fp, indent=2)
+
+    def close(self):
+        """Stop tracing memory if this profile started it, and write the report if a report_path was given"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self.report_path is not None:
+            self.write(self.report_path)
@@ -0,0 +1,214 @@
+import xml.etree.ElementTree as ElementTree
+
+
+# Declarative per-element edits. A Rule pairs a predicate, which decides if an element is edited, with a transform,
+# which maps the old value of one property to the new one. Both work on plain ElementTree elements so the same rule can
+# be applied to a loaded tree or to elements coming out of a streaming parse.
+
+
+def find_property(element: ElementTree.Element, path: str) -> ElementTree.Element:
+    """Find a property element below element
+
+    :param element: The element to search, usually an item or a block
+    :param path: The property to find. Properties nested in property classes are written as "Class/Name", for
+                 example "Attributes/EntityDamage".
+    :return: The property element, or None if it does not exist
+    """
+    *classes, name = path.split("/")
+    for class_name in classes:
+        element = _find_child(element, "class", class_name)
+        if element is None:
+            return None
+    return _find_child(element, "name", name)
+
+
+def _find_child(element: ElementTree.Element, attribute: str, value: str) -> ElementTree.Element:
+    for child in element:
+        if child.tag == "property" and child.get(attribute) == value:
+            return child
+    return None
+
+
+def _create_property(element: ElementTree.Element, path: str) -> tuple:
+    # Returns the new property, the number of path components which already existed and the first element created
+    *classes, name = path.split("/")
+    existing = 0
+    top = None
+    for class_name in classes:
+        child = _find_child(element, "class", class_name)
+        if child is None:
+            child = ElementTree.SubElement(element, "property", {"class": class_name})
+            top = child if top is None else top
+        elif top is None:
+            existing += 1
+        element = child
+    prop = ElementTree.SubElement(element, "property", {"name": name})
+    return prop, existing, prop if top is None else top
+
+
+def get_property(element: ElementTree.Element, path: str) -> str:
+    """Get the value attribute of a property below element
+    :param element: The element to search
+    :param path: The property path, as for find_property
+    :return: The value of the property, or None if the property does not exist
+    """
+    prop = find_property(element, path)
+    return None if prop is None else prop.get("value")
+
+
+def format_number(value: float) -> str:
+    """Format a number the way config files write them, without a trailing .0 on whole numbers"""
+    if value == int(value):
+        return str(int(value))
+    return "{:.6f}".format(value).rstrip("0").rstrip(".")
+
+
+def parse_numbers(value: str) -> list:
+    """Parse a numeric property value, including tiered values such as "10,20,30"
+    :param value: The property value
+    :return: The list of numbers in value, or None if any part of it is not a number
+    """
+    try:
+        return [float(part) for part in value.split(",")]
+    except (AttributeError, ValueError):
+        return None
+
+
+# Predicates
+
+
+def property_equals(path: str, value: str):
+    """Match elements where the property at path has exactly the given value"""
+    return lambda element: get_property(element, path) == value
+
+
+def property_between(path: str, low: float=None, high: float=None):
+    """Match elements where every number in the property at path lies in [low, high]"""
+    def predicate(element):
+        numbers = parse_numbers(get_property(element, path))
+        if numbers is None:
+            return False
+        return all((low is None or n >= low) and (high is None or n <= high) for n in numbers)
+    return predicate
+
+
+def has_tag(tag: str):
+    """Match elements whose comma separated Tags property contains tag"""
+    def predicate(element):
+        tags = get_property(element, "Tags")
+        return tags is not None and tag in (t.strip() for t in tags.split(","))
+    return predicate
+
+
+def all_of(*predicates):
+    """Match elements matched by every one of predicates"""
+    return lambda element: all(predicate(element) for predicate in predicates)
+
+
+def any_of(*predicates):
+    """Match elements matched by at least one of predicates"""
+    return lambda element: any(predicate(element) for predicate in predicates)
+
+
+# Transforms
+
+
+def set_value(value: str):
+    """Replace the property value"""
+    return lambda old: value
+
+
+def _numeric(function):
+    def transform(old):
+        numbers = parse_numbers(old)
+        if numbers is None:
+            return old
+        return ",".join(format_number(function(n)) for n in numbers)
+    return transform
+
+
+def scale(factor: float):
+    """Multiply every number in the property value by factor"""
+    return _numeric(lambda n: n * factor)
+
+
+def offset(delta: float):
+    """Add delta to every number in the property value"""
+    return _numeric(lambda n: n + delta)
+
+
+def clamp(low: float=None, high: float=None):
+    """Limit every number in the property value to [low, high]"""
+    def function(n):
+        if low is not None and n < low:
+            return low
+        if high is not None and n > high:
+            return high
+        return n
+    return _numeric(function)
+
+
+class Rule(object):
+    def __init__(self, tag: str, prop: str, transform, where=None, create_if_missing: bool=False):
+        """
+        :param tag: The tag of the elements the rule applies to, such as "item" or "block"
+        :param prop: The path of the property to edit, as for find_property
+        :param transform: Function mapping the old property value to the new one. Called with None for missing
+                          properties when create_if_missing is set.
+        :param where: Optional predicate an element must match for the rule to apply
+        :param create_if_missing: If a missing property should be created when the transform gives it a value
+        """
+        self.tag = tag
+        self.prop = prop
+        self.transform = transform
+        self.where = where
+        self.create_if_missing = create_if_missing
+
+    def apply(self, element: ElementTree.Element, on_change=None) -> ElementTree.Element:
+        """Apply this rule to a single element
+
+        Properties which do not exist on the element are left alone unless create_if_missing is set.
+
+        :param element: The element to apply the rule to
+        :param on_change: Optional function called for each change as on_change(element, rule, prop, old_value,
+                          created). created is None if the property existed, otherwise a tuple of the number of
+                          components of the property path which already existed and the first element created.
+        :return: The property element that was changed, or None if nothing changed
+        """
+        if element.tag != self.tag or (self.where is not None and not self.where(element)):
+            return None
+        prop = find_property(element, self.prop)
+        if prop is None:
+            if not self.create_if_missing:
+                return None
+            value = self.transform(None)
+            if value is None:
+                return None
+            prop, existing, top = _create_property(element, self.prop)
+            prop.set("value", value)
+            if on_change is not None:
+                on_change(element, self, prop, None, (existing, top))
+            return prop
+        old_value = prop.get("value")
+        value = self.transform(old_value)
+        if value == old_value:
+            return None
+        prop.set("value", value)
+        if on_change is not None:
+            on_change(element, self, prop, old_value, None)
+        return prop
+
+
+def apply_rules(root: ElementTree.Element, rules: list, on_change=None) -> int:
+    """Apply rules to every direct child of root
+    :param root: The root element of a config file
+    :param rules: The list of Rule objects to apply, in order
+    :param on_change: Optional change callback, as for Rule.apply
+    :return: The number of properties changed
+    """
+    changed = 0
+    for element in root:
+        for rule in rules:
+            if rule.apply(element, on_change) is not None:
+                changed += 1
+    return changed
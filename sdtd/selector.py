@@ -0,0 +1,154 @@
+import functools
+import weakref
+import xml.etree.ElementTree as ElementTree
+
+
+# Attributes which children are indexed on. Config files address nearly every child element by one of these.
+indexed_attributes = ("name", "class")
+
+
+def _quote(value: str) -> str:
+    if "'" in value:
+        return '"{}"'.format(value)
+    return "'{}'".format(value)
+
+
+class Selector(object):
+    """Compiled matcher for child elements with a given tag and attribute values
+
+    Every attribute has to match (the attributes are and-ed together). Selectors are immutable and shared, get them
+    from compile_selector() rather than creating them directly.
+    """
+    __slots__ = ("tag", "attributes", "xpath", "_key")
+
+    def __init__(self, tag: str, attributes: tuple):
+        """
+        :param tag: The tag to match
+        :param attributes: Tuple of (attribute, value) pairs which must all match
+        """
+        self.tag = tag
+        self.attributes = attributes
+        self.xpath = tag + "".join("[@{}={}]".format(key, _quote(str(value))) for key, value in attributes)
+        # The indexed attribute used to jump straight to a candidate child, if the selector has one
+        self._key = None
+        for key, value in attributes:
+            if key in indexed_attributes:
+                self._key = (tag, key, value)
+                break
+
+    def matches(self, element: ElementTree.Element) -> bool:
+        """
+        :param element: The element to test
+        :return: If element has this selector's tag and attribute values
+        """
+        if element.tag != self.tag:
+            return False
+        for key, value in self.attributes:
+            if element.get(key) != value:
+                return False
+        return True
+
+    def first(self, parent: ElementTree.Element) -> ElementTree.Element:
+        """Find the first child of parent matched by this selector
+        :param parent: The element to search the children of
+        :return: The first matching child, or None if no child matches
+        """
+        if self._key is not None:
+            element = _lookup(parent, self._key)
+            if element is None or self.matches(element):
+                return element
+            # The indexed child has other attributes than the ones asked for; a later child with the same key may
+            # still match
+        for element in parent:
+            if self.matches(element):
+                return element
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile(tag: str, attributes: tuple) -> Selector:
+    return Selector(tag, attributes)
+
+
+def compile_selector(tag: str, attributes: dict=None) -> Selector:
+    """Get the compiled Selector for a tag and attributes, reusing a cached one if possible
+    :param tag: The tag to match
+    :param attributes: Dict of attribute values which must all match
+    :return: The Selector
+    """
+    items = () if not attributes else tuple(sorted((key, str(value)) for key, value in attributes.items()))
+    return _compile(tag, items)
+
+
+class _ChildIndex(object):
+    __slots__ = ("signature", "entries")
+
+    def __init__(self, parent: ElementTree.Element):
+        self.signature = child_signature(parent)
+        self.entries = {}
+        for position, child in enumerate(parent):
+            for attribute in indexed_attributes:
+                value = child.get(attribute)
+                if value is not None:
+                    self.entries.setdefault((child.tag, attribute, value), (position, child))
+
+
+# Built lazily, the first time a child of the element is looked up through an indexed attribute
+_child_indexes = weakref.WeakKeyDictionary()
+
+
+def child_signature(parent: ElementTree.Element) -> tuple:
+    """Cheap fingerprint of the children of an element, which changes when children are added or removed
+    :param parent: The element
+    :return: The number of children along with the identity of the last one
+    """
+    count = len(parent)
+    return count, (id(parent[-1]) if count > 0 else None)
+
+
+def _lookup(parent: ElementTree.Element, key: tuple) -> ElementTree.Element:
+    index = _child_indexes.get(parent, None)
+    if index is None or index.signature != child_signature(parent):
+        index = _ChildIndex(parent)
+        _child_indexes[parent] = index
+    entry = index.entries.get(key, None)
+    if entry is None:
+        return None
+    position, element = entry
+    tag, attribute, value = key
+    if position < len(parent) and parent[position] is element and element.get(attribute) == value:
+        return element
+    # Stale entry, the children were rearranged without changing the signature
+    index = _ChildIndex(parent)
+    _child_indexes[parent] = index
+    entry = index.entries.get(key, None)
+    return None if entry is None else entry[1]
+
+
+def find_child(parent: ElementTree.Element, tag: str, attribute: str, value: str) -> ElementTree.Element:
+    """Find the first child of parent with the given tag and attribute value
+
+    Lookups on the name and class attributes use a per-element index, built on first use and rebuilt when the
+    number of children or the last child changes.
+
+    :param parent: The element to search the children of
+    :param tag: The tag of the child
+    :param attribute: The attribute to match
+    :param value: The value the attribute must have
+    :return: The first matching child, or None if there is none
+    """
+    if parent is None:
+        return None
+    return compile_selector(tag, {attribute: value}).first(parent)
+
+
+def invalidate(parent: ElementTree.Element):
+    """Drop the child index of parent
+
+    The index notices children being added or removed, but not children being renamed. Call this after changing the
+    name or class attribute of a child directly through its ElementTree.Element; XMLWrapper.set does it already.
+
+    :param parent: The element whose children were changed
+    """
+    if parent is not None:
+        _child_indexes.pop(parent, None)
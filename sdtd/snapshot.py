@@ -0,0 +1,50 @@
+import xml.etree.ElementTree as ElementTree
+from sdtd.config import ConfigMap
+
+
+class Snapshot(object):
+    """Pristine copy of the loaded config trees of a ModManager, which the trees can be restored from
+
+    Each loaded tree is kept as its serialized bytes, and restored by parsing them again. Parsing from memory is faster
+    than copy.deepcopy() of the same tree, and the bytes take a fraction of the memory of a second tree. Only the files
+    named in restore() pay for it, so restoring after a build only costs as much as the files the mods touched.
+    """
+    def __init__(self, files: ConfigMap):
+        """
+        :param files: The ModManager.files map to take the snapshot of. Files which are not loaded are left out, they
+                      are still unchanged on disk.
+        """
+        self._sources = {}
+        for entry in files.entries():
+            if entry.loaded():
+                self._sources[entry.name] = ElementTree.tostring(entry.root(), encoding="us-ascii")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sources
+
+    def names(self) -> list:
+        """
+        :return: The names of the files in the snapshot
+        """
+        return list(self._sources)
+
+    def tree(self, name: str) -> ElementTree.ElementTree:
+        """
+        :param name: The name of a file in the snapshot
+        :return: A new copy of the file's tree as it was when the snapshot was taken
+        """
+        return ElementTree.ElementTree(ElementTree.fromstring(self._sources[name]))
+
+    def restore(self, files: ConfigMap, names=None) -> int:
+        """Put pristine trees back into a files map
+
+        :param files: The ModManager.files map to restore the trees of
+        :param names: The names of the files to restore, by default every file in the snapshot
+        :return: The number of files restored
+        """
+        restored = 0
+        for name in (self._sources if names is None else names):
+            if name in self._sources and name in files:
+                files.entry(name).set_tree(self.tree(name))
+                restored += 1
+        return restored
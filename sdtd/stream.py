@@ -0,0 +1,61 @@
+import xml.etree.ElementTree as ElementTree
+from xml.sax.saxutils import escape, quoteattr
+
+
+def _start_tag(element: ElementTree.Element) -> str:
+    attributes = "".join(" {}={}".format(key, quoteattr(value)) for key, value in element.items())
+    return "<{}{}>{}".format(element.tag, attributes, escape(element.text or ""))
+
+
+def stream_transform(source_path: str, output_path: str, rules: list) -> int:
+    """Apply rules to a config file while reading it, writing the result as it goes
+
+    Only one direct child of the root element, such as a single <item>, is held in memory at a time. Each child is
+    run through the rules and written out once its tail text has been read, then dropped from the tree.
+
+    The output is encoded the same way ElementTree.ElementTree.write() encodes it, so files transformed here look the
+    same as files written from a loaded tree.
+
+    :param source_path: The config file to read
+    :param output_path: The file to write the transformed config to
+    :param rules: The list of sdtd.rules.Rule objects to apply to every direct child of the root, in order
+    :return: The number of properties changed
+    """
+    changed = 0
+    depth = 0
+    root = None
+    pending = None
+    started = False
+    with open(output_path, "wb") as out:
+        def write(text):
+            out.write(text.encode("us-ascii", "xmlcharrefreplace"))
+
+        def flush():
+            nonlocal changed, started
+            if not started:
+                # The root text is only known once the parser reaches the first child or the end of the root
+                write(_start_tag(root))
+                started = True
+            if pending is not None:
+                for rule in rules:
+                    if rule.apply(pending) is not None:
+                        changed += 1
+                write(ElementTree.tostring(pending, encoding="unicode"))
+                del root[0]
+
+        for event, element in ElementTree.iterparse(source_path, events=("start", "end")):
+            if event == "start":
+                if depth == 0:
+                    root = element
+                elif depth == 1:
+                    flush()
+                    pending = None
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 1:
+                    pending = element
+                elif depth == 0:
+                    flush()
+                    write("</{}>".format(root.tag))
+    return changed
@@ -0,0 +1,264 @@
+import array
+import math
+import xml.etree.ElementTree as ElementTree
+from sdtd.inheritance import own_properties
+from sdtd.rules import Rule, format_number, parse_numbers, set_value
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Column(object):
+    """Numeric values of one property for every row of a PropertyTable
+
+    Values are stored as doubles, width values per row, so tiered values such as "10,20,30" take one slot per tier.
+    Rows with fewer tiers than the width, missing properties and values which are not numbers are padded with NaN.
+    """
+    __slots__ = ("prop", "width", "values", "_original")
+
+    def __init__(self, prop: str, width: int, flat: list):
+        """
+        :param prop: The property path, such as "Attributes/EntityDamage"
+        :param width: The number of values per row
+        :param flat: The values, row after row
+        """
+        self.prop = prop
+        self.width = width
+        if numpy is not None:
+            values = numpy.array(flat, dtype=numpy.float64)
+            self.values = values if width == 1 else values.reshape(-1, width)
+        else:
+            self.values = array.array("d", flat)
+        self._original = self._copy()
+
+    def _copy(self):
+        if numpy is not None:
+            return self.values.copy()
+        return array.array("d", self.values)
+
+    def row(self, index: int) -> list:
+        """
+        :param index: The row index
+        :return: The values of the row, as a list of floats
+        """
+        if numpy is not None:
+            return [float(value) for value in numpy.atleast_1d(self.values[index])]
+        return list(self.values[index * self.width:(index + 1) * self.width])
+
+    def set_row(self, index: int, values: list):
+        """
+        :param index: The row index
+        :param values: The new values of the row, padded with NaN up to the width
+        """
+        if len(values) > self.width:
+            raise ValueError("Row of {} values does not fit column '{}' of width {}".format(len(values), self.prop,
+                                                                                           self.width))
+        padded = list(values) + [math.nan] * (self.width - len(values))
+        if numpy is not None:
+            self.values[index] = padded if self.width > 1 else padded[0]
+        else:
+            self.values[index * self.width:(index + 1) * self.width] = array.array("d", padded)
+
+    def assign(self, values):
+        """Replace every value of the column
+        :param values: With NumPy, an array of the same shape as values. Without it, a sequence of rows * width
+                       numbers, row after row.
+        """
+        if numpy is not None:
+            values = numpy.asarray(values, dtype=numpy.float64)
+            if values.shape != self.values.shape:
+                raise ValueError("Values of shape {} do not fit column '{}' of shape {}".format(
+                    values.shape, self.prop, self.values.shape))
+            self.values[...] = values
+        else:
+            values = array.array("d", values)
+            if len(values) != len(self.values):
+                raise ValueError("{} values do not fit column '{}' of {} values".format(len(values), self.prop,
+                                                                                       len(self.values)))
+            self.values[:] = values
+
+    def changed_rows(self) -> list:
+        """
+        :return: The indices of the rows whose values differ from the ones the table was built with
+        """
+        if numpy is not None:
+            values = self.values.reshape(len(self.values), -1)
+            original = self._original.reshape(len(self._original), -1)
+            same = (values == original) | (numpy.isnan(values) & numpy.isnan(original))
+            return [int(index) for index in numpy.nonzero(~same.all(axis=1))[0]]
+        rows = []
+        width = self.width
+        for index in range(len(self.values) // width):
+            for i in range(index * width, (index + 1) * width):
+                value, original = self.values[i], self._original[i]
+                if value != original and not (math.isnan(value) and math.isnan(original)):
+                    rows.append(index)
+                    break
+        return rows
+
+    def mark_written(self):
+        """Take the current values as the ones matching the tree"""
+        self._original = self._copy()
+
+
+class PropertyTable(object):
+    """Array backed, column oriented copy of the numeric properties of the children of a root
+
+    Each property becomes a Column, indexed by the same row numbers, with rows keyed by the name attribute of their
+    element. With NumPy installed, Column.values is a float64 ndarray, of shape (rows,) for single values or (rows,
+    width) for tiered ones, so whole catalogs can be rebalanced with vectorized operations. Without NumPy it is a flat
+    array.array of doubles, row after row. Either way table[prop] gives the values of a column and table[prop] = values
+    replaces them, so with NumPy table[prop] *= 1.25 scales a whole column. Without NumPy table[prop] is a list copy
+    of the flat values, since in place arithmetic on sequences repeats them; assign a new list instead, such as
+    table[prop] = [value * 1.25 for value in table[prop]].
+
+    Changes to the columns are written back to the tree in one pass by GameData.write_table().
+    """
+    def __init__(self, root_tag: str, elements: list, properties: list, values: list):
+        """Use build() rather than calling this directly
+
+        :param root_tag: The tag of the root the elements belong to
+        :param elements: The row elements
+        :param properties: The property paths of the columns
+        :param values: For each element, a dict mapping property paths to their values
+        """
+        self.root_tag = root_tag
+        self.elements = elements
+        self.names = [element.get("name") for element in elements]
+        self._rows = {}
+        for index, name in enumerate(self.names):
+            self._rows.setdefault(name, index)
+        self.columns = {}
+        for prop in properties:
+            numbers = [parse_numbers(row.get(prop)) or () for row in values]
+            width = max((len(row) for row in numbers), default=1) or 1
+            flat = []
+            for row in numbers:
+                flat.extend(row)
+                flat.extend([math.nan] * (width - len(row)))
+            self.columns[prop] = Column(prop, width, flat)
+
+    @staticmethod
+    def build(root_tag: str, root: ElementTree.Element, tag: str, properties: list=None, where=None,
+              properties_of=own_properties):
+        """Build a table from the children of a root, in a single pass over them
+
+        :param root_tag: The tag of the root
+        :param root: The root element
+        :param tag: The tag of the children to take rows from, such as "item"
+        :param properties: The property paths to make columns of. By default every property which has a number on
+                           at least one row and never holds anything else gets a column.
+        :param where: Optional predicate an element must match to get a row
+        :param properties_of: Function returning the dict of property paths to values of an element, such as
+                              Inheritance.properties() to include inherited values
+        :return: The PropertyTable
+        """
+        elements = []
+        values = []
+        for element in root:
+            if element.tag == tag and element.get("name") is not None and (where is None or where(element)):
+                elements.append(element)
+                values.append(properties_of(element) or {})
+        if properties is None:
+            numeric = {}
+            for row in values:
+                for prop, value in row.items():
+                    if numeric.get(prop, True):
+                        numeric[prop] = parse_numbers(value) is not None
+            properties = sorted(prop for prop, is_numeric in numeric.items() if is_numeric)
+        return PropertyTable(root_tag, elements, properties, values)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __contains__(self, prop: str) -> bool:
+        return prop in self.columns
+
+    def __getitem__(self, prop: str):
+        """
+        :param prop: The property path
+        :return: The values array of the property's column with NumPy, a list copy of the flat values without it
+        """
+        if numpy is not None:
+            return self.columns[prop].values
+        return list(self.columns[prop].values)
+
+    def __setitem__(self, prop: str, values):
+        """
+        :param prop: The property path, which must have a column
+        :param values: The new values, in the form __getitem__ returns them
+        """
+        self.columns[prop].assign(values)
+
+    def row(self, name: str) -> int:
+        """
+        :param name: The name attribute of an element
+        :return: The row index of the element, or None if it has no row
+        """
+        return self._rows.get(name, None)
+
+    def get(self, name: str, prop: str) -> list:
+        """
+        :param name: The name attribute of an element
+        :param prop: The property path
+        :return: The values of the property, without padding, or None if the element or property is missing
+        """
+        index = self._rows.get(name, None)
+        if index is None or prop not in self.columns:
+            return None
+        values = _leading(self.columns[prop].row(index))
+        return values if len(values) > 0 else None
+
+    def set(self, name: str, prop: str, values):
+        """Change the values of a property on one row
+        :param name: The name attribute of an element
+        :param prop: The property path, which must have a column
+        :param values: A number, or a list of numbers for tiered values
+        """
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        self.columns[prop].set_row(self._rows[name], values)
+
+    def changes(self) -> list:
+        """
+        :return: List of (element, property path, new value) for every changed cell, with values formatted the way
+                 config files write them. Rows without any number are left out, properties can not be removed.
+        :raises ValueError: If a changed row holds an infinite value, or NaN followed by a number, which config files
+                            can not express. Nothing is written by GameData.write_table() in that case.
+        """
+        result = []
+        for prop, column in self.columns.items():
+            for index in column.changed_rows():
+                row = column.row(index)
+                values = _leading(row)
+                if not all(math.isfinite(value) for value in values) or \
+                        not all(math.isnan(value) for value in row[len(values):]):
+                    raise ValueError("Column '{}' has infinite or NaN values on row '{}': {}".format(
+                        prop, self.names[index], row))
+                if len(values) > 0:
+                    result.append((self.elements[index], prop, ",".join(format_number(value) for value in values)))
+        return result
+
+    def rules(self) -> list:
+        """
+        :return: For every changed cell, the (element, sdtd.rules.Rule) pair which writes the new value
+        """
+        return [(element, Rule(element.tag, prop, set_value(value), create_if_missing=True))
+                for element, prop, value in self.changes()]
+
+    def mark_written(self):
+        """Take the current values as the ones matching the tree, after they were written back"""
+        for column in self.columns.values():
+            column.mark_written()
+
+
+def _leading(values: list) -> list:
+    # The values up to the first NaN
+    result = []
+    for value in values:
+        if math.isnan(value):
+            break
+        result.append(value)
+    return result
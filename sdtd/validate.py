@@ -0,0 +1,200 @@
+import xml.etree.ElementTree as ElementTree
+import sdtd.selector
+
+# Root tags whose children share one name space in game; a block registers an item of the same name
+named_roots = ("items", "blocks")
+
+
+class Finding(object):
+    """A broken reference or other problem which would stop the game from loading the config"""
+    __slots__ = ("kind", "path", "message", "target", "mod")
+
+    def __init__(self, kind: str, path: str, message: str, target: str=None, mod: str=None):
+        """
+        :param kind: The check which found the problem: "duplicate", "missing", "extends" or "empty"
+        :param path: The path of the offending element, in the form XMLWrapper.__str__ produces
+        :param message: A description of the problem
+        :param target: The name the offending element defines or refers to, for every kind but "empty"
+        :param mod: The name of the mod which made the offending change, or added or removed the target, if known
+        """
+        self.kind = kind
+        self.path = path
+        self.message = message
+        self.target = target
+        self.mod = mod
+
+    def __str__(self):
+        if self.mod is None:
+            return "{}: {}".format(self.path, self.message)
+        return "{}: {} (mod '{}')".format(self.path, self.message, self.mod)
+
+    def __repr__(self):
+        return "Finding({!r}, {!r}, {!r}, {!r}, {!r})".format(self.kind, self.path, self.message, self.target,
+                                                              self.mod)
+
+
+def validate(roots, journal=None) -> list:
+    """Check the references between the config files
+
+    Every root is walked once, collecting the defined names into sets and the references into lists, and the references
+    are then checked against the sets, so the whole check is linear in the size of the config. The checks are:
+
+    - names defined more than once in a root, or by both an item and a block
+    - recipe outputs, recipe ingredients, block drops and loot entries naming an item or block which does not exist
+    - loot entries naming a loot group which does not exist
+    - Extends properties naming an item or block which does not exist
+    - properties without a value, such as ones created through a wrapper which never had their value set
+
+    :param roots: Mapping of root tags to root elements, such as GameData.roots. Missing roots are skipped.
+    :param journal: If given, the sdtd.journal.Journal the build recorded, used to name the mod responsible for each
+                    finding
+    :return: The list of Finding objects, duplicates and empty properties first, then broken references
+    """
+    findings = []
+    names = set()       # Item and block names
+    defined = {}        # root tag -> set of names defined in the root
+    # (kind, root tag, owner, referencing element, name, set the name must be in or None for names, message). Paths
+    # are only built for the references which turn out to be broken.
+    references = []
+
+    for root_tag in named_roots:
+        root = _get(roots, root_tag)
+        if root is None:
+            continue
+        own = defined.setdefault(root_tag, set())
+        for element in root:
+            name = element.get("name")
+            if name is None:
+                continue
+            if name in own:
+                findings.append(Finding("duplicate", _named_path(root_tag, element),
+                                        "Duplicate name '{}'".format(name), name))
+            elif name in names:
+                findings.append(Finding("duplicate", _named_path(root_tag, element),
+                                        "Name '{}' is also used in another file".format(name), name))
+            own.add(name)
+            names.add(name)
+            _check_properties(root_tag, element, references, findings)
+            if root_tag == "blocks":
+                for drop in element.iter("drop"):
+                    if drop.get("name") is not None:
+                        references.append(("missing", root_tag, element, drop, drop.get("name"), None,
+                                           "Drop of missing item '{}'"))
+
+    root = _get(roots, "recipes")
+    if root is not None:
+        for element in root:
+            name = element.get("name")
+            if element.tag != "recipe" or name is None:
+                continue
+            # Several recipes may craft the same item, so recipe names are not checked for duplicates
+            references.append(("missing", "recipes", element, None, name, None, "Recipe for missing item '{}'"))
+            for ingredient in element.iter("ingredient"):
+                if ingredient.get("name") is not None:
+                    references.append(("missing", "recipes", element, ingredient, ingredient.get("name"), None,
+                                       "Ingredient is missing item '{}'"))
+
+    root = _get(roots, "lootcontainers")
+    if root is not None:
+        own = defined.setdefault("lootcontainers", set())
+        for element in root:
+            name = element.get("name")
+            if element.tag != "lootgroup" or name is None:
+                continue
+            if name in own:
+                findings.append(Finding("duplicate", _named_path("lootcontainers", element),
+                                        "Duplicate loot group '{}'".format(name), name))
+            own.add(name)
+            for entry in element.iter("item"):
+                if entry.get("name") is not None:
+                    references.append(("missing", "lootcontainers", element, entry, entry.get("name"), None,
+                                       "Loot entry for missing item '{}'"))
+                elif entry.get("group") is not None:
+                    references.append(("missing", "lootcontainers", element, entry, entry.get("group"),
+                                       "lootcontainers", "Loot entry for missing group '{}'"))
+
+    for kind, root_tag, owner, child, name, key, message in references:
+        if name not in (names if key is None else defined[key]):
+            findings.append(Finding(kind, _reference_path(root_tag, owner, child), message.format(name), name))
+
+    if journal is not None and len(findings) > 0:
+        _blame(findings, journal)
+    return findings
+
+
+def _get(roots, tag: str):
+    if tag not in roots:
+        return None
+    return roots[tag]
+
+
+def _named_path(parent_path: str, element: ElementTree.Element) -> str:
+    # Same form as ConfigRoot.child_path, below any parent path rather than only the root
+    name = element.get("name")
+    if name is None:
+        return "{}/{}".format(parent_path, element.tag)
+    return "{}/{}".format(parent_path, sdtd.selector.compile_selector(element.tag, {"name": name}).xpath)
+
+
+def _reference_path(root_tag: str, owner: ElementTree.Element, child) -> str:
+    path = _named_path(root_tag, owner)
+    if child is None:
+        return path
+    if isinstance(child, list):
+        # Property classes leading to a property, followed by the property itself
+        for property_class in child[:-1]:
+            path = "{}/{}".format(path, sdtd.selector.compile_selector(
+                "property", {"class": property_class.get("class")}).xpath)
+        child = child[-1]
+    if child.get("name") is None and child.get("group") is not None:
+        return "{}/{}".format(path, sdtd.selector.compile_selector(child.tag, {"group": child.get("group")}).xpath)
+    return _named_path(path, child)
+
+
+def _check_properties(root_tag: str, element: ElementTree.Element, references: list, findings: list):
+    pending = [(element, [])]
+    while len(pending) > 0:
+        parent, classes = pending.pop()
+        for child in parent:
+            if child.tag != "property":
+                continue
+            if child.get("class") is not None:
+                pending.append((child, classes + [child]))
+                continue
+            name = child.get("name")
+            if name is None:
+                continue
+            value = child.get("value")
+            if value is None:
+                findings.append(Finding("empty", _reference_path(root_tag, element, classes + [child]),
+                                        "Property '{}' has no value".format(name)))
+            elif name == "Extends" and len(classes) == 0:
+                references.append(("extends", root_tag, element, child, value, root_tag, "Extends missing '{}'"))
+
+
+def _blame(findings: list, journal):
+    # Map the paths the journal touched to the last mod which touched them. Appends are recorded at the path of the
+    # parent, so the path of the appended element is derived from the element.
+    mods = {}
+    for mutation in journal.entries:
+        if mutation.mod is None:
+            continue
+        if mutation.op == "append" and mutation.element is not None:
+            mods[_named_path(mutation.path, mutation.element)] = mutation.mod
+        else:
+            mods[mutation.path] = mutation.mod
+    for finding in findings:
+        path = finding.path
+        while path:
+            mod = mods.get(path, None)
+            if mod is not None:
+                finding.mod = mod
+                break
+            path = path.rpartition("/")[0]
+        if finding.mod is None and finding.target is not None:
+            # The element itself may be untouched, and the element of the same name added or removed by a mod
+            for root_tag, tag in (("items", "item"), ("blocks", "block"), ("lootcontainers", "lootgroup")):
+                mod = mods.get(_named_path(root_tag, ElementTree.Element(tag, {"name": finding.target})), None)
+                if mod is not None:
+                    finding.mod = mod
+                    break
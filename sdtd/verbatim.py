@@ -0,0 +1,207 @@
+import re
+import xml.etree.ElementTree as ElementTree
+from sdtd.elements import ConfigListener
+
+# Markup tokens of an XML document. Text between tokens never contains "<", so scanning from one "<" to the next finds
+# every tag. Quoted attribute values may contain ">".
+_token = re.compile(rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<!DOCTYPE(?:[^>\[]|\[[^\]]*\])*>|</[^>]*>"
+                    rb"|<(?:[^>\"']|\"[^\"]*\"|'[^']*')*>", re.S)
+_tag_name = re.compile(rb"<([^\s/>]+)")
+
+
+def fingerprint(element: ElementTree.Element) -> int:
+    """Hash the contents of an element, which changes when anything inside it changes
+
+    :param element: The element
+    :return: Hash of the tags, attributes and text of element and everything inside it, leaving out its own tail
+    """
+    return hash(tuple((e.tag, tuple(e.attrib.items()), e.text, e.tail if e is not element else None)
+                      for e in element.iter()))
+
+
+class SourceMap(object):
+    """Byte ranges of the direct children of a root element in the file the root was parsed from
+
+    Only the direct children of the root, such as every <item> of items.xml, are mapped. They are the unit mods change,
+    and re-emitting a whole changed item is cheap next to the file around it.
+
+    Every child is fingerprinted when it is mapped, so changes made directly on raw elements and never reported to the
+    ChangeTracker can still be found by unreported() before the source is trusted.
+    """
+    __slots__ = ("data", "root", "children", "_index", "_starts", "_ends", "_open_end", "_attrib", "_compact",
+                 "_fingerprints")
+
+    def __init__(self, data: bytes, root: ElementTree.Element, spans: list, open_end: int, fingerprints: list=None):
+        """
+        :param data: The contents of the source file
+        :param root: The root element parsed from data
+        :param spans: The (start, end) byte range of every child of root, in document order
+        :param open_end: The offset right after the start tag of the root
+        :param fingerprints: The fingerprints of the children of an identical tree, computed from root if not given
+        """
+        self.data = data
+        self.root = root
+        # The children the spans belong to; kept referenced so their ids stay unique
+        self.children = list(root)
+        self._index = {id(child): i for i, child in enumerate(self.children)}
+        self._starts = [start for start, _ in spans]
+        self._ends = [end for _, end in spans]
+        self._open_end = open_end
+        self._attrib = dict(root.attrib)
+        # ElementTree writes empty elements as <tag />; match sources which mostly write <tag/>. ElementTree escapes ">"
+        # in text and attribute values, so " />" only ever ends an empty element.
+        self._compact = data.count(b" />") * 2 < data.count(b"/>")
+        if fingerprints is None:
+            fingerprints = [fingerprint(child) for child in self.children]
+        self._fingerprints = fingerprints
+
+    @staticmethod
+    def scan(data: bytes, root: ElementTree.Element):
+        """Map the children of a root to their byte ranges in the source
+
+        :param data: The contents of the file root was parsed from
+        :param root: The root element
+        :return: The SourceMap, or None if the source does not line up with the children of root, such as when root
+                 was changed after it was parsed
+        """
+        if data[:2] in (b"\xff\xfe", b"\xfe\xff"):
+            # UTF-16, which the byte level scan can not read
+            return None
+        depth = 0
+        spans = []
+        open_end = None
+        close_start = None
+        for match in _token.finditer(data):
+            token = match.group()
+            kind = token[1:2]
+            if kind == b"/":
+                depth -= 1
+                if depth == 1:
+                    spans[-1][1] = match.end()
+                elif depth == 0:
+                    close_start = match.start()
+                    break
+            elif kind != b"!" and kind != b"?":
+                empty = token.endswith(b"/>")
+                if depth == 0:
+                    open_end = match.end()
+                elif depth == 1:
+                    spans.append([match.start(), match.end(), _tag_name.match(token).group(1)])
+                if not empty:
+                    depth += 1
+        children = list(root)
+        if close_start is None or len(spans) == 0 or len(spans) != len(children):
+            return None
+        for child, (_, _, tag) in zip(children, spans):
+            if not isinstance(child.tag, str) or child.tag.encode("utf-8") != tag:
+                return None
+        return SourceMap(data, root, [(start, end) for start, end, _ in spans], open_end)
+
+    def rebind(self, root: ElementTree.Element):
+        """Map a fresh, unchanged copy of the original tree, such as one restored from a sdtd.snapshot.Snapshot
+        :param root: The root of the copy
+        :return: The SourceMap for the copy
+        """
+        if len(root) != len(self._starts):
+            return None
+        return SourceMap(self.data, root, list(zip(self._starts, self._ends)), self._open_end, self._fingerprints)
+
+    def unreported(self, dirty=()) -> list:
+        """Find the children which changed since they were mapped without being reported as dirty
+
+        :param dirty: The ids of the children which were reported as changed, see ChangeTracker.dirty()
+        :return: The unreported changed children, in document order
+        """
+        changed = []
+        for child, expected in zip(self.children, self._fingerprints):
+            if id(child) not in dirty and fingerprint(child) != expected:
+                changed.append(child)
+        return changed
+
+    def serialize(self, dirty=()) -> bytes:
+        """Serialize the root, copying the source bytes of every child which was not changed
+
+        Children are written in their current order. Each original child keeps the whitespace and comments which
+        preceded it in the source. New children are indented like the last child of the source.
+
+        :param dirty: The ids of the children which were changed, and the id of the root if its attributes changed
+        :return: The serialized file, or None if the root itself changed and has to be serialized as a whole
+        """
+        root = self.root
+        if id(root) in dirty or root.attrib != self._attrib:
+            return None
+        data = self.data
+        starts = self._starts
+        ends = self._ends
+        # The line break and indentation before the last child, used for new children
+        indent = data[self._gap_start(len(starts) - 1):starts[-1]]
+        indent = indent[indent.rfind(b"\n"):] if b"\n" in indent else indent
+
+        parts = [data[:self._open_end]]
+        for child in root:
+            i = self._index.get(id(child), None)
+            if i is None:
+                parts.append(indent)
+                parts.append(self._fragment(child))
+                continue
+            parts.append(data[self._gap_start(i):starts[i]])
+            parts.append(data[starts[i]:ends[i]] if id(child) not in dirty else self._fragment(child))
+        parts.append(data[ends[-1]:])
+        return b"".join(parts)
+
+    def _gap_start(self, i: int) -> int:
+        # The start of the whitespace and comments before child i
+        return self._open_end if i == 0 else self._ends[i - 1]
+
+    def _fragment(self, element: ElementTree.Element) -> bytes:
+        # The tail belongs to the whitespace copied from the source, not to the element
+        tail = element.tail
+        element.tail = None
+        try:
+            fragment = ElementTree.tostring(element, encoding="us-ascii")
+        finally:
+            element.tail = tail
+        if self._compact:
+            fragment = fragment.replace(b" />", b"/>")
+        return fragment
+
+
+class ChangeTracker(ConfigListener):
+    """Records which direct children of each root were changed, see SourceMap.serialize()
+
+    Only changes reported to a ConfigRoot are seen: changes made through wrappers, the GameData API, rules and tables.
+    Changes made directly on raw elements should be reported with mark(); those which are not are caught by
+    SourceMap.unreported() when the file is written, at the cost of serializing the whole file.
+    """
+    def __init__(self):
+        self._dirty = {}  # id(root element) -> set of ids of changed children, including the root's own id
+
+    def dirty(self, root: ElementTree.Element) -> set:
+        """
+        :param root: A root element
+        :return: The ids of the changed children of root
+        """
+        return self._dirty.get(id(root), set())
+
+    def mark(self, root: ElementTree.Element, element: ElementTree.Element):
+        """Report a change made directly on a raw element
+        :param root: The root element of the file
+        :param element: The direct child of root containing the change, or root itself
+        """
+        self._dirty.setdefault(id(root), set()).add(id(element))
+
+    def clear(self):
+        """Forget every change, such as after the trees were restored to their source"""
+        self._dirty.clear()
+
+    def changed(self, root, chain: list, attribute: str, old_value: str, value: str):
+        self.mark(root.raw(), chain[-1] if len(chain) > 0 else root.raw())
+
+    def appended(self, root, chain: list, element: ElementTree.Element):
+        # New direct children of the root are not in the source map, so they are always serialized
+        if len(chain) > 0:
+            self.mark(root.raw(), chain[-1])
+
+    def removed(self, root, chain: list, element: ElementTree.Element):
+        if len(chain) > 0:
+            self.mark(root.raw(), chain[-1])
@@ -0,0 +1,124 @@
+import concurrent.futures
+import os
+import os.path
+import time
+from sdtd.ids import IdAllocator
+from sdtd.snapshot import Snapshot
+
+
+def scan(directory: str) -> dict:
+    """Record the state of every file under directory
+    :param directory: The directory to scan
+    :return: Dict mapping file paths to (modification time, size), leaving out __pycache__ directories
+    """
+    state = {}
+    for path, directories, file_names in os.walk(directory):
+        directories[:] = sorted(name for name in directories if name != "__pycache__")
+        for file_name in file_names:
+            file_path = os.path.join(path, file_name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            state[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+class Watcher(object):
+    """Resident rebuild loop for a ModManager
+
+    The vanilla config is parsed once and kept as a Snapshot. Every time a file in the mods directory changes, the
+    config files the previous build accessed are restored from the snapshot, every mod is applied again and only the
+    files the previous or the new build accessed are written. Mods whose source did not change are not recompiled or
+    re-executed, see sdtd.loader.ModLoader.
+
+    The pristine copies of the files a build touched are parsed on a background thread right after the build, while
+    the mods are being edited, so a rebuild normally finds them ready instead of waiting for the restore.
+    """
+    def __init__(self, manager, original: str, modded: str, mods: str, interval: float=0.5, workers: int=1):
+        """
+        :param manager: The ModManager to build with
+        :param original: The vanilla config directory
+        :param modded: The output directory
+        :param mods: The directory containing the mod scripts, which is watched for changes
+        :param interval: Seconds between polls of the mods directory
+        :param workers: Passed on to ModManager.load() and ModManager.apply_all()
+        """
+        self.manager = manager
+        self.original = original
+        self.modded = modded
+        self.mods = mods
+        self.interval = interval
+        self.workers = workers
+        self.builds = 0
+        self._snapshot = None   # type: Snapshot
+        self._state = None      # type: dict
+        self._touched = None    # type: set
+        self._prepared = None   # Future of the dict of pristine trees for the files in _touched
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def start(self):
+        """Load the baseline and make the first, complete build"""
+        self.manager.load(self.original, self.workers)
+        self._snapshot = Snapshot(self.manager.files)
+        self._state = scan(self.mods)
+        self.build()
+
+    def build(self):
+        """Rebuild from the baseline with the current mods"""
+        start = time.perf_counter()
+        manager = self.manager
+        if self._prepared is not None:
+            prepared = self._prepared.result()
+            for name, tree in prepared.items():
+                manager.files.entry(name).set_tree(tree)
+            manager._rebind_sources(prepared)
+            self._prepared = None
+        manager.data.post_load()
+        manager._accessed.clear()
+        manager.data.id_file = os.path.join(self.modded, IdAllocator.file_name)
+        manager.apply_all(self.mods, self.workers)
+        accessed = set(manager._accessed)
+        if self._touched is None:
+            # First build, the output directory may hold anything
+            manager.write(self.modded)
+        else:
+            # Files neither build touched are still pristine and were written as such before
+            manager.write(self.modded, accessed | self._touched)
+        manager.data.save_ids()
+        self._touched = accessed
+        self.builds += 1
+        print("Build {} finished in {:.3f} s".format(self.builds, time.perf_counter() - start))
+        self._prepared = self._executor.submit(self._prepare, sorted(name for name in accessed
+                                                                     if name in self._snapshot))
+
+    def _prepare(self, names: list) -> dict:
+        return {name: self._snapshot.tree(name) for name in names}
+
+    def poll(self) -> bool:
+        """Check the mods directory for changes, rebuilding if there are any
+        :return: If a rebuild was made
+        """
+        state = scan(self.mods)
+        if state == self._state:
+            return False
+        self._state = state
+        self.build()
+        return True
+
+    def run(self, builds: int=None):
+        """Start, then keep rebuilding on changes until interrupted
+
+        :param builds: Stop after this many builds, including the first one. None runs until KeyboardInterrupt.
+        """
+        if self._snapshot is None:
+            self.start()
+        print("Watching '{}' for changes, press Ctrl+C to stop".format(self.mods))
+        try:
+            while builds is None or self.builds < builds:
+                time.sleep(self.interval)
+                self.poll()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,133 @@
+import xml.etree.ElementTree as ElementTree
+from sdtd.elements import ConfigListener
+
+
+# Where item names are referenced: root tag -> (kind, tag of the referencing children of the root, tag of the
+# elements inside them naming an item)
+sources = {
+    "recipes": ("recipe", "recipe", "ingredient"),
+    "blocks": ("block", "block", "drop"),
+    "lootcontainers": ("lootgroup", "lootgroup", "item"),
+}
+
+
+class CrossReferences(ConfigListener):
+    """Reverse index from item names to the recipes, blocks and loot groups referring to them
+
+    The index is built in a single pass over the recipes, blocks and loot roots, see GameData.cross_references(). It is
+    registered as a listener of those roots, and a change anywhere inside a recipe, block or loot group re-indexes just
+    that element. Changes made directly on raw elements are not seen, call rebuild() after making them.
+    """
+    def __init__(self, config_roots: dict):
+        """
+        :param config_roots: Dict mapping the root tags in sources to their ConfigRoot objects. Missing roots are
+                             skipped.
+        """
+        self._config_roots = dict(config_roots)
+        self._by_item = {kind: {} for kind, _, _ in sources.values()}  # kind -> item name -> {id(owner): owner}
+        self._owners = {}  # id(owner) -> (kind, owner, item names)
+        self.rebuild()
+
+    def config_roots(self) -> dict:
+        """
+        :return: Dict mapping root tags to the ConfigRoot objects the index was built from
+        """
+        return self._config_roots
+
+    def rebuild(self):
+        """Rebuild the whole index from the roots"""
+        for index in self._by_item.values():
+            index.clear()
+        self._owners.clear()
+        for root_tag, config_root in self._config_roots.items():
+            kind, owner_tag, _ = sources[root_tag]
+            for owner in config_root.raw():
+                if owner.tag == owner_tag:
+                    self._add(root_tag, owner)
+
+    def recipes_using(self, item: str) -> list:
+        """
+        :param item: The item name
+        :return: The <recipe> elements with an ingredient of the given name
+        """
+        return self.referencing("recipe", item)
+
+    def blocks_dropping(self, item: str) -> list:
+        """
+        :param item: The item name
+        :return: The <block> elements with a drop of the given name
+        """
+        return self.referencing("block", item)
+
+    def loot_groups_containing(self, item: str) -> list:
+        """
+        :param item: The item name
+        :return: The <lootgroup> elements listing the given item directly
+        """
+        return self.referencing("lootgroup", item)
+
+    def referencing(self, kind: str, item: str) -> list:
+        """
+        :param kind: "recipe", "block" or "lootgroup"
+        :param item: The item name
+        :return: The elements of the given kind referring to the item, in the order they were indexed
+        """
+        return list(self._by_item[kind].get(item, {}).values())
+
+    def is_referenced(self, item: str) -> bool:
+        """
+        :param item: The item name
+        :return: If any recipe, block or loot group refers to the item
+        """
+        return any(item in index for index in self._by_item.values())
+
+    def _add(self, root_tag: str, owner: ElementTree.Element):
+        kind, _, reference_tag = sources[root_tag]
+        names = set()
+        for element in owner.iter(reference_tag):
+            name = element.get("name")
+            if name is not None and element is not owner:
+                names.add(name)
+        index = self._by_item[kind]
+        for name in names:
+            index.setdefault(name, {})[id(owner)] = owner
+        self._owners[id(owner)] = (kind, owner, names)
+
+    def _discard(self, owner: ElementTree.Element):
+        entry = self._owners.pop(id(owner), None)
+        if entry is None:
+            return
+        kind, _, names = entry
+        index = self._by_item[kind]
+        for name in names:
+            owners = index.get(name)
+            if owners is not None:
+                owners.pop(id(owner), None)
+                if len(owners) == 0:
+                    del index[name]
+
+    def _root_tag(self, root) -> str:
+        for root_tag, config_root in self._config_roots.items():
+            if config_root is root:
+                return root_tag
+        return None
+
+    def _reindex(self, root, owner: ElementTree.Element):
+        root_tag = self._root_tag(root)
+        if root_tag is None or owner.tag != sources[root_tag][1]:
+            return
+        self._discard(owner)
+        self._add(root_tag, owner)
+
+    def changed(self, root, chain: list, attribute: str, old_value: str, value: str):
+        if len(chain) > 0 and attribute == "name":
+            self._reindex(root, chain[-1])
+
+    def appended(self, root, chain: list, element: ElementTree.Element):
+        self._reindex(root, chain[-1] if len(chain) > 0 else element)
+
+    def removed(self, root, chain: list, element: ElementTree.Element):
+        if len(chain) > 0:
+            self._reindex(root, chain[-1])
+        elif self._root_tag(root) is not None:
+            self._discard(element)
@@ -0,0 +1,108 @@
+import contextlib
+import io
+import os
+import os.path
+import tempfile
+import threading
+import unittest
+
+import sdtd.log
+from sdtd.log import Logger
+
+
+class ListLogger(Logger):
+    """Logger keeping every write, so tests can look at what arrived and how it was batched"""
+    def __init__(self, level: int=sdtd.log.DEBUG):
+        Logger.__init__(self, level)
+        self.writes = []
+        self.flushes = 0
+        self.closed = False
+        self.threads = set()
+
+    def print(self, line: str):
+        self.threads.add(threading.current_thread().name)
+        self.writes.append(line)
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        self.closed = True
+
+    def text(self) -> str:
+        return "".join(self.writes)
+
+
+def config_xml(root_tag: str, tag: str, count: int) -> str:
+    """Build a config file with count numbered children, each with a Weight property
+
+    :param root_tag: The tag of the root element, such as "items"
+    :param tag: The tag of the children, such as "item"
+    :param count: The number of children
+    :return: The XML text of the config file
+    """
+    children = "".join("  <{0} name=\"{0}{1}\" id=\"{1}\">\n    <property name=\"Weight\" value=\"{2}\"/>\n  </{0}>\n"
+                       .format(tag, i, i % 7) for i in range(count))
+    return "<{0}>\n{1}</{0}>\n".format(root_tag, children)
+
+
+def quiet():
+    """
+    :return: Context manager capturing stdout in the io.StringIO it returns
+    """
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+class TempDirTestCase(unittest.TestCase):
+    """TestCase with a temporary directory which is removed again after every test"""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def path(self, *parts: str) -> str:
+        """
+        :return: The path of parts joined onto the temporary directory
+        """
+        return os.path.join(self.root, *parts)
+
+    def write_file(self, path: str, contents: str) -> str:
+        """Write contents to path, creating missing directories on the way
+
+        :param path: The path to write, relative to the temporary directory
+        :param contents: The text to write
+        :return: The absolute path of the file
+        """
+        path = self.path(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as fp:
+            fp.write(contents)
+        return path
+
+    def write_files(self, directory: str, files: dict) -> str:
+        """Write every file of files into directory
+
+        :param directory: The directory to write to, relative to the temporary directory
+        :param files: Dict mapping file names to their contents
+        :return: The absolute path of the directory
+        """
+        for name, contents in files.items():
+            self.write_file(os.path.join(directory, name), contents)
+        return self.path(directory)
+
+    def read_files(self, directory: str, names) -> dict:
+        """
+        :param directory: The directory to read from, relative to the temporary directory
+        :param names: The names of the files to read
+        :return: Dict mapping every name to the contents of the file
+        """
+        result = {}
+        for name in names:
+            with open(self.path(directory, name)) as fp:
+                result[name] = fp.read()
+        return result
+
+    quiet = staticmethod(quiet)
@@ -0,0 +1,45 @@
+import os
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from benchmarks.generate import generate
+from benchmarks.run import compare, default_mods, run_benchmarks
+from tests.helpers import TempDirTestCase
+
+
+class BenchmarkTest(TempDirTestCase):
+    def _read(self, directory: str) -> dict:
+        return self.read_files(directory, sorted(os.listdir(self.path(directory))))
+
+    def test_generate_is_deterministic(self):
+        generate(self.path("a"), items=40, blocks=30, seed=1)
+        generate(self.path("b"), items=40, blocks=30, seed=1)
+        generate(self.path("c"), items=40, blocks=30, seed=2)
+        self.assertEqual(sorted(self._read("a")), ["blocks.xml", "items.xml", "loot.xml", "recipes.xml"])
+        self.assertEqual(self._read("a"), self._read("b"))
+        self.assertNotEqual(self._read("a"), self._read("c"))
+        self.assertEqual(len(ElementTree.parse(self.path("a", "items.xml")).getroot().findall("item")), 40)
+        self.assertEqual(len(ElementTree.parse(self.path("a", "blocks.xml")).getroot().findall("block")), 30)
+
+    def test_run_every_phase(self):
+        generate(self.path("config"), items=40, blocks=30)
+        with self.quiet():
+            results = run_benchmarks(self.path("config"), default_mods, repeat=1)
+        self.assertIn("load", results)
+        self.assertIn("apply_all", results)
+        for result in results.values():
+            self.assertGreaterEqual(result["seconds"], 0.0)
+            self.assertGreater(result["peak_bytes"], 0)
+
+    def test_compare(self):
+        baseline = {"load": {"seconds": 1.0, "peak_bytes": 100, "throughput": 1.0, "unit": "MB/s"},
+                    "write": {"seconds": 1.0, "peak_bytes": 100, "throughput": 1.0, "unit": "MB/s"}}
+        results = {"load": {"seconds": 1.1, "peak_bytes": 100, "throughput": 1.0, "unit": "MB/s"},
+                   "write": {"seconds": 1.0, "peak_bytes": 200, "throughput": 1.0, "unit": "MB/s"},
+                   "new": {"seconds": 9.0, "peak_bytes": 900, "throughput": 1.0, "unit": "MB/s"}}
+        with self.quiet():
+            self.assertEqual(compare(results, baseline, 0.15), ["write"])
+
+
+if __name__ == "__main__":
+    unittest.main()
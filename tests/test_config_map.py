@@ -0,0 +1,79 @@
+import os
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.config import ConfigFile, ConfigMap, read_root_tag
+from sdtd.modmanager import ModManager
+from tests.helpers import TempDirTestCase
+
+_configs = {
+    "items.xml": "<items>\n  <item name=\"spear\" id=\"1\"/>\n</items>\n",
+    # Odd formatting which serializing the tree again would not keep
+    "blocks.xml": "<?xml version='1.0'?>\n<blocks>\n\t<block   name='wood' id='1' />\n</blocks>\n",
+    os.path.join("sub", "recipes.xml"): "<recipes>\n  <recipe name=\"spear\" count=\"1\"/>\n</recipes>\n",
+}
+
+
+class ConfigMapTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.config = self.write_files("config", _configs)
+
+    def _load(self, lazy: bool) -> ModManager:
+        manager = ModManager()
+        with self.quiet():
+            manager.load(self.config, lazy=lazy)
+        return manager
+
+    def _loaded(self, manager: ModManager) -> dict:
+        return {entry.name: entry.loaded() for entry in manager.files.entries()}
+
+    def test_read_root_tag(self):
+        self.assertEqual(read_root_tag(os.path.join(self.config, "blocks.xml")), "blocks")
+
+    def test_lazy_load_parses_nothing(self):
+        manager = self._load(True)
+        self.assertEqual(sorted(manager.files), sorted(_configs))
+        self.assertEqual(sorted(manager.data.roots), ["blocks", "items", "recipes"])
+        self.assertIn("items", manager.data.roots)
+        self.assertEqual(len(manager.data.roots), 3)
+        self.assertEqual(manager.files.entry("blocks.xml").tag, "blocks")
+        self.assertFalse(any(self._loaded(manager).values()))
+
+    def test_access_parses_one_file(self):
+        manager = self._load(True)
+        self.assertEqual(manager.data.find_item("spear").get("id"), "1")
+        self.assertEqual(self._loaded(manager), {name: name == "items.xml" for name in _configs})
+        self.assertIs(manager.files["items.xml"].getroot(), manager.data.items)
+
+    def test_lazy_matches_eager(self):
+        lazy = self._load(True)
+        eager = self._load(False)
+        for name in _configs:
+            self.assertEqual(ElementTree.tostring(lazy.files[name].getroot()),
+                             ElementTree.tostring(eager.files[name].getroot()))
+
+    def test_write_copies_unparsed_files(self):
+        manager = self._load(True)
+        manager.data.find_item("spear").set("id", "2")
+        with self.quiet():
+            manager.write(self.path("modded"))
+        written = self.read_files("modded", _configs)
+        self.assertEqual(written["blocks.xml"], _configs["blocks.xml"])
+        self.assertIn("id=\"2\"", written["items.xml"])
+        self.assertFalse(manager.files.entry("blocks.xml").loaded())
+
+    def test_assign_trees_and_elements(self):
+        files = ConfigMap(ConfigFile.root)
+        element = ElementTree.Element("items")
+        files["a"] = element
+        files["b"] = ElementTree.ElementTree(ElementTree.Element("blocks"))
+        self.assertIs(files["a"], element)
+        self.assertEqual(files.entry("b").tag, "blocks")
+        self.assertTrue(files.entry("b").loaded())
+        del files["a"]
+        self.assertEqual(list(files), ["b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.modmanager import GameData
+
+
+class ConfigRootIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.data = GameData()
+        self.data.roots["items"] = ElementTree.fromstring('<items><item name="a" id="1"/><item name="b" id="2"/>'
+                                                          '</items>')
+        self.data.post_load()
+        # Build the indexes before the raw changes below
+        self.assertTrue(self.data.find_item("a").exists())
+
+    def test_raw_append(self):
+        self.data.items.append(ElementTree.Element("item", {"name": "raw", "id": "3"}))
+        self.assertTrue(self.data.find_item("raw").exists())
+        self.assertIsNotNone(self.data.config_root("items").by_id(3))
+
+    def test_raw_remove(self):
+        self.data.items.remove(self.data.items[0])
+        self.assertFalse(self.data.find_item("a").exists())
+
+    def test_raw_rename(self):
+        self.data.items[0].set("name", "renamed")
+        self.assertFalse(self.data.find_item("a").exists())
+        self.assertTrue(self.data.find_item("renamed").exists())
+        self.assertEqual(self.data.find_item("renamed").get("id"), "1")
+
+    def test_create_item_sees_raw_append(self):
+        self.data.items.append(ElementTree.Element("item", {"name": "raw", "id": "3"}))
+        self.assertEqual(self.data.create_item("raw").get("id"), "3")
+        self.assertEqual(len(self.data.items), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.modmanager import GameData
+from tests.helpers import quiet
+
+
+class GameDataIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.data = GameData()
+        self.data.roots["items"] = ElementTree.fromstring(
+            '<items><item name="spear" id="1"/><item name="club" id="2"/><item name="club" id="5"/></items>')
+        self.data.roots["recipes"] = ElementTree.fromstring('<recipes><recipe name="spear" count="1"/></recipes>')
+        self.data.roots["blocks"] = ElementTree.fromstring('<blocks><block name="wood" id="1"/></blocks>')
+        self.data.post_load()
+
+    def test_lookup(self):
+        self.assertEqual(self.data.find_item("spear").get("id"), "1")
+        self.assertFalse(self.data.find_item("missing").exists())
+        self.assertEqual(self.data.config_root("items").by_id(2).get("name"), "club")
+        self.assertEqual(self.data.config_root("items").by_id("1", "item").get("name"), "spear")
+        self.assertEqual(self.data.config_root("recipes").by_name("spear").get("count"), "1")
+        self.assertEqual(self.data.config_root("blocks").by_name("wood", "block").get("id"), "1")
+        self.assertIsNone(self.data.config_root("blocks").by_name("wood", "item"))
+
+    def test_duplicate_names_return_first(self):
+        self.assertEqual(self.data.find_item("club").get("id"), "2")
+        self.data.find_item("club").remove()
+        self.assertEqual(self.data.find_item("club").get("id"), "5")
+
+    def test_create_item(self):
+        item = self.data.create_item("axe", 3)
+        self.assertEqual(item.get("id"), "3")
+        self.assertIs(self.data.find_item("axe").raw(), item.raw())
+        self.assertIs(self.data.config_root("items").by_id(3), item.raw())
+        self.assertIs(self.data.create_item("axe", 4).raw(), item.raw())
+
+    def test_create_item_rejects_duplicate_id(self):
+        with quiet():
+            self.assertFalse(self.data.create_item("axe", 1).exists())
+        self.assertFalse(self.data.find_item("axe").exists())
+
+    def test_set_updates_index(self):
+        self.data.find_item("spear").set("name", "pike")
+        self.assertFalse(self.data.find_item("spear").exists())
+        self.assertEqual(self.data.find_item("pike").get("id"), "1")
+
+    def test_remove_updates_index(self):
+        self.data.find_item("spear").remove()
+        self.assertFalse(self.data.find_item("spear").exists())
+        self.assertIsNone(self.data.config_root("items").by_id(1))
+        self.assertEqual(len(self.data.roots["items"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import copy
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.ids import IdAllocator, IntervalSet
+from sdtd.modmanager import GameData
+from tests.helpers import TempDirTestCase, quiet
+
+
+class IntervalSetTest(unittest.TestCase):
+    def test_empty_ranges_change_nothing(self):
+        values = IntervalSet(range(10, 20))
+        values.add(15, 15)
+        values.add(30, 25)
+        values.remove(16, 16)
+        values.remove(18, 12)
+        self.assertEqual(values.ranges(), [(10, 20)])
+
+    def test_adjacent_ranges_merge(self):
+        values = IntervalSet()
+        values.add(10, 20)
+        values.add(20, 30)
+        values.add(5, 10)
+        self.assertEqual(values.ranges(), [(5, 30)])
+
+    def test_overlapping_ranges_merge(self):
+        values = IntervalSet([1, 2, 3, 10, 11])
+        values.add(2, 12)
+        self.assertEqual(values.ranges(), [(1, 12)])
+        self.assertEqual(len(values), 11)
+
+    def test_remove_splits_and_trims(self):
+        values = IntervalSet(range(0, 30))
+        values.remove(10, 20)
+        self.assertEqual(values.ranges(), [(0, 10), (20, 30)])
+        values.remove(5, 25)
+        self.assertEqual(values.ranges(), [(0, 5), (25, 30)])
+        values.remove(0, 5)
+        self.assertEqual(values.ranges(), [(25, 30)])
+        values.remove(30, 40)
+        self.assertEqual(values.ranges(), [(25, 30)])
+        self.assertNotIn(24, values)
+        self.assertIn(25, values)
+
+    def test_overlaps(self):
+        values = IntervalSet(range(10, 20))
+        self.assertTrue(values.overlaps(5, 11))
+        self.assertTrue(values.overlaps(19, 25))
+        self.assertFalse(values.overlaps(5, 10))
+        self.assertFalse(values.overlaps(20, 25))
+
+    def test_first_gap(self):
+        values = IntervalSet([1, 2, 3, 5, 8, 9])
+        self.assertEqual(values.first_gap(), 0)
+        self.assertEqual(values.first_gap(1, 1), 4)
+        self.assertEqual(values.first_gap(2, 1), 6)
+        self.assertEqual(values.first_gap(3, 1), 10)
+        self.assertEqual(values.first_gap(1, 8), 10)
+        self.assertEqual(IntervalSet().first_gap(5, 7), 7)
+        with self.assertRaises(ValueError):
+            values.first_gap(0)
+
+
+class IdAllocatorTest(TempDirTestCase):
+    def test_allocate_skips_used_ids(self):
+        allocator = IdAllocator({"items": [1, 2, 3, 5]})
+        self.assertEqual(allocator.allocate("items", "a"), 4)
+        self.assertEqual(allocator.allocate("items", "b", 2), 6)
+        self.assertEqual(allocator.allocate("items", "a"), 4)
+        self.assertTrue(allocator.is_used("items", 7))
+
+    def test_non_positive_counts(self):
+        allocator = IdAllocator({"items": [1]})
+        with self.assertRaises(ValueError):
+            allocator.allocate("items", "a", 0)
+        with self.assertRaises(ValueError):
+            allocator.claim("items", 10, -1)
+        self.assertEqual(allocator.reservations("items"), {})
+
+    def test_reservations_survive_saving(self):
+        file_path = self.path("ids.json")
+        allocator = IdAllocator({"items": [1, 2]}, file_path)
+        self.assertEqual(allocator.allocate("items", "late"), 3)
+        self.assertTrue(allocator.save())
+        self.assertFalse(allocator.save())
+
+        # The reservation is kept even though the new item is added after another one this time
+        again = IdAllocator({"items": [1, 2]}, file_path)
+        self.assertEqual(again.allocate("items", "early"), 4)
+        self.assertEqual(again.allocate("items", "late"), 3)
+        again.release("items", "late")
+        self.assertEqual(again.reservations("items"), {"early": (4, 1)})
+        self.assertFalse(again.is_used("items", 3))
+
+    def test_reservations_taken_by_the_config_are_dropped(self):
+        file_path = self.path("ids.json")
+        allocator = IdAllocator({"items": [1]}, file_path)
+        allocator.allocate("items", "new")
+        allocator.save()
+        with quiet() as output:
+            again = IdAllocator({"items": [1, 2]}, file_path)
+        self.assertIn("dropping the reservation", output.getvalue())
+        self.assertEqual(again.reservations("items"), {})
+        self.assertEqual(again.allocate("items", "new"), 3)
+
+    def test_merge_allocates_conflicts_again(self):
+        allocator = IdAllocator({"items": [1, 2]})
+        lane = copy.deepcopy(allocator)
+        self.assertEqual(allocator.allocate("items", "mine"), 3)
+        self.assertEqual(lane.allocate("items", "theirs"), 3)
+        self.assertEqual(lane.allocate("items", "mine"), 4)
+        self.assertEqual(lane.allocate("items", "other"), 5)
+        # Names keep the ids they hold here, and other names get the first ids free after the merge
+        self.assertEqual(allocator.merge(lane), [("items", "theirs", 3, 4, 1), ("items", "mine", 4, 3, 1)])
+        self.assertEqual(allocator.reservations("items"), {"mine": (3, 1), "other": (5, 1), "theirs": (4, 1)})
+
+    def test_merge_ignores_ids_freed_by_the_other_allocator(self):
+        # The other allocator saw the config after the item with id 2 was removed
+        allocator = IdAllocator({"items": [1, 2]})
+        lane = IdAllocator({"items": [1]})
+        lane.allocate("items", "new")
+        self.assertEqual(allocator.merge(lane), [])
+        self.assertEqual(allocator.reservations("items"), {"new": (2, 1)})
+
+
+class GameDataIdsTest(unittest.TestCase):
+    def test_merge_moves_conflicting_ids(self):
+        data = GameData()
+        data.roots["items"] = ElementTree.fromstring('<items><item name="a" id="1"/></items>')
+        data.post_load()
+        lane = copy.deepcopy(data.id_allocator())
+        self.assertEqual(data.create_item("here").get("id"), "2")
+        # Another copy of the config created an item with the same id, which was merged into the root already
+        lane.allocate("items", "there")
+        data.items.append(ElementTree.Element("item", {"name": "there", "id": "2"}))
+        with quiet() as output:
+            self.assertEqual(data.merge_ids(lane), 1)
+        self.assertIn("moving them to 3-3", output.getvalue())
+        self.assertEqual(data.find_item("there").get("id"), "3")
+        self.assertEqual(data.config_root("items").by_id(3).get("name"), "there")
+        self.assertEqual(data.find_item("here").get("id"), "2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.modmanager import ModManager
+from tests.helpers import TempDirTestCase
+
+_configs = {
+    "items.xml": "<items>\n  <item name=\"spear\" id=\"1\"/>\n  <item name=\"club\" id=\"2\"/>\n</items>\n",
+    "blocks.xml": "<blocks>\n  <block name=\"wood\" id=\"1\"/>\n</blocks>\n",
+    "recipes.xml": "<recipes>\n  <recipe name=\"spear\" count=\"1\"/>\n</recipes>\n",
+}
+_mods = {
+    "items_mod.py": "def apply(data):\n    data.find_item(\"spear\").set(\"modded\", \"{}\")\n",
+    "blocks_mod.py": "def apply(data):\n    data.blocks[0].set(\"modded\", \"1\")\n",
+}
+
+
+class IncrementalTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.original = self.write_files("original", _configs)
+        self.mods = self.write_files("mods", {name: contents.format(1) for name, contents in _mods.items()})
+        self.modded = self.path("modded")
+
+    def _outputs(self, directory: str) -> dict:
+        # Incremental builds copy files no mod touched as they are, so only the contents are compared
+        return {name: ElementTree.canonicalize(contents, strip_text=True)
+                for name, contents in self.read_files(directory, _configs).items()}
+
+    def _incremental(self) -> str:
+        with self.quiet() as output:
+            ModManager().run(self.original, self.modded, self.mods, incremental=True)
+        return output.getvalue()
+
+    def _full(self) -> dict:
+        with self.quiet():
+            ModManager().run(self.original, self.path("full"), self.mods)
+        return self._outputs("full")
+
+    def test_matches_full_build(self):
+        self._incremental()
+        self.assertEqual(self._outputs("modded"), self._full())
+        self.assertIn("is up to date", self._incremental())
+
+        self.write_file("mods/items_mod.py", _mods["items_mod.py"].format(2))
+        self.assertIn("Rebuilt 1 of 3 files", self._incremental())
+        self.assertEqual(self._outputs("modded"), self._full())
+
+        self.write_file("original/blocks.xml", _configs["blocks.xml"].replace("wood", "stone"))
+        self.assertIn("Rebuilt 1 of 3 files", self._incremental())
+        self.assertEqual(self._outputs("modded"), self._full())
+
+    def test_edited_output_is_rebuilt(self):
+        self._incremental()
+        self.write_file("modded/recipes.xml", "<recipes/>\n")
+        self._incremental()
+        self.assertEqual(self._outputs("modded"), self._full())
+
+
+if __name__ == "__main__":
+    unittest.main()
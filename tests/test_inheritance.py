@@ -0,0 +1,75 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.inheritance import own_properties
+from sdtd.modmanager import GameData
+from tests.helpers import quiet
+
+_items = ('<items>'
+          '<item name="base"><property name="Weight" value="1"/><property name="Tags" value="tool"/>'
+          '<property class="Attributes"><property name="EntityDamage" value="5"/></property></item>'
+          '<item name="middle"><property name="Extends" value="base" param1="Tags"/>'
+          '<property name="Weight" value="2"/></item>'
+          '<item name="leaf"><property name="Extends" value="middle"/><property name="Group" value="x"/></item>'
+          '<item name="other"><property name="Weight" value="7"/></item>'
+          '<item name="orphan"><property name="Extends" value="missing"/></item>'
+          '</items>')
+
+
+class InheritanceTest(unittest.TestCase):
+    def setUp(self):
+        self.data = GameData()
+        self.data.roots["items"] = ElementTree.fromstring(_items)
+        self.data.post_load()
+        self.inheritance = self.data.inheritance()
+
+    def test_own_properties(self):
+        self.assertEqual(own_properties(self.data.items[0]),
+                         {"Weight": "1", "Tags": "tool", "Attributes/EntityDamage": "5"})
+
+    def test_resolve(self):
+        leaf = self.data.effective_properties("leaf")
+        self.assertEqual(leaf["Weight"], "2")
+        self.assertEqual(leaf["Group"], "x")
+        self.assertEqual(leaf["Attributes/EntityDamage"], "5")
+        # param1 of Extends keeps Tags from being inherited
+        self.assertNotIn("Tags", leaf)
+        self.assertIsNone(self.data.effective_properties("missing"))
+        self.assertEqual(self.inheritance.value("leaf", "Missing", "default"), "default")
+        with quiet():
+            self.assertEqual(self.inheritance.value("orphan", "Extends"), "missing")
+        self.assertEqual(sorted(self.inheritance.resolve_all()), ["base", "leaf", "middle", "orphan", "other"])
+
+    def test_resolved_properties_are_memoized(self):
+        self.assertIs(self.inheritance.properties("leaf"), self.inheritance.properties("leaf"))
+        with self.assertRaises(TypeError):
+            self.inheritance.properties("leaf")["Weight"] = "9"
+
+    def test_parent_edit_invalidates_children(self):
+        other = self.inheritance.properties("other")
+        self.assertEqual(self.inheritance.value("leaf", "Attributes/EntityDamage"), "5")
+        self.data.find_item("base").attributes().entity_damage().set("value", "50")
+        self.assertEqual(self.inheritance.value("leaf", "Attributes/EntityDamage"), "50")
+        self.assertEqual(self.inheritance.value("middle", "Attributes/EntityDamage"), "50")
+        # Elements outside the chain keep their cached properties
+        self.assertIs(self.inheritance.properties("other"), other)
+
+    def test_edits_through_game_data(self):
+        self.assertEqual(self.inheritance.value("leaf", "Weight"), "2")
+        self.data.find_item("middle").weight().set("value", "3")
+        self.assertEqual(self.inheritance.value("leaf", "Weight"), "3")
+        self.data.find_item("middle").weight().remove()
+        self.assertEqual(self.inheritance.value("leaf", "Weight"), "1")
+
+    def test_raw_edits_need_invalidate(self):
+        self.assertEqual(self.inheritance.value("leaf", "Weight"), "2")
+        self.data.items[1][1].set("value", "4")
+        self.inheritance.invalidate("middle")
+        self.assertEqual(self.inheritance.value("leaf", "Weight"), "4")
+        self.data.items[1][1].set("value", "5")
+        self.inheritance.invalidate()
+        self.assertEqual(self.inheritance.value("leaf", "Weight"), "5")
+
+
+if __name__ == "__main__":
+    unittest.main()
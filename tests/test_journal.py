@@ -0,0 +1,162 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.journal import Journal
+from sdtd.modmanager import GameData, ModManager
+from tests.helpers import TempDirTestCase
+
+_items = ("<items>\n"
+          "  <item name=\"spear\" id=\"1\">\n    <property name=\"Weight\" value=\"2\"/>\n  </item>\n"
+          "  <item name=\"club\" id=\"2\"/>\n"
+          "  <item name=\"rock\" id=\"3\"/>\n"
+          "</items>\n")
+_mod = ("def apply(data):\n"
+        "    spear = data.find_item(\"spear\")\n"
+        "    spear.weight().set(\"value\", \"3\")\n"
+        "    spear.weight().set(\"value\", \"4\")\n"
+        "    spear.set(\"Extends\", \"club\")\n"
+        "    data.find_item(\"club\").remove()\n"
+        "    axe = data.create_item(\"axe\", 10)\n"
+        "    axe.weight(True).set(\"value\", \"5\")\n"
+        "    data.find_item(\"rock\").set(\"name\", \"stone\")\n"
+        "    data.find_item(\"stone\").weight(True).set(\"value\", \"1\")\n")
+# Changes the journal never hears of, next to one it does
+_raw_mod = ("import xml.etree.ElementTree as ElementTree\n\n\n"
+            "def apply(data):\n"
+            "    data.find_item(\"spear\").weight().set(\"value\", \"3\")\n"
+            "    data.items[1].set(\"raw\", \"1\")\n"
+            "    data.items.remove(data.items[2])\n"
+            "    data.items.append(ElementTree.Element(\"item\", {\"name\": \"axe\", \"id\": \"4\"}))\n"
+            "    data.items.set(\"version\", \"2\")\n")
+
+
+def _apply_modlet(root: ElementTree.Element, modlet: ElementTree.Element):
+    # Just enough of the game's XPath patching to check the generated operations
+    def find(xpath):
+        parts = xpath.lstrip("/").split("/", 1)
+        if parts[0] != root.tag:
+            return None
+        return root if len(parts) == 1 else root.find("./" + parts[1])
+
+    for operation in modlet:
+        if operation.tag == "set":
+            path, attribute = operation.get("xpath").rsplit("/@", 1)
+            find(path).set(attribute, operation.text)
+        elif operation.tag == "setattribute":
+            find(operation.get("xpath")).set(operation.get("name"), operation.text)
+        elif operation.tag == "append":
+            find(operation.get("xpath")).extend(operation)
+        elif operation.tag == "remove":
+            path, _, name = operation.get("xpath").rpartition("/")
+            parent = find(path)
+            parent.remove(parent.find("./" + name))
+
+
+class JournalTest(unittest.TestCase):
+    def test_compacted(self):
+        journal = Journal()
+        journal.record_set("items/item[@name='a']", "value", "1", "2")
+        journal.record_set("items/item[@name='a']", "name", "a", "b")
+        journal.record_set("items/item[@name='a']", "value", "2", "3")
+        journal.record_set("items/item[@name='b']", "value", None, "4")
+        compacted = journal.compacted()
+        self.assertEqual([(m.op, m.attribute, m.value) for m in compacted],
+                         [("set", "name", "b"), ("set", "value", "3"), ("setattribute", "value", "4")])
+        self.assertEqual(compacted[1].xpath(), "/items/item[@name='a']/@value")
+        self.assertEqual(len(journal), 4)
+
+    def test_changes_inside_appended_elements(self):
+        journal = Journal()
+        element = ElementTree.Element("item", {"name": "new"})
+        journal.record_append("items", element, (None,))
+        journal.record_set("items/item[@name='new']", "id", None, "5", (element,))
+        self.assertEqual(len(journal), 1)
+        journal.record_remove("items/item[@name='new']", element)
+        self.assertEqual(len(journal), 0)
+        self.assertEqual(journal.root_tags(), [])
+
+    def test_game_data_records_mods(self):
+        data = GameData()
+        data.journal = Journal()
+        data.roots["items"] = ElementTree.fromstring(_items)
+        data.post_load()
+        data.journal.mod = "first"
+        data.find_item("spear").weight().set("value", "3")
+        data.journal.mod = "second"
+        data.find_item("club").remove()
+        self.assertEqual([(m.op, m.mod) for m in data.journal.entries], [("set", "first"), ("remove", "second")])
+        modlet = data.journal.to_modlet("items")
+        self.assertEqual([child.tag for child in modlet], [ElementTree.Comment, "set", ElementTree.Comment, "remove"])
+
+    def test_unrecorded_changes(self):
+        root = ElementTree.fromstring("<items><item name=\"a\"/><item name=\"b\"/><item/></items>")
+        journal = Journal(raw=True)
+        journal.watch("items", root)
+        self.assertEqual(journal.unrecorded("items"), [])
+        self.assertEqual(journal.unrecorded("blocks"), [])
+        root[0].set("raw", "1")
+        root.remove(root[1])
+        self.assertEqual([(m.op, m.path) for m in journal.unrecorded("items")],
+                         [("remove", "items/item[@name='a']"), ("append", "items"),
+                          ("remove", "items/item[@name='b']")])
+        root[-1].set("raw", "1")
+        with self.assertRaises(ValueError):
+            journal.unrecorded("items")
+
+    def test_unwatched_journal_ignores_raw_changes(self):
+        root = ElementTree.fromstring("<items><item name=\"a\"/></items>")
+        journal = Journal()
+        journal.watch("items", root)
+        root[0].set("raw", "1")
+        self.assertEqual(journal.unrecorded("items"), [])
+
+
+class ModletTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.original = self.write_files("original", {"items.xml": _items})
+        self.mods = self.write_files("mods", {"mod.py": _mod})
+
+    def test_modlet_reproduces_full_build(self):
+        with self.quiet():
+            ModManager().run(self.original, self.path("full"), self.mods)
+            ModManager().run(self.original, self.path("modlet"), self.mods, modlet=True)
+        modlet = ElementTree.parse(self.path("modlet", "Config", "items.xml")).getroot()
+        self.assertEqual(modlet.tag, "configs")
+        self.assertEqual([operation.tag for operation in modlet if operation.tag is not ElementTree.Comment],
+                         ["set", "setattribute", "remove", "append", "set", "append"])
+        # The two Weight changes are compacted into the last one
+        self.assertEqual(modlet.find("set").text, "4")
+        self.assertEqual(ElementTree.parse(self.path("modlet", "ModInfo.xml")).find("ModInfo/Name").get("value"),
+                         "sdtd-modtool")
+
+        patched = ElementTree.fromstring(_items)
+        _apply_modlet(patched, modlet)
+        full = ElementTree.parse(self.path("full", "items.xml")).getroot()
+        self.assertEqual(ElementTree.canonicalize(ElementTree.tostring(patched), strip_text=True),
+                         ElementTree.canonicalize(ElementTree.tostring(full), strip_text=True))
+
+    def test_modlet_includes_raw_changes(self):
+        self.write_file("mods/mod.py", _raw_mod)
+        with self.quiet() as output:
+            ModManager().run(self.original, self.path("full"), self.mods)
+            ModManager().run(self.original, self.path("modlet"), self.mods, modlet=True)
+        self.assertIn("made directly on raw elements", output.getvalue())
+        modlet = ElementTree.parse(self.path("modlet", "Config", "items.xml")).getroot()
+        self.assertEqual([operation.tag for operation in modlet if operation.tag is not ElementTree.Comment],
+                         ["set", "setattribute", "remove", "append", "remove", "append"])
+
+        # The replaced club moves to the end, so the children are compared regardless of their order
+        patched = ElementTree.fromstring(_items)
+        _apply_modlet(patched, modlet)
+        full = ElementTree.parse(self.path("full", "items.xml")).getroot()
+        for root in (patched, full):
+            for child in root:
+                child.tail = None
+        self.assertEqual(patched.attrib, full.attrib)
+        self.assertEqual(sorted(ElementTree.tostring(child) for child in patched),
+                         sorted(ElementTree.tostring(child) for child in full))
+
+
+if __name__ == "__main__":
+    unittest.main()
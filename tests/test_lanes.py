@@ -0,0 +1,92 @@
+import io
+import unittest
+import xml.etree.ElementTree as ElementTree
+from contextlib import redirect_stdout
+
+from sdtd.modmanager import ModManager
+from tests.helpers import TempDirTestCase
+
+_configs = {
+    "items.xml": "<items>\n  <item name=\"spear\" id=\"1\">\n    <property name=\"Weight\" value=\"2\"/>\n  </item>\n"
+                 "  <item name=\"club\" id=\"2\"/>\n  <item name=\"rock\" id=\"3\"/>\n</items>\n",
+    "blocks.xml": "<blocks>\n  <block name=\"wood\" id=\"1\">\n    <property name=\"MaxDamage\" value=\"100\"/>\n"
+                  "  </block>\n  <block name=\"stone\" id=\"2\"/>\n</blocks>\n",
+    "recipes.xml": "<recipes>\n  <recipe name=\"spear\" count=\"1\"/>\n</recipes>\n",
+}
+
+# Three lanes of declared mods, more than the two workers used below, around an undeclared mod running on its own
+_mods = {
+    "a_items.py": "mod_info = {\"writes\": [\"items\"]}\n\n\ndef apply(data):\n"
+                  "    data.find_item(\"spear\").weight().set(\"value\", \"3\")\n"
+                  "    data.items.remove(data.find_item(\"club\").raw())\n"
+                  "    data.items[-1].set(\"raw\", \"1\")\n"
+                  "    data.create_item(\"axe\")\n",
+    "b_blocks.py": "from sdtd.rules import Rule, scale\n\nmod_info = {\"writes\": [\"blocks\"]}\n\n"
+                   "rules = {\"blocks.xml\": [Rule(\"block\", \"MaxDamage\", scale(2))]}\n",
+    "c_recipes.py": "import xml.etree.ElementTree as ElementTree\n\nmod_info = {\"writes\": [\"recipes\"]}\n\n\n"
+                    "def apply(data):\n"
+                    "    data.recipes.append(ElementTree.Element(\"recipe\", {\"name\": \"axe\", \"count\": \"1\"}))\n"
+                    "    data.recipes.set(\"changed\", \"yes\")\n",
+    "d_all.py": "def apply(data):\n    data.find_item(\"spear\").set(\"checked\", str(len(data.blocks)))\n",
+    "e_items.py": "mod_info = {\"writes\": [\"items\"], \"after\": [\"d_all\"]}\n\n\ndef apply(data):\n"
+                  "    data.find_item(\"axe\").weight(True).set(\"value\", \"5\")\n",
+    "f_blocks.py": "mod_info = {\"writes\": [\"blocks\"], \"after\": [\"d_all\"]}\n\n\ndef apply(data):\n"
+                   "    data.blocks.remove(data.blocks[0])\n",
+}
+
+
+class LanesTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.original = self.write_files("original", _configs)
+        self.mods = self.write_files("mods", _mods)
+
+    def _build(self, workers: int, verbatim: bool=False) -> dict:
+        modded = "modded{}{}".format(workers, verbatim)
+        with self.quiet():
+            ModManager(verbatim=verbatim).run(self.original, self.path(modded), self.mods, workers=workers)
+        return self.read_files(modded, _configs)
+
+    def test_parallel_matches_serial(self):
+        serial = self._build(1)
+        self.assertIn("value=\"3\"", serial["items.xml"])
+        self.assertNotIn("club", serial["items.xml"])
+        self.assertIn("raw=\"1\"", serial["items.xml"])
+        self.assertIn("checked=\"2\"", serial["items.xml"])
+        self.assertIn("name=\"axe\"", serial["recipes.xml"])
+        self.assertNotIn("wood", serial["blocks.xml"])
+        self.assertEqual(serial, self._build(2))
+
+    def test_parallel_matches_serial_verbatim(self):
+        # The raw changes are only reported when they come back from a lane, so the serial build serializes whole
+        # files where the parallel one copies unchanged elements; the contents must still be the same
+        serial = self._build(1, True)
+        parallel = self._build(2, True)
+        self.assertIn("value=\"5\"", serial["items.xml"])
+        for name in _configs:
+            self.assertEqual(ElementTree.canonicalize(serial[name], strip_text=True),
+                             ElementTree.canonicalize(parallel[name], strip_text=True))
+
+    def test_undeclared_changes_are_reported(self):
+        # Blocks are parsed lazily, so the rules for them are held back in a_items' lane and c_recipes parses them
+        mods = {
+            "a_items.py": "from sdtd.rules import Rule, scale\n\nmod_info = {\"writes\": [\"items\"]}\n\n"
+                          "rules = {\"blocks.xml\": [Rule(\"block\", \"MaxDamage\", scale(2))]}\n\n\n"
+                          "def apply(data):\n    data.recipes.set(\"changed\", \"yes\")\n",
+            "c_recipes.py": "mod_info = {\"writes\": [\"recipes\"]}\n\n\n"
+                            "def apply(data):\n    data.blocks[0].set(\"changed\", \"yes\")\n",
+            "d_items.py": "mod_info = {\"writes\": [\"items\"]}\n\n\ndef apply(data):\n    len(data.recipes)\n",
+        }
+        output = io.StringIO()
+        with redirect_stdout(output):
+            ModManager().run(self.original, self.path("modded"), self.write_files("undeclared", mods), workers=2,
+                             lazy=True)
+        self.assertIn("Warning: Mods a_items, d_items changed blocks.xml, recipes.xml, which they did not declare; "
+                      "these changes are lost\n", output.getvalue())
+        self.assertIn("Warning: Mods c_recipes changed blocks.xml, which they did not declare; these changes are "
+                      "lost\n", output.getvalue())
+        self.assertEqual(output.getvalue().count("which they did not declare"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import os.path
+import sys
+import unittest
+
+from sdtd.loader import ModLoader
+from tests.helpers import TempDirTestCase
+
+
+class ModLoaderTest(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.mod = self.write_file("mod.py", "value = 1\n")
+        self.cache = self.path("cache")
+
+    def test_module_names_differ_per_mod(self):
+        other = self.write_file(os.path.join("other", "mod.py"), "value = 2\n")
+        self.assertNotEqual(ModLoader.module_name(self.mod), ModLoader.module_name(other))
+        self.assertEqual(ModLoader.module_name(self.mod), ModLoader.module_name(self.mod))
+        self.assertTrue(ModLoader.module_name(self.mod, "1 mod").startswith(ModLoader.prefix + "__1_mod_"))
+
+        loader = ModLoader(self.cache)
+        first = loader.load(self.mod)
+        second = loader.load(other)
+        self.assertEqual((first.value, second.value), (1, 2))
+        self.assertIs(sys.modules[first.__name__], first)
+        self.assertIs(sys.modules[second.__name__], second)
+        loader.forget()
+        self.assertNotIn(first.__name__, sys.modules)
+
+    def test_unchanged_mod_is_not_executed_again(self):
+        loader = ModLoader(self.cache)
+        module = loader.load(self.mod)
+        self.assertIs(loader.load(self.mod), module)
+        self.write_file("mod.py", "value = 3\n")
+        changed = loader.load(self.mod)
+        self.assertEqual(changed.value, 3)
+        self.assertEqual(loader.compiled, [os.path.abspath(self.mod)] * 2)
+        loader.forget()
+
+    def test_memory_only_by_default(self):
+        loader = ModLoader()
+        self.assertEqual(loader.load(self.mod).value, 1)
+        loader.forget()
+        self.assertEqual(os.listdir(self.root), ["mod.py"])
+
+    def test_reuses_code_from_directory(self):
+        loader = ModLoader(self.cache)
+        loader.load(self.mod)
+        loader.forget()
+        self.assertEqual(loader.compiled, [os.path.abspath(self.mod)])
+
+        again = ModLoader(self.cache)
+        self.assertEqual(again.load(self.mod).value, 1)
+        again.forget()
+        self.assertEqual(again.compiled, [])
+
+    def test_failing_mod_leaves_nothing_behind(self):
+        self.write_file("mod.py", "raise RuntimeError('broken')\n")
+        loader = ModLoader(self.cache)
+        with self.assertRaises(RuntimeError):
+            loader.load(self.mod)
+        self.assertNotIn(ModLoader.module_name(self.mod), sys.modules)
+
+
+if __name__ == "__main__":
+    unittest.main()
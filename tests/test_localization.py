@@ -0,0 +1,95 @@
+import io
+import pickle
+import unittest
+from contextlib import redirect_stdout
+
+from sdtd.localization import Localization
+from tests.helpers import TempDirTestCase
+
+# The odd quoting of the spear row is kept as it is when the row is not changed
+_localization = ("Key,File,Type,english,german\n"
+                 "spear,items,Item,\"Spear\",Speer\n"
+                 "\"note\",items,Item,\"First line\nsecond line, with a comma\",Notiz\n"
+                 "club,items,Item,Club,Keule\n")
+
+
+class LocalizationTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.localization = Localization(self.write_file("Localization.txt", _localization))
+
+    def tearDown(self):
+        self.localization.close()
+        TempDirTestCase.tearDown(self)
+
+    def _written(self, name: str="out.txt", changes: bool=False) -> str:
+        if changes:
+            self.localization.write_changes(self.path(name))
+        else:
+            self.localization.write(self.path(name))
+        return self.read_files("", [name])[name]
+
+    def test_lookup(self):
+        self.assertEqual(self.localization.header(), ["Key", "File", "Type", "english", "german"])
+        self.assertEqual(self.localization.keys(), ["spear", "note", "club"])
+        self.assertEqual(self.localization.get("note"), "First line\nsecond line, with a comma")
+        self.assertEqual(self.localization.get("club", "german"), "Keule")
+        self.assertEqual(self.localization.row("spear")["english"], "Spear")
+        self.assertIsNone(self.localization.get("missing"))
+        self.assertIsNone(self.localization.get("club", "french"))
+
+    def test_unchanged_rows_are_written_verbatim(self):
+        self.assertEqual(self._written(), _localization)
+        self.localization.set("club", english="Mace")
+        self.localization.remove("note")
+        self.localization.set("bow", english="Bow")
+        self.assertEqual(self._written(), "Key,File,Type,english,german\n"
+                                          "spear,items,Item,\"Spear\",Speer\n"
+                                          "club,items,Item,Mace,Keule\n"
+                                          "bow,,,Bow,\n")
+        self.assertEqual(self.localization.keys(), ["spear", "club", "bow"])
+        self.assertNotIn("note", self.localization)
+        self.assertEqual(self._written("changes.txt", True), "Key,File,Type,english,german\n"
+                                                             "club,items,Item,Mace,Keule\n"
+                                                             "bow,,,Bow,\n")
+
+        self.localization.discard()
+        self.assertFalse(self.localization.changed())
+        self.assertEqual(self._written(), _localization)
+
+    def test_lookups_share_one_handle(self):
+        self.assertEqual(self.localization.get("club"), "Club")
+        handle = self.localization._file
+        self.assertEqual(self.localization.get("note", "german"), "Notiz")
+        self.assertEqual(self._written(), _localization)
+        self.localization.set("club", english="Mace")
+        self.assertIn("club,items,Item,Mace,Keule\n", self._written())
+        self.assertIs(self.localization._file, handle)
+
+        copy = pickle.loads(pickle.dumps(self.localization))
+        self.assertIsNone(copy._file)
+        self.assertEqual(copy.get("spear"), "Spear")
+        self.assertEqual(copy.get("club"), "Mace")
+        copy.close()
+
+    def test_duplicate_keys(self):
+        text = _localization + "spear,items,Item,Second Spear,Zweiter Speer\n" + "club,items,Item,Club 2,Keule 2\n"
+        self.localization = Localization(self.write_file("Duplicates.txt", text))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(self.localization.get("spear"), "Spear")
+        self.assertEqual(output.getvalue(), "Warning: 2 key(s) appear more than once in 'Localization.txt', using the "
+                                            "first record of each: club, spear\n")
+        self.assertEqual(self.localization.keys(), ["spear", "note", "club"])
+        self.assertEqual(self._written(), text)
+
+        # Changing a key drops its later records, so no record is left which would hide the change
+        self.localization.set("spear", english="Iron Spear")
+        self.localization.remove("club")
+        self.assertEqual(self._written(), "Key,File,Type,english,german\n"
+                                          "spear,items,Item,Iron Spear,Speer\n"
+                                          "\"note\",items,Item,\"First line\nsecond line, with a comma\",Notiz\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
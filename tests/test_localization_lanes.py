@@ -0,0 +1,42 @@
+import unittest
+
+from sdtd.modmanager import ModManager
+from tests.helpers import TempDirTestCase
+
+_items = "<items>\n  <item name=\"spear\"/>\n</items>\n"
+_blocks = "<blocks>\n  <block name=\"foo\"/>\n</blocks>\n"
+_localization = "Key,File,Type,english,german\nspear,items,Item,Spear,Speer\nfoo,blocks,Block,Foo,Foo\n"
+
+# m1 is undeclared, so it runs on its own; m2 and m3 write disjoint roots and share a batch as two lanes
+_mods = {
+    "m1.py": "def apply(data):\n    data.localization.set(\"spear\", english=\"Iron Spear\")\n",
+    "m2.py": "mod_info = {\"writes\": [\"items\"]}\n\n\ndef apply(data):\n"
+             "    data.localization.set(\"spear\", english=\"Steel Spear\")\n"
+             "    data.localization.set(\"foo\", german=\"FooNEU\")\n",
+    "m3.py": "mod_info = {\"writes\": [\"blocks\"]}\n\n\ndef apply(data):\n"
+             "    data.localization.set(\"foo\", english=\"FooEN\")\n",
+}
+
+
+class LocalizationLanesTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.original = self.write_files("original", {"items.xml": _items, "blocks.xml": _blocks,
+                                                      "Localization.txt": _localization})
+        self.mods = self.write_files("mods", _mods)
+
+    def _build(self, workers: int) -> str:
+        modded = "modded{}".format(workers)
+        with self.quiet():
+            ModManager().run(self.original, self.path(modded), self.mods, workers=workers)
+        return self.read_files(modded, ["Localization.txt"])["Localization.txt"]
+
+    def test_parallel_matches_serial(self):
+        serial = self._build(1)
+        self.assertIn("spear,items,Item,Steel Spear,Speer\n", serial)
+        self.assertIn("foo,blocks,Block,FooEN,FooNEU\n", serial)
+        self.assertEqual(serial, self._build(2))
+
+
+if __name__ == "__main__":
+    unittest.main()
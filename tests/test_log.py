@@ -0,0 +1,99 @@
+import unittest
+
+import sdtd.log
+from sdtd.log import FileLogger, Logger, MultiplexingLogger, QueueLogger
+from tests.helpers import ListLogger, TempDirTestCase
+
+
+class Exploding(object):
+    def __format__(self, spec):
+        raise AssertionError("a disabled message was formatted")
+
+
+class LoggerTest(unittest.TestCase):
+    def test_levels(self):
+        logger = ListLogger(sdtd.log.WARNING)
+        logger.debug("{}", Exploding())
+        logger.info("{}", Exploding())
+        logger.warning("careful {}", 1)
+        logger.error("broken {name}", name="x")
+        logger.write(None, "always\n")
+        self.assertEqual(logger.text(), "careful 1\nbroken x\nalways\n")
+        self.assertFalse(logger.enabled(sdtd.log.INFO))
+
+    def test_multiplexing_formats_once(self):
+        quiet = ListLogger(sdtd.log.ERROR)
+        loud = ListLogger(sdtd.log.DEBUG)
+        logger = MultiplexingLogger([quiet, loud])
+        logger.debug("a {}", 1)
+        logger.error("b {}", 2)
+        self.assertEqual(quiet.text(), "b 2\n")
+        self.assertEqual(loud.text(), "a 1\nb 2\n")
+
+    def test_default_logger(self):
+        self.assertIsInstance(sdtd.log.default_logger, Logger)
+
+
+class QueueLoggerTest(TempDirTestCase):
+    def test_order_and_batches(self):
+        target = ListLogger()
+        logger = QueueLogger(target, batch_size=16)
+        expected = []
+        for i in range(500):
+            if i % 50 == 0:
+                logger.warning("line {}", i)
+            else:
+                logger.info("line {}", i)
+            expected.append("line {}\n".format(i))
+        logger.flush()
+        self.assertEqual(target.text(), "".join(expected))
+        # Runs of lines with the same level are joined into one write
+        self.assertLess(len(target.writes), len(expected))
+        self.assertGreater(target.flushes, 0)
+        self.assertEqual(target.threads, {"sdtd-log"})
+        logger.close()
+
+    def test_level_filter(self):
+        target = ListLogger(sdtd.log.WARNING)
+        logger = QueueLogger(target)
+        self.assertFalse(logger.enabled(sdtd.log.INFO))
+        logger.info("{}", Exploding())
+        logger.warning("kept")
+        logger.close()
+        self.assertEqual(target.text(), "kept\n")
+
+    def test_flush_reaches_the_file(self):
+        path = self.path("log.txt")
+        logger = QueueLogger(FileLogger(path, buffering=1 << 20))
+        for i in range(200):
+            logger.info("line {}", i)
+        logger.flush()
+        with open(path) as fp:
+            self.assertEqual(len(fp.read().splitlines()), 200)
+        logger.close()
+
+    def test_levels_survive_multiplexing(self):
+        warnings = ListLogger(sdtd.log.WARNING)
+        everything = ListLogger(sdtd.log.DEBUG)
+        logger = MultiplexingLogger([QueueLogger(MultiplexingLogger([warnings, everything]))])
+        logger.info("info")
+        logger.warning("warning")
+        logger.close()
+        self.assertEqual(warnings.text(), "warning\n")
+        self.assertEqual(everything.text(), "info\nwarning\n")
+
+    def test_close_writes_everything(self):
+        target = ListLogger()
+        logger = QueueLogger(target)
+        for i in range(100):
+            logger.print("{}\n".format(i))
+        logger.close()
+        self.assertTrue(target.closed)
+        self.assertEqual(target.text(), "".join("{}\n".format(i) for i in range(100)))
+        # Closing twice, or flushing a closed logger, does nothing
+        logger.close()
+        logger.flush()
+
+
+if __name__ == "__main__":
+    unittest.main()
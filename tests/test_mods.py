@@ -0,0 +1,60 @@
+import types
+import unittest
+
+from sdtd.mods import ModInfo, order_mods, plan_batches
+from tests.helpers import quiet
+
+
+def _info(name: str, **info) -> ModInfo:
+    return ModInfo(name + ".py", types.SimpleNamespace(mod_info=dict(info, name=name)), name)
+
+
+def _names(infos) -> list:
+    return [info.name for info in infos]
+
+
+class OrderModsTest(unittest.TestCase):
+    def _order(self, *infos) -> list:
+        with quiet():
+            return _names(order_mods(list(infos)))
+
+    def test_ties_are_ordered_by_name(self):
+        self.assertEqual(self._order(_info("c"), _info("a"), _info("b")), ["a", "b", "c"])
+
+    def test_constraints(self):
+        ordered = self._order(_info("a", requires=["c"]), _info("b", before=["c"]), _info("c", after=["d"]),
+                              _info("d"), _info("e", after=["missing"]))
+        self.assertEqual(ordered, ["b", "d", "c", "a", "e"])
+
+    def test_missing_requirements_drop_dependents(self):
+        self.assertEqual(self._order(_info("a", requires=["b"]), _info("b", requires=["missing"]), _info("c")),
+                         ["c"])
+
+    def test_cycles_are_appended(self):
+        self.assertEqual(self._order(_info("b", after=["a"]), _info("a", after=["b"]), _info("c")), ["c", "a", "b"])
+
+    def test_duplicate_names_keep_the_first(self):
+        first = _info("a")
+        second = ModInfo("other/a.py", types.SimpleNamespace(mod_info={"name": "a"}), "a")
+        with quiet() as output:
+            ordered = order_mods([first, second, _info("b")])
+        self.assertIs(ordered[0], first)
+        self.assertEqual(_names(ordered), ["a", "b"])
+        self.assertIn("other/a.py", output.getvalue())
+
+    def test_default_name(self):
+        info = ModInfo("mods/x.py", types.SimpleNamespace(), "x")
+        self.assertEqual(info.name, "x")
+        self.assertFalse(info.declared)
+
+
+class PlanBatchesTest(unittest.TestCase):
+    def test_lanes_by_shared_roots(self):
+        ordered = [_info("a", writes=["items"]), _info("b", writes=["blocks"]),
+                   _info("c", reads=["blocks"], writes=["recipes"]), _info("d"), _info("e", writes=["items"])]
+        batches = [[_names(lane) for lane in batch] for batch in plan_batches(ordered)]
+        self.assertEqual(batches, [[["a"], ["b", "c"]], [["d"]], [["e"]]])
+
+
+if __name__ == "__main__":
+    unittest.main()
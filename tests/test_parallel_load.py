@@ -0,0 +1,63 @@
+import os
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+import sdtd.log
+from sdtd.modmanager import ModManager
+from tests.helpers import ListLogger, TempDirTestCase, config_xml
+
+
+class ParallelLoadTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.config = self.write_files("config", {
+            "items.xml": config_xml("items", "item", 200),
+            "blocks.xml": config_xml("blocks", "block", 150),
+            "recipes.xml": config_xml("recipes", "recipe", 50),
+            os.path.join("sub", "extra.xml"): "<extra><entry name=\"a\"/></extra>\n",
+        })
+
+    def _load(self, workers: int) -> ModManager:
+        manager = ModManager()
+        with self.quiet():
+            manager.load(self.config, workers)
+        return manager
+
+    @staticmethod
+    def _dump(manager: ModManager) -> list:
+        return sorted((name, tree.getroot().tag, ElementTree.tostring(tree.getroot()))
+                      for name, tree in manager.files.items())
+
+    def test_parallel_matches_serial(self):
+        serial = self._dump(self._load(1))
+        self.assertIn(os.path.join("sub", "extra.xml"), [name for name, _, _ in serial])
+        self.assertEqual(serial, self._dump(self._load(4)))
+        self.assertEqual(serial, self._dump(self._load(0)))
+
+    def test_roots_are_mapped_by_tag(self):
+        manager = self._load(4)
+        self.assertEqual(manager.data.items.tag, "items")
+        self.assertEqual(len(manager.data.blocks), 150)
+        self.assertEqual(manager.data.roots["extra"][0].get("name"), "a")
+        self.assertEqual(manager.data.find_item("item7").get("id"), "7")
+
+    def test_parsed_files_are_logged_at_debug_level(self):
+        for workers, lazy in [(1, False), (4, False), (1, True)]:
+            logger = ListLogger(sdtd.log.INFO)
+            manager = ModManager(logger=logger)
+            with self.quiet():
+                manager.load(self.config, workers, lazy)
+                manager.data.items
+            self.assertEqual(logger.text(), "")
+
+            logger.level = sdtd.log.DEBUG
+            with self.quiet() as output:
+                manager.load(self.config, workers, lazy)
+                manager.data.items
+            self.assertNotIn("Loading", output.getvalue())
+            self.assertIn("  Loading: '{}'\n".format(os.path.join(self.config, "items.xml")), logger.writes)
+            self.assertEqual(len(logger.writes), 1 if lazy else 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
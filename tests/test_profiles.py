@@ -0,0 +1,45 @@
+import os.path
+import unittest
+
+from sdtd.modmanager import ModManager
+from sdtd.profiles import ModProfile
+from tests.helpers import TempDirTestCase
+
+_items = "<items>\n  <item name=\"spear\" id=\"1\"/>\n  <item name=\"club\" id=\"2\"/>\n</items>\n"
+_mod = "def apply(data):\n    data.find_item(\"spear\").set(\"tag{0}\", \"1\")\n    data.create_item(\"new{0}\")\n"
+
+
+class ProfilesTest(TempDirTestCase):
+    names = ("a", "b", "c", "d")
+
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.original = self.write_files("original", {"items.xml": _items})
+        for name in self.names:
+            self.write_file(os.path.join("mods", name, "mod.py"), _mod.format(name.upper()))
+
+    def _profile(self, name: str, output: str) -> ModProfile:
+        return ModProfile(name, self.path("mods", name), self.path(output, name))
+
+    def _read(self, output: str, name: str) -> str:
+        return self.read_files(os.path.join(output, name), ["items.xml"])["items.xml"]
+
+    def test_forked_matches_serial(self):
+        with self.quiet():
+            for name in self.names:
+                ModManager().run_profiles(self.original, [self._profile(name, "serial")], workers=1)
+            # More profiles than workers, so the pool has to start fresh workers for the later profiles
+            ModManager().run_profiles(self.original, [self._profile(name, "forked") for name in self.names],
+                                      workers=2)
+            ModManager().run_profiles(self.original, [self._profile(name, "sequential") for name in self.names],
+                                      workers=1)
+        for name in self.names:
+            expected = self._read("serial", name)
+            self.assertIn("tag{}=\"1\"".format(name.upper()), expected)
+            self.assertEqual(expected.count("tag"), 1)
+            self.assertEqual(self._read("forked", name), expected)
+            self.assertEqual(self._read("sequential", name), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import os
+import unittest
+
+from sdtd.modmanager import ModManager
+from sdtd.profiling import BuildProfile
+from tests.helpers import TempDirTestCase
+
+_configs = {
+    "items.xml": "<items>\n  <item name=\"spear\" id=\"1\">\n    <property name=\"Weight\" value=\"2\"/>\n"
+                 "  </item>\n</items>\n",
+    "blocks.xml": "<blocks>\n  <block name=\"wood\" id=\"1\"/>\n</blocks>\n",
+}
+_mods = {
+    "heavy.py": "def apply(data):\n    data.find_item(\"spear\").weight().set(\"value\", \"3\")\n",
+    "idle.py": "def apply(data):\n    pass\n",
+}
+
+
+class BuildProfileTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.original = self.write_files("original", _configs)
+        self.mods = self.write_files("mods", _mods)
+
+    def _run(self, profile: BuildProfile, workers: int=1) -> str:
+        with self.quiet() as output:
+            ModManager(profile=profile).run(self.original, self.path("modded"), self.mods, workers=workers)
+        return output.getvalue()
+
+    def test_build_is_profiled(self):
+        profile = BuildProfile(self.path("profile.json"), cprofile_directory=self.path("cprofile"))
+        output = self._run(profile)
+        self.assertIn("Build profile:", output)
+        with open(self.path("profile.json")) as fp:
+            report = json.load(fp)
+        self.assertEqual(sorted(report["phases"]), ["apply", "load", "write"])
+        self.assertEqual(sorted(entry["name"] for entry in report["parse"]),
+                         sorted(os.path.join(self.original, name) for name in _configs))
+        self.assertEqual(sorted(entry["name"] for entry in report["write"]), sorted(_configs))
+        mods = {os.path.basename(entry["name"]): entry for entry in report["mod"]}
+        self.assertEqual(sorted(mods), ["heavy", "idle"])
+        self.assertEqual(mods["heavy"]["mutations"], 1)
+        self.assertEqual(mods["idle"]["mutations"], 0)
+        self.assertGreater(mods["heavy"]["lookups"], 0)
+        self.assertIn("peak", mods["heavy"])
+        self.assertTrue(os.path.isfile(mods["heavy"]["cprofile"]))
+
+    def test_time_only(self):
+        profile = BuildProfile(memory=False)
+        self._run(profile, workers=2)
+        report = profile.report()
+        self.assertEqual(len(report["parse"]), len(_configs))
+        self.assertNotIn("peak", report["parse"][0])
+        self.assertEqual(len(report["mod"]), len(_mods))
+
+    def test_nested_measurements(self):
+        profile = BuildProfile()
+        with profile.measure("mod", "outer"):
+            with profile.measure("parse", "inner"):
+                data = bytearray(1 << 20)
+            del data
+        profile.close()
+        report = profile.report()
+        self.assertGreaterEqual(report["mod"][0]["peak"], 1 << 20)
+        self.assertGreaterEqual(report["parse"][0]["peak"], 1 << 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
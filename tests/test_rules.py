@@ -0,0 +1,85 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.modmanager import ModManager
+from sdtd.rules import Rule, all_of, apply_rules, clamp, format_number, has_tag, property_between, scale, set_value
+from sdtd.stream import stream_transform
+from tests.helpers import TempDirTestCase
+
+_items = ("<items>\n"
+          "  <item name=\"spear\" id=\"1\">\n"
+          "    <property name=\"Tags\" value=\"weapon, melee\"/>\n"
+          "    <property name=\"Weight\" value=\"2.5\"/>\n"
+          "    <property class=\"Attributes\">\n"
+          "      <property name=\"EntityDamage\" value=\"10,20,30\"/>\n"
+          "    </property>\n"
+          "  </item>\n"
+          "  <!-- not an item -->\n"
+          "  <item name=\"rock\" id=\"2\"><property name=\"Weight\" value=\"1\"/></item>\n"
+          "  <item name=\"note\" id=\"3\">café &amp; more</item>\n"
+          "</items>\n")
+
+_rules = [
+    Rule("item", "Attributes/EntityDamage", scale(1.5)),
+    Rule("item", "Weight", clamp(high=2), where=has_tag("melee")),
+    Rule("item", "Weight", set_value("9"), where=all_of(has_tag("weapon"), property_between("Weight", 3))),
+    Rule("block", "Weight", set_value("0")),
+]
+
+_mod = ("from sdtd.rules import Rule, clamp, has_tag, scale, set_value\n\n"
+        "rules = {\"items.xml\": [Rule(\"item\", \"Attributes/EntityDamage\", scale(1.5)),\n"
+        "                       Rule(\"item\", \"Weight\", clamp(high=2), where=has_tag(\"melee\"))]}\n")
+
+
+class RulesTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.source = self.write_file("config/items.xml", _items)
+
+    def test_transforms(self):
+        self.assertEqual(scale(2)("1.5,3"), "3,6")
+        self.assertEqual(clamp(0, 10)("-1,5,11"), "0,5,10")
+        self.assertEqual(scale(2)("abc"), "abc")
+        self.assertEqual(format_number(0.1 + 0.2), "0.3")
+
+    def test_apply_rules(self):
+        root = ElementTree.fromstring(_items)
+        self.assertEqual(apply_rules(root, _rules), 2)
+        self.assertEqual(root[0][2][0].get("value"), "15,30,45")
+        self.assertEqual(root[0][1].get("value"), "2")
+        self.assertEqual(root[1][0].get("value"), "1")
+
+    def test_stream_matches_in_memory(self):
+        tree = ElementTree.parse(self.source)
+        in_memory = apply_rules(tree.getroot(), _rules)
+        tree.write(self.path("memory.xml"))
+        streamed = stream_transform(self.source, self.path("stream.xml"), _rules)
+        self.assertEqual(streamed, in_memory)
+        with open(self.path("memory.xml"), "rb") as expected, open(self.path("stream.xml"), "rb") as actual:
+            self.assertEqual(actual.read(), expected.read())
+
+    def test_lazy_build_streams_rules(self):
+        self.write_file("mods/rules_mod.py", _mod)
+        outputs = []
+        for lazy in (False, True):
+            modded = "modded{}".format(lazy)
+            manager = ModManager()
+            with self.quiet():
+                manager.run(self.path("config"), self.path(modded), self.path("mods"), lazy=lazy)
+            self.assertEqual(manager.files.entry("items.xml").loaded(), not lazy)
+            outputs.append(self.read_files(modded, ["items.xml"]))
+        self.assertIn("15,30,45", outputs[0]["items.xml"])
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_rules_wait_for_lazy_parse(self):
+        manager = ModManager()
+        with self.quiet():
+            manager.load(self.path("config"), lazy=True)
+            manager.apply_rules({"items.xml": _rules})
+            self.assertFalse(manager.files.entry("items.xml").loaded())
+            self.assertEqual(manager.data.find_item("spear").get("id"), "1")
+        self.assertEqual(manager.data.items[0][2][0].get("value"), "15,30,45")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.modmanager import GameData
+from sdtd.rules import get_property, has_tag, property_equals, scale, set_value
+
+_items = ('<items>'
+          '<item name="bullet" id="1"><property name="Tags" value="ammo"/><property name="Weight" value="0.5"/></item>'
+          '<item name="arrow" id="2"><property name="Tags" value="ammo,primitive"/></item>'
+          '<item name="spear" id="3"><property name="Tags" value="weapon"/><property name="Weight" value="4"/></item>'
+          '<itemgroup name="ammo"/>'
+          '</items>')
+_blocks = ('<blocks><block name="wood" id="1"><property name="MaxDamage" value="100"/></block>'
+           '<block name="stone" id="2"><property name="MaxDamage" value="250"/></block></blocks>')
+
+
+class SelectEditTest(unittest.TestCase):
+    def setUp(self):
+        self.data = GameData()
+        self.data.roots["items"] = ElementTree.fromstring(_items)
+        self.data.roots["blocks"] = ElementTree.fromstring(_blocks)
+        self.data.post_load()
+
+    def _names(self, elements) -> list:
+        return [element.get("name") for element in elements]
+
+    def test_select(self):
+        self.assertEqual(self._names(self.data.select("items", "item")), ["bullet", "arrow", "spear"])
+        self.assertEqual(self._names(self.data.select("items", "item", has_tag("ammo"))), ["bullet", "arrow"])
+        self.assertEqual(self._names(self.data.select("items", "item", property_equals("Weight", "4"))), ["spear"])
+        self.assertEqual(self._names(self.data.select("missing", "item")), [])
+
+    def test_edit(self):
+        self.assertEqual(self.data.edit_items("Weight", scale(2), where=has_tag("ammo")), 1)
+        self.assertEqual(get_property(self.data.items[0], "Weight"), "1")
+        self.assertEqual(get_property(self.data.items[2], "Weight"), "4")
+        self.assertEqual(self.data.edit_blocks("MaxDamage", scale(2)), 2)
+        self.assertEqual([get_property(block, "MaxDamage") for block in self.data.blocks], ["200", "500"])
+        self.assertEqual(self.data.edit("missing", "item", "Weight", scale(2)), 0)
+
+    def test_edit_unchanged_values_are_not_counted(self):
+        self.assertEqual(self.data.edit_items("Weight", set_value("4"), where=property_equals("Weight", "4")), 0)
+
+    def test_create_if_missing(self):
+        self.assertEqual(self.data.edit_items("Weight", scale(2), where=has_tag("primitive"),
+                                              create_if_missing=True), 0)
+        changed = self.data.edit_items("Attributes/EntityDamage", set_value("5"), where=has_tag("ammo"),
+                                       create_if_missing=True)
+        self.assertEqual(changed, 2)
+        arrow = self.data.find_item("arrow").raw()
+        self.assertEqual(get_property(arrow, "Attributes/EntityDamage"), "5")
+        self.assertEqual(arrow[-1].get("class"), "Attributes")
+        self.assertIsNone(get_property(self.data.items[2], "Attributes/EntityDamage"))
+
+
+if __name__ == "__main__":
+    unittest.main()
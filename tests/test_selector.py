@@ -0,0 +1,66 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+import sdtd.selector
+from sdtd.elements import PropertyContainer
+from sdtd.selector import compile_selector, find_child
+
+_item = ('<item name="spear">'
+         '<property name="Weight" value="1"/>'
+         '<property name="Weight" value="2"/>'
+         '<property class="Attributes"><property name="EntityDamage" value="10"/></property>'
+         '<property name="Tags" value="weapon" param1="a"/>'
+         '<property name="Tags" value="weapon" param1="b"/>'
+         '</item>')
+
+
+class SelectorTest(unittest.TestCase):
+    def setUp(self):
+        self.item = ElementTree.fromstring(_item)
+
+    def test_compiled_selectors_are_shared(self):
+        weight = compile_selector("property", {"name": "Weight"})
+        self.assertIs(compile_selector("property", {"name": "Weight"}), weight)
+        selector = compile_selector("property", {"name": "Tags", "param1": "b"})
+        self.assertEqual(self.item.findall("./" + selector.xpath), [self.item[4]])
+
+    def test_first(self):
+        self.assertIs(find_child(self.item, "property", "name", "Weight"), self.item[0])
+        self.assertIs(find_child(self.item, "property", "class", "Attributes"), self.item[2])
+        self.assertIsNone(find_child(self.item, "property", "name", "Missing"))
+        self.assertIsNone(find_child(None, "property", "name", "Weight"))
+        # The index points at the first Tags property, which does not match on param1
+        self.assertIs(compile_selector("property", {"name": "Tags", "param1": "b"}).first(self.item), self.item[4])
+
+    def test_index_sees_appended_children(self):
+        self.assertIsNone(find_child(self.item, "property", "name", "Added"))
+        added = ElementTree.SubElement(self.item, "property", {"name": "Added"})
+        self.assertIs(find_child(self.item, "property", "name", "Added"), added)
+
+    def test_index_sees_removed_children(self):
+        first = self.item[0]
+        self.assertIs(find_child(self.item, "property", "name", "Weight"), first)
+        self.item.remove(first)
+        self.assertIs(find_child(self.item, "property", "name", "Weight"), self.item[0])
+        self.assertEqual(find_child(self.item, "property", "name", "Weight").get("value"), "2")
+
+    def test_index_sees_reordered_children(self):
+        self.assertIs(find_child(self.item, "property", "name", "Weight"), self.item[0])
+        self.item[0], self.item[1] = self.item[1], self.item[0]
+        self.assertEqual(find_child(self.item, "property", "name", "Weight").get("value"), "2")
+
+    def test_renames(self):
+        self.assertIs(find_child(self.item, "property", "name", "Weight"), self.item[0])
+        self.item[0].set("name", "Raw")
+        sdtd.selector.invalidate(self.item)
+        self.assertIs(find_child(self.item, "property", "name", "Raw"), self.item[0])
+
+        # Renaming through a wrapper drops the index of the parent by itself
+        container = PropertyContainer(self.item, "item")
+        container.get_property_name("Weight", False).set("name", "Wrapped")
+        self.assertIs(find_child(self.item, "property", "name", "Wrapped"), self.item[1])
+        self.assertIsNone(find_child(self.item, "property", "name", "Weight"))
+
+
+if __name__ == "__main__":
+    unittest.main()
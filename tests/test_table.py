@@ -0,0 +1,90 @@
+import math
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.journal import Journal
+from sdtd.modmanager import GameData
+from sdtd.rules import get_property, has_tag
+
+_items = ('<items>'
+          '<item name="base"><property name="Tags" value="tool"/><property name="Weight" value="2"/>'
+          '<property class="Attributes"><property name="EntityDamage" value="10,20,30"/></property></item>'
+          '<item name="child"><property name="Extends" value="base"/><property name="Weight" value="1.5"/></item>'
+          '<item name="plain"><property name="Weight" value="heavy"/></item>'
+          '</items>')
+
+
+class PropertyTableTest(unittest.TestCase):
+    def setUp(self):
+        self.data = GameData()
+        self.data.roots["items"] = ElementTree.fromstring(_items)
+        self.data.post_load()
+
+    def test_build(self):
+        table = self.data.table("items")
+        self.assertEqual(len(table), 3)
+        # Weight holds a word on one row, so only the damage is numeric everywhere it appears
+        self.assertIn("Attributes/EntityDamage", table)
+        self.assertNotIn("Weight", table)
+        self.assertNotIn("Tags", table)
+        self.assertEqual(table.get("base", "Attributes/EntityDamage"), [10.0, 20.0, 30.0])
+        self.assertIsNone(table.get("child", "Attributes/EntityDamage"))
+        self.assertEqual(table.row("child"), 1)
+        self.assertIsNone(table.row("missing"))
+
+    def test_where_and_inherited(self):
+        table = self.data.table("items", properties=["Attributes/EntityDamage", "Weight"], inherited=True,
+                                where=lambda element: element.get("name") != "plain")
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.get("child", "Attributes/EntityDamage"), [10.0, 20.0, 30.0])
+        self.assertEqual(table.get("child", "Weight"), [1.5])
+
+    def test_write_back(self):
+        self.data.journal = Journal()
+        table = self.data.table("items", properties=["Attributes/EntityDamage", "Weight"], inherited=True)
+        table.set("base", "Weight", 3)
+        table.set("child", "Attributes/EntityDamage", [11, 22.5, 33])
+        table.set("plain", "Weight", 4)
+        self.assertEqual(self.data.write_table(table), 3)
+        self.assertEqual(get_property(self.data.find_item("base").raw(), "Weight"), "3")
+        # The inherited damage is written to the child itself
+        self.assertEqual(get_property(self.data.find_item("child").raw(), "Attributes/EntityDamage"), "11,22.5,33")
+        self.assertEqual(get_property(self.data.find_item("base").raw(), "Attributes/EntityDamage"), "10,20,30")
+        self.assertEqual(get_property(self.data.find_item("plain").raw(), "Weight"), "4")
+        self.assertEqual(len(self.data.journal.compacted()), 3)
+        self.assertEqual(self.data.write_table(table), 0)
+
+    def test_unchanged_table_writes_nothing(self):
+        table = self.data.table("items", where=has_tag("tool"))
+        self.assertEqual(table.changes(), [])
+        self.assertEqual(self.data.write_table(table), 0)
+
+    def test_column_assignment(self):
+        table = self.data.table("items", properties=["Attributes/EntityDamage"])
+        table["Attributes/EntityDamage"] = [value * 2 for value in table["Attributes/EntityDamage"]]
+        self.assertEqual(self.data.write_table(table), 1)
+        self.assertEqual(get_property(self.data.find_item("base").raw(), "Attributes/EntityDamage"), "20,40,60")
+        with self.assertRaises(ValueError):
+            table["Attributes/EntityDamage"] = [1.0, 2.0]
+        self.assertEqual(table.get("base", "Attributes/EntityDamage"), [20.0, 40.0, 60.0])
+
+    def test_non_finite_values_are_rejected(self):
+        table = self.data.table("items", properties=["Attributes/EntityDamage", "Weight"], inherited=True)
+        table.set("child", "Weight", 5)
+        table.set("base", "Attributes/EntityDamage", [1, math.inf, 3])
+        with self.assertRaises(ValueError):
+            self.data.write_table(table)
+        table.set("base", "Attributes/EntityDamage", [math.nan, 1, 2])
+        with self.assertRaises(ValueError):
+            table.changes()
+        # Nothing was written before the error
+        self.assertEqual(get_property(self.data.find_item("child").raw(), "Weight"), "1.5")
+
+    def test_row_wider_than_column(self):
+        table = self.data.table("items", properties=["Weight"])
+        with self.assertRaises(ValueError):
+            table.set("base", "Weight", [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.modmanager import ModManager
+from sdtd.validate import validate
+from tests.helpers import TempDirTestCase
+
+_roots = {
+    "items": "<items>"
+             "<item name=\"spear\"><property name=\"Extends\" value=\"stick\"/></item>"
+             "<item name=\"club\"><property class=\"Action0\"><property name=\"Delay\"/></property></item>"
+             "<item name=\"club\"/>"
+             "</items>",
+    "blocks": "<blocks><block name=\"spear\"/><block name=\"wood\"><drop name=\"plank\"/></block></blocks>",
+    "recipes": "<recipes><recipe name=\"club\"><ingredient name=\"wood\"/><ingredient name=\"nail\"/></recipe>"
+               "<recipe name=\"bow\"/></recipes>",
+    "lootcontainers": "<lootcontainers><lootgroup name=\"a\"><item group=\"b\"/><item name=\"club\"/></lootgroup>"
+                      "</lootcontainers>",
+}
+_items = "<items>\n  <item name=\"spear\" id=\"1\"/>\n  <item name=\"club\" id=\"2\"/>\n</items>\n"
+_recipes = "<recipes>\n  <recipe name=\"club\" count=\"1\"/>\n</recipes>\n"
+
+
+class ValidateTest(TempDirTestCase):
+    def test_findings(self):
+        roots = {tag: ElementTree.fromstring(xml) for tag, xml in _roots.items()}
+        findings = [(finding.kind, finding.path, finding.target) for finding in validate(roots)]
+        self.assertEqual(findings, [
+            ("empty", "items/item[@name='club']/property[@class='Action0']/property[@name='Delay']", None),
+            ("duplicate", "items/item[@name='club']", "club"),
+            ("duplicate", "blocks/block[@name='spear']", "spear"),
+            ("extends", "items/item[@name='spear']/property[@name='Extends']", "stick"),
+            ("missing", "blocks/block[@name='wood']/drop[@name='plank']", "plank"),
+            ("missing", "recipes/recipe[@name='club']/ingredient[@name='nail']", "nail"),
+            ("missing", "recipes/recipe[@name='bow']", "bow"),
+            ("missing", "lootcontainers/lootgroup[@name='a']/item[@group='b']", "b"),
+        ])
+
+    def test_clean_config(self):
+        self.assertEqual(validate({"items": ElementTree.fromstring(_items)}), [])
+
+    def test_findings_name_the_mod(self):
+        original = self.write_files("original", {"items.xml": _items, "recipes.xml": _recipes})
+        mods = self.write_files("mods", {"rename.py": "def apply(data):\n"
+                                                      "    data.find_item(\"club\").set(\"name\", \"mace\")\n"})
+        with self.quiet() as output:
+            findings = ModManager().run(original, self.path("modded"), mods, check=True)
+        self.assertEqual([(finding.path, finding.mod) for finding in findings],
+                         [("recipes/recipe[@name='club']", "rename")])
+        self.assertIn("Recipe for missing item 'club'", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from sdtd.modmanager import ModManager
+from tests.helpers import TempDirTestCase
+
+_items = ('<?xml version="1.0" encoding="UTF-8"?>\n<items>\n  <!-- vanilla -->\n'
+          '  <item name="a" id="1">\n    <property name="Weight" value="1"/>\n  </item>\n'
+          '  <item name="b" id="2">\n    <property name="Weight" value="2"/>\n  </item>\n</items>\n')
+
+
+class VerbatimTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.original = self.write_files("original", {"items.xml": _items})
+        self.manager = ModManager(verbatim=True)
+        with self.quiet():
+            self.manager.load(self.original)
+
+    def _write(self) -> tuple:
+        with self.quiet() as output:
+            self.manager.write(self.path("modded"))
+        with open(self.path("modded", "items.xml"), newline="") as fp:
+            return fp.read(), output.getvalue()
+
+    def test_unchanged_is_copied(self):
+        self.assertEqual(self._write()[0], _items)
+
+    def test_reported_change_keeps_the_rest(self):
+        self.manager.data.find_item("b").get_property_name("Weight", False).set("value", "5")
+        written, _ = self._write()
+        self.assertEqual(written, _items.replace('value="2"', 'value="5"'))
+
+    def test_marked_raw_change_keeps_the_rest(self):
+        element = self.manager.data.items[0]
+        element[0].set("value", "7")
+        self.manager.data.changes.mark(self.manager.data.items, element)
+        written, _ = self._write()
+        self.assertEqual(written, _items.replace('value="1"', 'value="7"'))
+
+    def test_unreported_raw_change_is_written(self):
+        self.manager.data.items[0][0].set("value", "7")
+        written, output = self._write()
+        self.assertIn('value="7"', written)
+        self.assertIn('value="2"', written)
+        self.assertIn("Warning", output)
+
+
+    def test_rules_on_lazily_parsed_file(self):
+        # The rules wait for the file to be parsed, which the second mod causes, and are reported as they run
+        mods = self.write_files("mods", {
+            "a_rules.py": "from sdtd.rules import Rule\n\n"
+                          "rules = {\"items.xml\": [Rule(\"item\", \"Weight\", lambda value: \"7\", "
+                          "where=lambda element: element.get(\"name\") == \"b\")]}\n",
+            "b_read.py": "def apply(data):\n    data.find_item(\"a\")\n",
+        })
+        with self.quiet():
+            ModManager(verbatim=True).run(self.original, self.path("lazy"), mods, lazy=True)
+        with open(self.path("lazy", "items.xml"), newline="") as fp:
+            self.assertEqual(fp.read(), _items.replace('value="2"', 'value="7"'))
+
+
+if __name__ == "__main__":
+    unittest.main()
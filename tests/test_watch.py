@@ -0,0 +1,60 @@
+import os
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.modmanager import ModManager
+from sdtd.watch import Watcher
+from tests.helpers import TempDirTestCase
+
+_configs = {
+    "items.xml": "<items>\n  <item name=\"spear\" id=\"1\"/>\n  <item name=\"club\" id=\"2\"/>\n</items>\n",
+    "blocks.xml": "<blocks>\n  <block name=\"wood\" id=\"1\"/>\n</blocks>\n",
+}
+# Counts how often it ran on the same tree, which must be once per build
+_items_mod = ("def apply(data):\n"
+              "    spear = data.find_item(\"spear\")\n"
+              "    spear.set(\"runs\", str(int(spear.get(\"runs\") or 0) + 1))\n"
+              "    spear.set(\"modded\", \"{}\")\n")
+_blocks_mod = "def apply(data):\n    data.blocks[0].set(\"modded\", \"1\")\n"
+
+
+class WatchTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        self.original = self.write_files("original", _configs)
+        self.mods = self.write_files("mods", {"items_mod.py": _items_mod.format(1), "blocks_mod.py": _blocks_mod})
+        self.modded = self.path("modded")
+
+    def _outputs(self, directory: str) -> dict:
+        return {name: ElementTree.canonicalize(contents, strip_text=True)
+                for name, contents in self.read_files(directory, _configs).items()}
+
+    def _full(self) -> dict:
+        with self.quiet():
+            ModManager().run(self.original, self.path("full"), self.mods)
+        return self._outputs("full")
+
+    def test_rebuilds_from_snapshot(self):
+        watcher = Watcher(ModManager(), self.original, self.modded, self.mods, interval=0)
+        with self.quiet():
+            watcher.start()
+            self.assertFalse(watcher.poll())
+        self.assertEqual(self._outputs("modded"), self._full())
+
+        self.write_file("mods/items_mod.py", _items_mod.format(2))
+        with self.quiet():
+            self.assertTrue(watcher.poll())
+        self.assertEqual(self._outputs("modded"), self._full())
+        self.assertIn("runs=\"1\"", self._outputs("modded")["items.xml"])
+
+        os.remove(os.path.join(self.mods, "blocks_mod.py"))
+        with self.quiet():
+            self.assertTrue(watcher.poll())
+        self.assertEqual(self._outputs("modded"), self._full())
+        self.assertNotIn("modded", self._outputs("modded")["blocks.xml"])
+        self.assertEqual(watcher.builds, 3)
+        watcher._executor.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
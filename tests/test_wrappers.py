@@ -0,0 +1,58 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+import sdtd.log
+from sdtd.elements import WrapperCache
+from sdtd.modmanager import GameData
+
+_items = ('<items><item name="spear" id="1"><property name="Weight" value="2"/>'
+          '<property class="Attributes"><property name="EntityDamage" value="10"/></property></item></items>')
+
+
+class WrapperTest(unittest.TestCase):
+    def _data(self, wrapper_cache: WrapperCache=None) -> GameData:
+        data = GameData(wrapper_cache)
+        data.roots["items"] = ElementTree.fromstring(_items)
+        data.post_load()
+        return data
+
+    def test_wrappers_are_slotted(self):
+        item = self._data().find_item("spear")
+        for wrapper in (item, item.weight(), item.attributes(), item.attributes().entity_damage(),
+                        self._data().config_root("items")):
+            self.assertFalse(hasattr(wrapper, "__dict__"), type(wrapper).__name__)
+
+    def test_default_logger_is_shared(self):
+        item = self._data().find_item("spear")
+        self.assertIs(item._logger, sdtd.log.default_logger)
+        self.assertIs(item.weight()._logger, sdtd.log.default_logger)
+
+    def test_str_is_stable(self):
+        weight = self._data().find_item("spear").weight()
+        self.assertIn("Weight", str(weight))
+        self.assertEqual(str(weight), str(weight))
+
+    def test_wrappers_are_interned(self):
+        data = self._data(WrapperCache())
+        item = data.find_item("spear")
+        self.assertIs(item.weight(), item.weight())
+        self.assertIs(item.attributes().entity_damage(), data.find_item("spear").attributes().entity_damage())
+        self.assertEqual(item.weight().get("value"), "2")
+
+        uncached = self._data().find_item("spear")
+        self.assertIsNot(uncached.weight(), uncached.weight())
+
+    def test_cache_drops_least_recently_used(self):
+        cache = WrapperCache(2)
+        cache.put(("a",), 1)
+        cache.put(("b",), 2)
+        self.assertEqual(cache.get(("a",)), 1)
+        cache.put(("c",), 3)
+        self.assertIsNone(cache.get(("b",)))
+        self.assertEqual(cache.get(("a",)), 1)
+        cache.clear()
+        self.assertIsNone(cache.get(("a",)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import unittest
+
+from sdtd.modmanager import ModManager
+from tests.helpers import TempDirTestCase, config_xml
+
+_mod = ("def apply(data):\n    for element in list(data.items)[::7]:\n"
+        "        data.find_item(element.get(\"name\")).weight(True).set(\"value\", \"9\")\n")
+
+
+class WriteTest(TempDirTestCase):
+    def setUp(self):
+        TempDirTestCase.setUp(self)
+        original = self.write_files("original", {
+            "items.xml": config_xml("items", "item", 200),
+            "blocks.xml": config_xml("blocks", "block", 150),
+            "recipes.xml": config_xml("recipes", "recipe", 50),
+        })
+        mods = self.write_files("mods", {"mod.py": _mod})
+        self.manager = ModManager()
+        with self.quiet():
+            self.manager.load(original)
+            self.manager.apply_all(mods)
+
+    def _write(self, output: str, workers: int=None) -> list:
+        with self.quiet():
+            return self.manager.write(self.path(output), workers=workers)
+
+    def _read(self, output: str) -> dict:
+        return self.read_files(output, sorted(os.listdir(self.path(output))))
+
+    def test_parallel_matches_serial(self):
+        serial = self._write("serial", 1)
+        self.assertEqual(sorted(serial), sorted(self._write("parallel", 4)))
+        written = self._read("serial")
+        self.assertIn("value=\"9\"", written["items.xml"])
+        self.assertEqual(written, self._read("parallel"))
+        # No temporary files are left behind
+        self.assertEqual(sorted(written), sorted(serial))
+
+    def test_unchanged_files_are_skipped(self):
+        self.assertEqual(len(self._write("modded")), len(self.manager.files))
+        path = self.path("modded", "items.xml")
+        mtime = os.stat(path).st_mtime_ns
+        self.assertEqual(self._write("modded"), [])
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+        self.manager.data.find_item("item1").weight(True).set("value", "10")
+        self.assertEqual(self._write("modded"), ["items.xml"])
+
+    def test_write_named_files(self):
+        self.assertEqual(self._write("modded"), sorted(self.manager.files))
+        self.write_file("modded/blocks.xml", "<blocks/>\n")
+        with self.quiet():
+            written = self.manager.write(self.path("modded"), ["blocks.xml", "recipes.xml"])
+        self.assertEqual(written, ["blocks.xml"])
+
+
+if __name__ == "__main__":
+    unittest.main()
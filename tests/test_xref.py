@@ -0,0 +1,65 @@
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from sdtd.modmanager import GameData
+
+_recipes = ('<recipes>'
+            '<recipe name="spear" count="1"><ingredient name="wood" count="2"/><ingredient name="rope"/></recipe>'
+            '<recipe name="club" count="1"><ingredient name="wood" count="4"/></recipe>'
+            '</recipes>')
+_blocks = '<blocks><block name="tree"><drop event="Harvest" name="wood" count="5"/></block></blocks>'
+_loot = '<lootcontainers><lootgroup name="forest"><item name="rope"/><item group="other"/></lootgroup></lootcontainers>'
+
+
+class CrossReferencesTest(unittest.TestCase):
+    def setUp(self):
+        self.data = GameData()
+        self.data.roots["recipes"] = ElementTree.fromstring(_recipes)
+        self.data.roots["blocks"] = ElementTree.fromstring(_blocks)
+        self.data.roots["lootcontainers"] = ElementTree.fromstring(_loot)
+        self.data.post_load()
+        self.xref = self.data.cross_references()
+
+    def _names(self, elements) -> list:
+        return [element.get("name") for element in elements]
+
+    def test_lookup(self):
+        self.assertEqual(self._names(self.xref.recipes_using("wood")), ["spear", "club"])
+        self.assertEqual(self._names(self.xref.blocks_dropping("wood")), ["tree"])
+        self.assertEqual(self._names(self.xref.loot_groups_containing("rope")), ["forest"])
+        self.assertEqual(self._names(self.xref.recipes_using("rope")), ["spear"])
+        self.assertTrue(self.xref.is_referenced("rope"))
+        self.assertFalse(self.xref.is_referenced("spear"))
+        self.assertIs(self.data.cross_references(), self.xref)
+
+    def test_rename_reference(self):
+        recipe = self.data.config_root("recipes").find("recipe", {"name": "club"})
+        recipe.find("ingredient", {"name": "wood"}).set("name", "stone")
+        self.assertEqual(self._names(self.xref.recipes_using("wood")), ["spear"])
+        self.assertEqual(self._names(self.xref.recipes_using("stone")), ["club"])
+
+    def test_add_and_remove_references(self):
+        recipe = self.data.config_root("recipes").find("recipe", {"name": "club"})
+        recipe.find("ingredient", {"name": "nails"}, True).create()
+        self.assertEqual(self._names(self.xref.recipes_using("nails")), ["club"])
+        recipe.find("ingredient", {"name": "wood"}).remove()
+        self.assertEqual(self._names(self.xref.recipes_using("wood")), ["spear"])
+
+    def test_add_and_remove_owners(self):
+        element = ElementTree.fromstring('<recipe name="axe"><ingredient name="stone"/></recipe>')
+        self.data.config_root("recipes").append(element)
+        self.assertEqual(self._names(self.xref.recipes_using("stone")), ["axe"])
+        self.data.config_root("blocks").find("block", {"name": "tree"}).remove()
+        self.assertEqual(self.xref.blocks_dropping("wood"), [])
+
+    def test_replaced_root_rebuilds(self):
+        self.data.roots["recipes"] = ElementTree.fromstring('<recipes><recipe name="a"><ingredient name="b"/>'
+                                                            '</recipe></recipes>')
+        xref = self.data.cross_references()
+        self.assertIsNot(xref, self.xref)
+        self.assertEqual(self._names(xref.recipes_using("b")), ["a"])
+        self.assertEqual(xref.recipes_using("wood"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()